@@ -0,0 +1,313 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from modflow_array_io import write_array
+
+# Timing suite for the Python tooling on synthetic models at GMRW scale and
+# larger. A fixture of scale S has S times the grid cells of the GMRW model
+# (197 x 135, NROW and NCOL each multiplied by sqrt(S)), S times its river
+# cells (1,511) and subbasins (139), and a daily listing for the given
+# number of years, so every stage can be compared across grid size
+# (--scales) and simulation length (--years):
+#
+#   python benchmarks.py --scales 1 4 16 --output benchmark_results.json
+#   python benchmarks.py --compare benchmark_results.json
+#
+# Results are written as JSON: one entry per (stage, scale) with the
+# minimum and median of the repeats. --compare reports stages slower than
+# a previous results file by more than --tolerance.
+
+GMRW_NROW, GMRW_NCOL = 197, 135
+GMRW_RIVER_CELLS = 1511
+GMRW_SUBBASINS = 139
+DEFAULT_FIXTURE_DIR = 'benchmark_fixtures'
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DEFAULT_TOLERANCE = 0.25
+
+
+def _fixture_ibound(nrow, ncol):
+    """Elliptical active area covering about 41 % of the grid, as in GMRW"""
+    row, col = np.mgrid[0:nrow, 0:ncol]
+    distance = ((row - nrow / 2) / (0.47 * nrow)) ** 2 + ((col - ncol / 2) / (0.42 * ncol)) ** 2
+    return (distance <= 1.0).astype(np.int32)
+
+
+def _write_dis(path, nrow, ncol, top, botm, ndays):
+    with open(path, 'w') as f:
+        f.write("# Synthetic benchmark model\n")
+        f.write("# Discretization (DIS) input file\n")
+        f.write(f"1 {nrow} {ncol} 1 4 2\t\t\t\t\t\t# NLAY, NROW, NCOL, NPER, ITMUNI, LENUNI\n")
+        f.write("0\t\t\t\t\t\t\t# LAYCB\n")
+        f.write("CONSTANT 913.25926\t\t\t\t\t\t# DELR\n")
+        f.write("CONSTANT 918.07107\t\t\t\t\t\t# DELC\n")
+        write_array(f, top, '(free)', comment='TOP', value_fmt='%.4f')
+        write_array(f, botm, '(free)', comment='BOTM layer 1', value_fmt='%.4f')
+        f.write(f"{ndays:.6f}  1 1.000000  TR\t\t\t\t# Stress period length, Number of time steps, time step multiplier, SS/TR\n")
+
+
+def _write_bas(path, ibound, strt):
+    with open(path, 'w') as f:
+        f.write("# Synthetic benchmark model\n")
+        f.write("# Basic (bas) input file\n")
+        f.write("FREE\n")
+        write_array(f, ibound, '(free)', comment='IBOUND layer 1')
+        f.write("-999\t\t\tHNOFLO\n")
+        write_array(f, strt, '(free)', comment='STRT layer 1', value_fmt='%.4f')
+
+
+def _write_river_file(path, cells, subbasins, lengths):
+    with open(path, 'w') as f:
+        f.write(f"{len(cells):12d}\n")
+        for i, (cell, subs, segs) in enumerate(zip(cells, subbasins, lengths), start=1):
+            f.write(f"{i:13d}{cell:13d}{len(subs):13d}\n")
+            f.write(''.join(f"{sub:13d}" for sub in subs) + '\n')
+            f.write(''.join(f"{seg:13.5f}" for seg in segs) + '\n')
+
+
+def _write_listing(path, ndays, rng):
+    """Daily MODFLOW-NWT listing with solver summaries and one final budget"""
+    outer = rng.integers(3, 15, ndays)
+    inner = outer * rng.integers(3, 8, ndays)
+    step = (" SOLVING FOR HEAD \n\n"
+            "    ------------------------------------------------\n"
+            "       NWT REQUIRED     %8d OUTER ITERATIONS \n"
+            "       AND A TOTAL OF   %8d INNER ITERATIONS.\n"
+            "    ------------------------------------------------\n\n"
+            " NO OUTPUT CONTROL FOR STRESS PERIOD    1   TIME STEP %4d\n\n"
+            " SAVING SATURATED THICKNESS AND FLOW TERMS ON UNIT    0 FOR MT3DMS\n"
+            " BY THE LINK-MT3DMS PACKAGE V7 AT TIME STEP %4d, STRESS PERIOD    1\n\n")
+    values = np.column_stack([outer, inner, np.arange(1, ndays + 1), np.arange(1, ndays + 1)])
+    terms = ('STORAGE', 'CONSTANT HEAD', 'WELLS', 'DRAINS', 'RIVER LEAKAGE', 'ET', 'RECHARGE')
+    with open(path, 'w') as f:
+        f.write("                                  MODFLOW-NWT-SWR1\n")
+        f.write((step * ndays) % tuple(values.ravel().tolist()))
+        f.write(f"  VOLUMETRIC BUDGET FOR ENTIRE MODEL AT END OF TIME STEP{ndays:5d}, STRESS PERIOD   1\n\n")
+        for side in ('IN', 'OUT'):
+            f.write(f"           {side}:                                      {side}:\n")
+            for term in terms:
+                value = rng.uniform(0, 1e8)
+                f.write(f"{term:>20} = {value:16.4f}  {term:>20} = {value:16.4f}\n")
+            f.write(f"\n{'TOTAL ' + side:>20} = {1e8:16.4f}  {'TOTAL ' + side:>20} = {1e8:16.4f}\n\n")
+        f.write(f"{'IN - OUT':>20} = {0.0:16.4f}  {'IN - OUT':>20} = {0.0:16.4f}\n\n")
+        f.write(" PERCENT DISCREPANCY =           0.00     PERCENT DISCREPANCY =           0.00\n")
+
+
+def make_fixture(fixture_dir, scale=1, years=23, seed=0):
+    """
+    Write a synthetic model directory of the given scale
+
+    Returns the fixture description (also saved as fixture.json). An
+    existing fixture with the same parameters is reused.
+    """
+    from map_recharge_to_ibound import create_recharge_array, write_rch_file
+
+    factor = int(round(np.sqrt(scale)))
+    if scale < 1 or factor * factor != scale:
+        raise ValueError(f"Scale {scale} is not a perfect square (1, 4, 9, 16, ...)")
+    nrow, ncol = GMRW_NROW * factor, GMRW_NCOL * factor
+    ndays = int(round(years * 365.25))
+    meta = {'scale': scale, 'years': years, 'seed': seed, 'nrow': nrow, 'ncol': ncol, 'ndays': ndays,
+            'river_cells': GMRW_RIVER_CELLS * scale, 'subbasins': GMRW_SUBBASINS * scale}
+    meta_file = os.path.join(fixture_dir, 'fixture.json')
+    if os.path.exists(meta_file):
+        with open(meta_file, 'r') as f:
+            if json.load(f) == meta:
+                return meta
+    os.makedirs(fixture_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    ibound = _fixture_ibound(nrow, ncol)
+    top = np.where(ibound == 1, 150.0 + 300.0 * rng.random((nrow, ncol)), 0.0)
+    botm = np.where(ibound == 1, top - 50.0, 0.0)
+    strt = np.where(ibound == 1, top - 5.0, -999.0)
+    _write_dis(os.path.join(fixture_dir, 'modflow_GMRW.dis'), nrow, ncol, top, botm, ndays)
+    _write_bas(os.path.join(fixture_dir, 'modflow_GMRW.bas'), ibound, strt)
+    write_rch_file(os.path.join(fixture_dir, 'modflow_GMRW.rch'), create_recharge_array(ibound))
+    with open(os.path.join(fixture_dir, 'modflow.mfn'), 'w') as f:
+        f.write("LIST            5007    modflow_GMRW.out\n"
+                "DIS             5010    modflow_GMRW.dis\n"
+                "BAS6            5001    modflow_GMRW.bas\n"
+                "RCH             5018    modflow_GMRW.rch\n")
+
+    # River cells: distinct active cells, most in one subbasin, some shared
+    active = np.flatnonzero(ibound.ravel() == 1) + 1
+    cells = np.sort(rng.choice(active, meta['river_cells'], replace=False))
+    nsub = rng.choice([1, 2, 3], len(cells), p=[0.93, 0.03, 0.04])
+    subbasins = [rng.choice(meta['subbasins'], n, replace=False) + 1 for n in nsub]
+    lengths = [rng.uniform(50.0, 1500.0, n) for n in nsub]
+    _write_river_file(os.path.join(fixture_dir, 'swatmf_river2grid.txt'), cells, subbasins, lengths)
+
+    _write_listing(os.path.join(fixture_dir, 'modflow_GMRW.out'), ndays, rng)
+
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark_fixture(fixture_dir, repeat=3, map_repeat=1):
+    """
+    Time every stage on one fixture
+
+    Returns a list of {'stage', 'seconds' (all repeats), 'min', 'median'}.
+    create_recharge_map (300 + 600 dpi PNGs) runs map_repeat times.
+    """
+    from map_recharge_to_ibound import create_recharge_array, create_recharge_map, write_rch_file
+    from run_swatmodflow_with_log import parse_modflow_output
+    import swatmf_aggregate
+    from model_inventory import ModelInventory
+    from verify_recharge_mapping import read_ibound_from_bas, read_recharge_from_rch, verify_mapping
+
+    path = lambda name: os.path.join(fixture_dir, name)
+    ibound = read_ibound_from_bas(path('modflow_GMRW.bas'))
+    recharge = read_recharge_from_rch(path('modflow_GMRW.rch'))
+    rch_out = path('benchmark_out.rch')
+    with open(path('fixture.json'), 'r') as f:
+        ndays = json.load(f)['ndays']
+
+    # River cell ids in file order, as an output file would list them
+    with open(path('swatmf_river2grid.txt'), 'r') as f:
+        tokens = f.read().split()
+    line_cells, pos = [], 1
+    for _ in range(int(tokens[0])):
+        line_cells.append(int(tokens[pos + 1]))
+        pos += 3 + 2 * int(tokens[pos + 2])
+    exchange = np.random.default_rng(0).normal(size=(ndays, len(line_cells)))
+
+    inventory_dir = path('.swatmf_inventory')
+    ModelInventory(fixture_dir, inventory_dir).bas  # build (or validate) the snapshot
+
+    def aggregate_exchange():
+        swatmf_aggregate._operator_cache.clear()
+        _, operator = swatmf_aggregate.build_operator(line_cells, path('swatmf_river2grid.txt'))
+        swatmf_aggregate.aggregate(exchange, operator)
+
+    def quiet(function):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                function()
+        return run
+
+    stages = [
+        ('read_ibound_from_bas', lambda: read_ibound_from_bas(path('modflow_GMRW.bas')), repeat),
+        ('inventory_ibound', lambda: ModelInventory(fixture_dir, inventory_dir).bas['ibound'][0], repeat),
+        ('read_recharge_from_rch', lambda: read_recharge_from_rch(path('modflow_GMRW.rch')), repeat),
+        ('write_rch_file', lambda: write_rch_file(rch_out, create_recharge_array(ibound)), repeat),
+        ('verify_mapping', quiet(lambda: verify_mapping(ibound, recharge)), repeat),
+        ('parse_modflow_output', lambda: parse_modflow_output(path('modflow_GMRW.out')), repeat),
+        ('aggregate_exchange', aggregate_exchange, repeat),
+        ('create_recharge_map', quiet(lambda: create_recharge_map(ibound, recharge, path('benchmark_map.png'))),
+         map_repeat),
+    ]
+    results = []
+    for stage, function, count in stages:
+        if count <= 0:
+            continue
+        seconds = _time(function, count)
+        results.append({'stage': stage, 'seconds': seconds, 'min': min(seconds),
+                        'median': statistics.median(seconds)})
+    for name in ('benchmark_out.rch', 'benchmark_map.png', 'benchmark_map_highres.png'):
+        if os.path.exists(path(name)):
+            os.remove(path(name))
+    return results
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Stages slower than in baseline by more than tolerance (a fraction)
+
+    Compares the minimum times of matching (stage, scale, years) entries.
+    Returns a list of (stage, scale, years, baseline s, current s).
+    """
+    previous = {(entry['stage'], entry['scale'], entry['years']): entry['min']
+                for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        key = (entry['stage'], entry['scale'], entry['years'])
+        if key in previous and entry['min'] > previous[key] * (1 + tolerance):
+            regressions.append(key + (previous[key], entry['min']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Python tooling on synthetic GMRW-scale models')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 4, 16],
+                        help='grid scales relative to GMRW (perfect squares; default: 1 4 16)')
+    parser.add_argument('--years', type=float, default=23, help='simulated years (listing length)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--map-repeat', type=int, default=1, help='repeats of create_recharge_map (0 to skip)')
+    parser.add_argument('--fixture-dir', default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--compare', metavar='JSON', help='previous results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'allowed slowdown as a fraction (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SWAT-MODFLOW TOOLING BENCHMARKS")
+    print("="*70)
+
+    invalid = [scale for scale in args.scales if scale < 1 or int(round(np.sqrt(scale))) ** 2 != scale]
+    if invalid:
+        print(f"✗ Scales must be perfect squares (1, 4, 9, 16, ...): {', '.join(map(str, invalid))}")
+        return False
+
+    results = []
+    for scale in args.scales:
+        fixture_dir = os.path.join(args.fixture_dir, f'scale_{scale}_years_{args.years:g}')
+        start = time.perf_counter()
+        meta = make_fixture(fixture_dir, scale, args.years)
+        print(f"\nScale {scale}x: {meta['nrow']} x {meta['ncol']} grid, {meta['river_cells']:,} river cells, "
+              f"{meta['subbasins']} subbasins, {meta['ndays']:,} days "
+              f"(fixture ready in {time.perf_counter() - start:.1f} s)")
+        for entry in benchmark_fixture(fixture_dir, args.repeat, args.map_repeat):
+            entry.update({'scale': scale, 'years': args.years, 'nrow': meta['nrow'], 'ncol': meta['ncol'],
+                          'ndays': meta['ndays']})
+            results.append(entry)
+            print(f"   {entry['stage']:<24} min {entry['min'] * 1000:9.1f} ms   "
+                  f"median {entry['median'] * 1000:9.1f} ms")
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        for stage, scale, years, before, after in regressions:
+            print(f"✗ {stage} (scale {scale}x, {years:g} years): {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+        if not regressions:
+            print(f"✓ No stage slower than {args.compare} by more than {args.tolerance:.0%}")
+        return not regressions
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
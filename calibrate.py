@@ -0,0 +1,516 @@
+import argparse
+import csv
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from modflow_array_io import LineReader, find_package_file, load_dis_for, read_upw, scale_control_record
+from process_monitor import DEFAULT_CHECK_INTERVAL, DEFAULT_STALL_WINDOW
+from run_profiles import PROFILES, apply_profile
+from run_scenarios import create_work_dir
+from run_swatmodflow_with_log import stream_swat_modflow
+from sub_period import create_sub_period, fresh
+from swat_cio import read_cio_values, write_cio_values
+from swat_output_reader import read_swat_output, to_cube
+
+# Calibration and sensitivity runs. Parameter sets are sampled with a Latin
+# hypercube or a Morris (elementary effects) design, written into isolated
+# hard-linked work directories and run concurrently on a process pool. The
+# objectives are computed in memory from the run's outputs and the observed
+# series, vectorized over all sites at once.
+#
+# Config (JSON, paths relative to the config file):
+#
+# {
+#   "base_dir": ".",
+#   "work_root": "calibration_runs",
+#   "design": "lhs",               "lhs" or "morris"
+#   "samples": 64,                 LHS samples / Morris trajectories
+#   "levels": 4,                   Morris grid levels
+#   "seed": 1,
+#   "profile": "observations",     output profile (run_profiles.py)
+#   "window": {"start": "2010-01-01", "end": "2015-12-31", "warmup": 2},
+#   "parameters": [
+#     {"name": "hk", "type": "upw", "arrays": ["hk"], "min": 0.2, "max": 5.0, "log": true},
+#     {"name": "riv_cond", "type": "riv", "min": 0.1, "max": 10.0, "log": true},
+#     {"name": "gw_delay", "type": "gw", "field": "GW_DELAY", "method": "replace", "min": 1, "max": 120},
+#     {"name": "alpha_bf", "type": "gw", "field": "ALPHA_BF", "method": "replace", "min": 0.01, "max": 1}
+#   ],
+#   "objectives": [
+#     {"output": "heads", "observed": "observed_heads.csv", "metric": "kge", "weight": 0.5},
+#     {"output": "output.rch", "field": "FLOW_OUTcms", "observed": "observed_flow.csv",
+#      "metric": "nse", "weight": 0.5}
+#   ]
+# }
+#
+# upw and riv parameters are multipliers (of the array CNSTNT and of the
+# RIV conductance column); gw parameters replace or multiply a value in
+# every .gw file. Observed files are CSV with a header: the first column
+# is the output step (simulated day for heads, output period of output.rch
+# for reaches, 1-based), the others one site each - the observation cell
+# number (order of modflow.obs) or the reach number. Empty cells are
+# missing observations.
+#
+# Early stopping (LHS only; Morris needs every run): while a run is going,
+# its partial outputs are scored every check_interval seconds. Steps not
+# simulated yet add no error, so the partial NSE is an upper bound of the
+# final NSE (KGE is bounded by 1). A run whose bound is below the best
+# finished objective can no longer win and is terminated.
+
+DEFAULT_WORK_ROOT = 'calibration_runs'
+OBS_HEADS_FILE = 'swatmf_out_MF_obs'
+RESULTS_FILE = 'calibration_results.csv'
+SUMMARY_FILE = 'calibration_summary.json'
+
+_best = None  # shared best objective (multiprocessing.Value) in the workers
+
+
+# ---------------------------------------------------------------- designs
+
+def latin_hypercube(n, k, rng):
+    """(n, k) Latin hypercube sample of the unit cube"""
+    strata = (np.arange(n)[:, None] + rng.random((n, k))) / n
+    return rng.permuted(strata, axis=0)
+
+
+def morris_design(trajectories, k, levels, rng):
+    """
+    Morris one-at-a-time trajectories on a ``levels``-level grid
+
+    Returns a (trajectories * (k + 1), k) unit-cube sample: every
+    trajectory starts at a random grid point and moves one factor at a
+    time, in random order, by delta = levels / (2 (levels - 1)).
+    """
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    starts = grid[grid <= 1 - delta + 1e-12]
+    points = np.empty((trajectories, k + 1, k))
+    for t in range(trajectories):
+        x = rng.choice(starts, k)
+        points[t, 0] = x
+        for step, factor in enumerate(rng.permutation(k), start=1):
+            x = x.copy()
+            x[factor] += delta
+            points[t, step] = x
+    return points.reshape(-1, k)
+
+
+def morris_effects(unit, objective, k):
+    """
+    Mean absolute (mu*) and standard deviation (sigma) of the elementary effects
+
+    ``objective`` holds one value per row of the design (NaN for failed
+    runs, whose effects are left out).
+    """
+    points = unit.reshape(-1, k + 1, k)
+    values = np.asarray(objective, dtype=np.float64).reshape(-1, k + 1)
+    steps = np.diff(points, axis=1)                       # (trajectory, k, k)
+    factor = np.argmax(np.abs(steps), axis=2)             # factor moved at each step
+    delta = np.take_along_axis(steps, factor[..., None], axis=2)[..., 0]
+    effects = np.full((len(points), k), np.nan)
+    np.put_along_axis(effects, factor, np.diff(values, axis=1) / delta, axis=1)
+    return np.nanmean(np.abs(effects), axis=0), np.nanstd(effects, axis=0)
+
+
+def scale_unit(unit, parameters):
+    """Parameter values for unit-cube samples (log-uniform where 'log' is set)"""
+    low = np.array([p['min'] for p in parameters], dtype=np.float64)
+    high = np.array([p['max'] for p in parameters], dtype=np.float64)
+    log = np.array([bool(p.get('log')) for p in parameters])
+    linear = low + unit * (high - low)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logarithmic = np.exp(np.log(low) + unit * (np.log(high) - np.log(low)))
+    return np.where(log, logarithmic, linear)
+
+
+# ------------------------------------------------------------- parameters
+
+def _read_text_lines(path):
+    with open(path, 'r') as f:
+        return f.read().splitlines()
+
+
+def _write_text_lines(path, lines):
+    with open(fresh(path), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def scale_upw(source, target, factors):
+    """Write target as the UPW file source with arrays ({name: factor}) scaled"""
+    upw = read_upw(source, load_dis_for(source))
+    lines = _read_text_lines(source)
+    for name, factor in factors.items():
+        for line in upw['records'][name]:
+            if line is not None:
+                lines[line] = scale_control_record(lines[line], factor)
+    _write_text_lines(target, lines)
+
+
+def scale_riv_conductance(source, target, factor):
+    """Write target as the RIV file source with every conductance multiplied by factor"""
+    nper = load_dis_for(source)['nper']
+    reader = LineReader(source)
+    reader.skip_comments()
+    if reader.next_line().split()[0].upper() == 'PARAMETER':
+        raise ValueError(f"{source}: RIV parameters are not supported")
+    lines = list(reader.lines)
+    for _ in range(nper):
+        itmp = int(reader.next_line().split()[0])
+        for _ in range(max(itmp, 0)):
+            tokens = lines[reader.pos].split()
+            tokens[4] = f'{float(tokens[4]) * factor:.7g}'
+            lines[reader.pos] = '\t'.join(tokens)
+            reader.pos += 1
+    _write_text_lines(target, lines)
+
+
+def apply_parameters(base_dir, work_dir, parameters, values):
+    """Write the files of work_dir changed by one parameter set (read from base_dir)"""
+    upw_factors, riv_factor, gw_changes = {}, 1.0, []
+    for parameter, value in zip(parameters, values):
+        kind = parameter['type']
+        if kind == 'upw':
+            for name in parameter.get('arrays', ['hk']):
+                upw_factors[name] = upw_factors.get(name, 1.0) * value
+        elif kind == 'riv':
+            riv_factor *= value
+        elif kind == 'gw':
+            gw_changes.append((parameter['field'], parameter.get('method', 'replace'), value))
+        else:
+            raise ValueError(f"Unknown parameter type: {kind}")
+
+    bas = os.path.join(base_dir, 'modflow_GMRW.bas')
+    if upw_factors:
+        source = find_package_file(bas, 'UPW')
+        scale_upw(source, os.path.join(work_dir, os.path.basename(source)), upw_factors)
+    if riv_factor != 1.0:
+        source = find_package_file(bas, 'RIV')
+        scale_riv_conductance(source, os.path.join(work_dir, os.path.basename(source)), riv_factor)
+    if gw_changes:
+        for source in sorted(glob.glob(os.path.join(base_dir, '*.gw'))):
+            current = read_cio_values(source)
+            new = {}
+            for field, method, value in gw_changes:
+                base = float(new.get(field, current[field]))
+                new[field] = f'{value if method == "replace" else base * value:.4f}'
+            write_cio_values(source, new, fresh(os.path.join(work_dir, os.path.basename(source))))
+
+
+# ------------------------------------------------------------- objectives
+
+def nse(sim, obs):
+    """
+    Nash-Sutcliffe efficiency of every column of (step, site) arrays
+
+    The observed variance uses every observation, and steps without a
+    simulated value add no error - so for a partial run this is an upper
+    bound of the NSE the finished run can reach.
+    """
+    observed = ~np.isnan(obs)
+    mean = np.nanmean(np.where(observed, obs, np.nan), axis=0)
+    sst = np.nansum((obs - mean) ** 2, axis=0)
+    sse = np.nansum((sim - obs) ** 2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(sst > 0, 1.0 - sse / sst, np.nan)
+
+
+def kge(sim, obs):
+    """Kling-Gupta efficiency of every column of (step, site) arrays, paired steps only"""
+    paired = ~np.isnan(sim) & ~np.isnan(obs)
+    sim = np.where(paired, sim, np.nan)
+    obs = np.where(paired, obs, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sim_mean, obs_mean = np.nanmean(sim, axis=0), np.nanmean(obs, axis=0)
+        sim_std, obs_std = np.nanstd(sim, axis=0), np.nanstd(obs, axis=0)
+        r = np.nanmean((sim - sim_mean) * (obs - obs_mean), axis=0) / (sim_std * obs_std)
+        alpha = sim_std / obs_std
+        beta = sim_mean / obs_mean
+    return 1.0 - np.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2)
+
+
+METRICS = {'nse': nse, 'kge': kge}
+
+
+def read_observed(path):
+    """(steps, site ids, (step, site) values) of an observed-series CSV"""
+    with open(path, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    header, rows = rows[0], [row for row in rows[1:] if row]
+    steps = np.array([int(float(row[0])) for row in rows], dtype=np.int64)
+    values = np.array([[float(value) if value.strip() else np.nan for value in row[1:]] for row in rows],
+                      dtype=np.float64).reshape(len(rows), len(header) - 1)
+    return steps, [int(float(site)) for site in header[1:]], values
+
+
+def read_observation_heads(path):
+    """
+    (steps, (step, cell) heads) of the SWAT-MODFLOW observation-cell output
+
+    Header and cell-location lines are skipped: the data are the numeric
+    rows of the most common width. A leading column of increasing whole
+    numbers is taken as the step (day), otherwise rows count from 1.
+    """
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                rows.append([float(token) for token in line.split()])
+            except ValueError:
+                continue
+    rows = [row for row in rows if row]
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0))
+    width = np.bincount([len(row) for row in rows]).argmax()
+    data = np.array([row for row in rows if len(row) == width], dtype=np.float64)
+    first = data[:, 0]
+    if width > 1 and np.all(first == np.round(first)) and np.all(np.diff(first) > 0):
+        return first.astype(np.int64), data[:, 1:]
+    return np.arange(1, len(data) + 1), data
+
+
+def simulated_series(work_dir, objective):
+    """(steps, site ids, (step, site) values) simulated for an objective"""
+    output = objective['output']
+    if output == 'heads':
+        steps, heads = read_observation_heads(os.path.join(work_dir, objective.get('file', OBS_HEADS_FILE)))
+        return steps, np.arange(1, heads.shape[1] + 1), heads
+    table = read_swat_output(os.path.join(work_dir, output))
+    units, cube = to_cube(table, objective['field'])
+    return np.arange(1, len(cube) + 1), units.astype(np.int64), cube
+
+
+def align(sim_steps, sim_sites, sim_values, obs_steps, obs_sites):
+    """Simulated values at the observed (step, site) positions; NaN where not simulated"""
+    aligned = np.full((len(obs_steps), len(obs_sites)), np.nan)
+    if not len(sim_steps):
+        return aligned
+    step_pos = np.searchsorted(sim_steps, obs_steps).clip(0, len(sim_steps) - 1)
+    site_order = np.argsort(sim_sites)
+    site_pos = site_order[np.searchsorted(sim_sites, obs_sites, sorter=site_order).clip(0, len(sim_sites) - 1)]
+    rows = sim_steps[step_pos] == obs_steps
+    cols = np.asarray(sim_sites)[site_pos] == np.asarray(obs_sites)
+    aligned[np.ix_(rows, cols)] = sim_values[np.ix_(step_pos[rows], site_pos[cols])]
+    return aligned
+
+
+def evaluate(work_dir, objectives, complete=True):
+    """
+    Weighted objective of a run (mean over sites of each metric)
+
+    With complete=False the partial outputs of a running model are scored
+    and the result is an upper bound of the final objective.
+    """
+    scores = []
+    for objective in objectives:
+        try:
+            series = simulated_series(work_dir, objective)
+        except (OSError, ValueError, IndexError, KeyError):
+            if complete:
+                raise
+            scores.append(1.0)  # output not written (or readable) yet: no error so far
+            continue
+        sim = align(*series, objective['steps'], objective['sites'])
+        if complete or objective['metric'] == 'nse':
+            score = float(np.nanmean(METRICS[objective['metric']](sim, objective['values'])))
+        else:
+            score = 1.0
+        scores.append(score)
+    weights = np.array([objective.get('weight', 1.0) for objective in objectives])
+    return float(np.dot(weights, scores) / weights.sum()), scores
+
+
+# ---------------------------------------------------------------- running
+
+def read_calibration_config(config_file):
+    """Read a calibration config, resolving paths and loading the observed series"""
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+    config['base_dir'] = os.path.join(config_dir, config.get('base_dir', '.'))
+    config['work_root'] = os.path.join(config_dir, config.get('work_root', DEFAULT_WORK_ROOT))
+    config.setdefault('design', 'lhs')
+    config.setdefault('profile', 'observations')
+    if config['profile'] not in PROFILES:
+        raise ValueError(f"Unknown output profile: {config['profile']}")
+    for objective in config['objectives']:
+        if objective.get('metric', 'nse') not in METRICS:
+            raise ValueError(f"Unknown metric: {objective['metric']}")
+        objective.setdefault('metric', 'nse')
+        objective['steps'], objective['sites'], objective['values'] = read_observed(
+            os.path.join(config_dir, objective['observed']))
+    return config
+
+
+def _init_worker(best):
+    global _best
+    _best = best
+
+
+def run_sample(index, values, config, model_dir, early_stopping, keep_work_dir=False):
+    """Run and score one parameter set in its own work directory (pool worker)"""
+    work_dir = os.path.join(config['work_root'], f'sample_{index:04d}')
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    result = {'index': index, 'values': [float(value) for value in values], 'status': 'failed',
+              'objective': None, 'scores': None, 'reason': None}
+    objectives = config['objectives']
+
+    def check():
+        bound, _ = evaluate(work_dir, objectives, complete=False)
+        if bound < _best.value:
+            return f"objective bound {bound:.4f} below best {_best.value:.4f}"
+        return None
+
+    try:
+        create_work_dir(model_dir, work_dir)
+        apply_profile(work_dir, config['profile'])
+        apply_parameters(model_dir, work_dir, config['parameters'], values)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        run = stream_swat_modflow(os.path.join(work_dir, f'console_output_{stamp}.txt'), work_dir=work_dir,
+                                  quiet=True, stall_window=config.get('stall_window', DEFAULT_STALL_WINDOW),
+                                  stop_check=check if early_stopping else None,
+                                  check_interval=config.get('check_interval', DEFAULT_CHECK_INTERVAL))
+        result['duration_seconds'] = run['duration'].total_seconds()
+        result['simulated_days'] = run['simulated_days']
+        if run['stopped_early']:
+            result['status'] = 'stopped'
+            result['reason'] = run['resources']['stop_reason']
+        elif run['stalled'] or run['returncode'] != 0:
+            result['reason'] = run['resources']['stall_reason'] or f"exit code {run['returncode']}"
+        else:
+            result['objective'], result['scores'] = evaluate(work_dir, objectives)
+            result['status'] = 'ok'
+            if np.isfinite(result['objective']):
+                with _best.get_lock():
+                    _best.value = max(_best.value, result['objective'])
+    except Exception as e:
+        result['reason'] = str(e)
+    finally:
+        if not keep_work_dir and os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+    return result
+
+
+def write_results(results, parameters, objectives, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sample'] + [p['name'] for p in parameters] + ['status', 'objective']
+                        + [f"{o['output']}_{o['metric']}" for o in objectives] + ['duration_seconds', 'reason'])
+        for result in results:
+            scores = result['scores'] or [None] * len(objectives)
+            writer.writerow([result['index']] + [f'{value:.6g}' for value in result['values']]
+                            + [result['status'], result['objective']] + scores
+                            + [result.get('duration_seconds'), result['reason'] or ''])
+    return path
+
+
+def calibrate(config_file, workers=None, keep_work_dirs=False):
+    """
+    Sample, run and score the parameter sets of a calibration config
+
+    Returns the per-sample results; they are also written to
+    calibration_results.csv, with the best set (LHS) or the Morris
+    sensitivities in calibration_summary.json, in the work root.
+    """
+    config = read_calibration_config(config_file)
+    parameters = config['parameters']
+    rng = np.random.default_rng(config.get('seed'))
+    k = len(parameters)
+    morris = config['design'] == 'morris'
+    if morris:
+        unit = morris_design(config.get('samples', 10), k, config.get('levels', 4), rng)
+    else:
+        unit = latin_hypercube(config.get('samples', 10 * k), k, rng)
+    samples = scale_unit(unit, parameters)
+    early_stopping = config.get('early_stopping', True) and not morris
+    os.makedirs(config['work_root'], exist_ok=True)
+
+    model_dir = config['base_dir']
+    if config.get('window'):
+        window = config['window']
+        model_dir = os.path.join(config['work_root'], '_base')
+        if os.path.exists(model_dir):
+            shutil.rmtree(model_dir)
+        create_sub_period(config['base_dir'], model_dir, datetime.date.fromisoformat(window['start']),
+                          datetime.date.fromisoformat(window['end']), window.get('warmup', 0))
+
+    workers = workers or min(len(samples), os.cpu_count() or 1)
+    print(f"{config['design'].upper()} design: {len(samples)} runs of {k} parameters on {workers} workers"
+          f"{', early stopping' if early_stopping else ''}")
+
+    best = multiprocessing.Value('d', -np.inf)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(best,)) as pool:
+        futures = [pool.submit(run_sample, i, values, config, model_dir, early_stopping, keep_work_dirs)
+                   for i, values in enumerate(samples)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"✓ sample {result['index']:4d}: objective {result['objective']:.4f} "
+                      f"(best {best.value:.4f})")
+            else:
+                print(f"✗ sample {result['index']:4d}: {result['status']} - {result['reason']}")
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: result['index'])
+
+    if config.get('window') and not keep_work_dirs:
+        shutil.rmtree(model_dir)
+    write_results(results, parameters, config['objectives'], os.path.join(config['work_root'], RESULTS_FILE))
+
+    objective = np.array([np.nan if r['objective'] is None else r['objective'] for r in results])
+    summary = {'design': config['design'], 'runs': len(results), 'elapsed_seconds': elapsed,
+               'status': {status: sum(r['status'] == status for r in results) for status in ('ok', 'stopped', 'failed')}}
+    if morris:
+        mu_star, sigma = morris_effects(unit, objective, k)
+        summary['sensitivity'] = {p['name']: {'mu_star': float(m), 'sigma': float(s)}
+                                  for p, m, s in zip(parameters, mu_star, sigma)}
+    elif np.isfinite(objective).any():
+        best_result = results[int(np.nanargmax(objective))]
+        summary['best'] = {'sample': best_result['index'], 'objective': best_result['objective'],
+                           'parameters': {p['name']: v for p, v in zip(parameters, best_result['values'])}}
+    with open(os.path.join(config['work_root'], SUMMARY_FILE), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel calibration and sensitivity runs')
+    parser.add_argument('config', help='calibration config (JSON)')
+    parser.add_argument('--workers', type=int, default=None, help='parallel runs (default: number of cores)')
+    parser.add_argument('--keep-work-dirs', action='store_true')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SWAT-MODFLOW CALIBRATION")
+    print("="*70)
+    results, summary = calibrate(args.config, args.workers, args.keep_work_dirs)
+
+    status = summary['status']
+    print(f"\nRuns: {status['ok']} scored, {status['stopped']} stopped early, {status['failed']} failed "
+          f"in {summary['elapsed_seconds']:.0f} s")
+    if 'sensitivity' in summary:
+        print(f"\n{'Parameter':<16} {'mu*':>10} {'sigma':>10}")
+        ranked = sorted(summary['sensitivity'].items(), key=lambda item: -np.nan_to_num(item[1]['mu_star']))
+        for name, effect in ranked:
+            print(f"{name:<16} {effect['mu_star']:10.4g} {effect['sigma']:10.4g}")
+    elif 'best' in summary:
+        best = summary['best']
+        print(f"\n✓ Best: sample {best['sample']}, objective {best['objective']:.4f}")
+        for name, value in best['parameters'].items():
+            print(f"   {name:<16} {value:.6g}")
+    else:
+        print("\n✗ No run was scored")
+    return status['ok'] > 0
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,20 @@
+import argparse
+import glob
+import os
+import re
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
+
+from modflow_array_io import format_values, load_dis_for, read_bas, write_binary_array
+from swatmf_columnar import ColumnarStore, convert_block_file, is_up_to_date, DEFAULT_STORE_DIR
 
 def read_ibound_from_bas(bas_file):
     """
-    Read IBOUND array from MODFLOW BAS file
+    Read IBOUND array (layer 1) from MODFLOW BAS file
     """
-    with open(bas_file, 'r') as f:
-        lines = f.readlines()
-    
-    # Find the line with IBOUND
-    ibound_start = None
-    for i, line in enumerate(lines):
-        if 'IBOUND layer 1' in line:
-            ibound_start = i + 1
-            break
-    
-    if ibound_start is None:
-        raise ValueError("Could not find IBOUND in BAS file")
-    
-    # Read IBOUND array
-    ibound = []
-    for i in range(ibound_start, len(lines)):
-        line = lines[i].strip()
-        if line.startswith('#') or line.startswith('-999') or line.startswith('INTERNAL'):
-            break
-        if line:
-            values = [int(float(x)) for x in line.split()]
-            ibound.append(values)
-    
-    return np.array(ibound)
+    dis = load_dis_for(bas_file)
+    return read_bas(bas_file, dis)['ibound'][0]
 
 def create_recharge_array(ibound, recharge_rate=0.001):
     """
@@ -41,28 +26,186 @@ def create_recharge_array(ibound, recharge_rate=0.001):
     
     return recharge
 
-def write_rch_file(rch_file, recharge_array, irchcb=40):
+def _numeric_rows(path, min_columns):
+    """
+    Numeric rows of a SWAT-MODFLOW linkage file
+
+    Title, column-name and count lines (fewer than min_columns numbers)
+    are skipped, so the readers accept the files as written by the
+    different versions of the linkage tools.
+    """
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            tokens = line.replace(',', ' ').split()
+            if len(tokens) < min_columns:
+                continue
+            try:
+                rows.append([float(token) for token in tokens])
+            except ValueError:
+                continue
+    width = min(len(row) for row in rows) if rows else min_columns
+    return np.array([row[:width] for row in rows], dtype=np.float64).reshape(-1, width)
+
+def read_dhru_grid(dhru_grid_file='swatmf_dhru2grid.txt', columns=(0, 1, 2)):
+    """
+    Read the DHRU/grid cell intersections
+
+    Returns (cells, dhrus, areas): 1-based MODFLOW cell id, DHRU id and
+    intersected area of every intersection. ``columns`` gives the positions
+    of these three values in the data rows.
+    """
+    table = _numeric_rows(dhru_grid_file, max(columns) + 1)
+    cell, dhru, area = columns
+    return table[:, cell].astype(np.int64), table[:, dhru].astype(np.int64), table[:, area]
+
+def read_dhru_hru(dhru_hru_file='swatmf_dhru2hru.txt', columns=(0, 2)):
+    """
+    Read the DHRU -> HRU table
+
+    Returns a lookup array with the 1-based HRU of every DHRU id.
+    ``columns`` gives the positions of the DHRU and HRU ids in the rows.
+    """
+    table = _numeric_rows(dhru_hru_file, max(columns) + 1)
+    dhrus = table[:, columns[0]].astype(np.int64)
+    lookup = np.zeros(dhrus.max() + 1, dtype=np.int64)
+    lookup[dhrus] = table[:, columns[1]].astype(np.int64)
+    return lookup
+
+def read_hru_subbasins(model_dir='.'):
+    """
+    Subbasin and HRU_FR of every HRU, in SWAT order, from the .hru files
+    """
+    subbasins, fractions = [], []
+    for hru_file in sorted(glob.glob(os.path.join(model_dir, '[0-9]' * 9 + '.hru'))):
+        with open(hru_file, 'r') as f:
+            title = f.readline()
+            fraction = float(f.readline().split('|')[0])
+        match = re.search(r'Subbasin:\s*(\d+)', title)
+        subbasins.append(int(match.group(1)) if match else int(os.path.basename(hru_file)[:5]))
+        fractions.append(fraction)
+    return np.array(subbasins, dtype=np.int64), np.array(fractions)
+
+def build_hru_operator(model_dir='.', dhru_grid_file='swatmf_dhru2grid.txt',
+                       dhru_hru_file='swatmf_dhru2hru.txt'):
+    """
+    Sparse (cell x HRU) operator mapping HRU recharge depths to cells
+
+    With the DHRU linkage files, W[c, h] is the area of cell c covered by
+    the DHRUs of HRU h divided by the cell area, so a cell rate is the
+    area-weighted mean of the HRUs over it (as SWAT-MODFLOW maps it).
+    Without them the mapping is approximate: only HRU -> subbasin (HRU_FR)
+    is known exactly. Cells take the subbasin zones of build_subbasin_zones,
+    a heuristic that gives each active cell the subbasin of its nearest
+    river/drain cell, and W[c, h] is the HRU_FR of h in that subbasin, so
+    every cell of a zone gets the area-weighted subbasin mean.
+    Returns a CSR matrix of shape (nrow * ncol, nhru).
+    """
+    import scipy.sparse
+    from zone_budget import build_subbasin_zones
+    
+    bas_file = os.path.join(model_dir, 'modflow_GMRW.bas')
+    dis = load_dis_for(bas_file)
+    nrow, ncol = dis['nrow'], dis['ncol']
+    ncell = nrow * ncol
+    dhru_grid_file = os.path.join(model_dir, dhru_grid_file)
+    dhru_hru_file = os.path.join(model_dir, dhru_hru_file)
+
+    if os.path.exists(dhru_grid_file) and os.path.exists(dhru_hru_file):
+        cells, dhrus, areas = read_dhru_grid(dhru_grid_file)
+        hrus = read_dhru_hru(dhru_hru_file)[dhrus]
+        cell_area = np.outer(dis['delc'], dis['delr']).ravel()
+        weights = areas / cell_area[cells - 1]
+        return scipy.sparse.csr_matrix((weights, (cells - 1, hrus - 1)),
+                                       shape=(ncell, hrus.max()))
+
+    hru_subbasins, fractions = read_hru_subbasins(model_dir)
+    zones = build_subbasin_zones(model_dir).ravel()
+    # Pair every zoned cell with each HRU of its subbasin
+    order = np.argsort(hru_subbasins, kind='stable')
+    first = np.searchsorted(hru_subbasins[order], zones, side='left')
+    counts = np.searchsorted(hru_subbasins[order], zones, side='right') - first
+    counts[zones == 0] = 0
+    cell_index = np.repeat(np.arange(ncell), counts)
+    hru_index = order[np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+    return scipy.sparse.csr_matrix((fractions[hru_index], (cell_index, hru_index)),
+                                   shape=(ncell, len(hru_subbasins)))
+
+def read_hru_recharge(recharge_file='swatmf_out_SWAT_recharge_monthly', store_dir=DEFAULT_STORE_DIR):
+    """
+    Per-HRU recharge of every output period (mm, or mm/day for averages)
+
+    Reads through the columnar store of the file (built if needed).
+    Returns (periods, (nperiod, nhru) array).
+    """
+    if not is_up_to_date(recharge_file, store_dir):
+        convert_block_file(recharge_file, store_dir)
+    store = ColumnarStore(os.path.join(store_dir, os.path.basename(recharge_file)))
+    return store.query()
+
+def map_hru_recharge(hru_recharge, operator, ibound):
+    """
+    Map (nperiod, nhru) recharge in mm/day to (nperiod, nrow, ncol) in m/day
+
+    All periods go through the sparse operator in one product; inactive
+    cells get zero.
+    """
+    hru_recharge = np.asarray(hru_recharge, dtype=np.float64)
+    cells = operator.dot(hru_recharge.T).T * 0.001
+    recharge = cells.reshape((len(hru_recharge),) + ibound.shape)
+    recharge[:, ibound == 0] = 0.0
+    return recharge
+
+def write_rch_file(rch_file, recharge_array, irchcb=40, binary=False, value_fmt='%.6f'):
     """
     Write MODFLOW RCH file with spatially distributed recharge
+    
+    recharge_array is a single (nrow, ncol) array or an (nper, nrow, ncol)
+    stack with one array per stress period; periods identical to the
+    previous one reuse it (INRECH = -1). With binary=True each period's
+    array goes to an OPEN/CLOSE external file in MODFLOW binary form
+    (<rch stem>_rech_<kper>.bin) instead of being written as text with
+    value_fmt. Binary files of an earlier write of rch_file are removed
+    first, so no stale period files are left next to it.
     """
-    nrow, ncol = recharge_array.shape
+    recharge_array = np.asarray(recharge_array, dtype=float)
+    periods = recharge_array[np.newaxis] if recharge_array.ndim == 2 else recharge_array
+    rch_dir = os.path.dirname(os.path.abspath(rch_file))
+    stem = os.path.splitext(os.path.basename(rch_file))[0]
+    for old_file in glob.glob(os.path.join(glob.escape(rch_dir), f'{glob.escape(stem)}_rech_*.bin')):
+        os.remove(old_file)
     
     with open(rch_file, 'w') as f:
         f.write("# Great Miami River Watershed groundwater flow model\n")
         f.write("# Recharge (RCH) input file - mapped to IBOUND\n")
         f.write(f"3 {irchcb}\t\t\t\t# NRCHOP, IRCHCB\n")
-        f.write("0 0\n")
-        f.write("INTERNAL 1 (FREE) -1\t\t# RECH (L/T)\n")
         
-        # Write recharge array
-        for row in recharge_array:
-            line = ' '.join([f'{val:.6f}' for val in row])
-            f.write(line + '\n')
+        for kper, recharge in enumerate(periods, start=1):
+            if kper > 1 and np.array_equal(recharge, periods[kper - 2]):
+                f.write(f"-1 0\t\t\t\t# Stress period {kper}: reuse recharge\n")
+                continue
+            f.write("0 0\n" if len(periods) == 1 else f"0 0\t\t\t\t# Stress period {kper}\n")
+            
+            if binary:
+                bin_file = f'{stem}_rech_{kper:04d}.bin'
+                write_binary_array(os.path.join(rch_dir, bin_file), recharge,
+                                   kper=kper, text='RECHARGE')
+                f.write(f"OPEN/CLOSE {bin_file} 1.0 (BINARY) -1\t\t# RECH (L/T)\n")
+            else:
+                # Write recharge array (whole array formatted in one pass)
+                f.write("INTERNAL 1 (FREE) -1\t\t# RECH (L/T)\n")
+                f.write(format_values(recharge, value_fmt=value_fmt))
 
 def create_recharge_map(ibound, recharge_array, output_file='recharge_map.png'):
     """
     Create a visual map of recharge distribution with gray boundary
     """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as mcolors
+    from matplotlib.patches import Patch
+    
     fig, axes = plt.subplots(1, 3, figsize=(20, 6))
     
     # Plot 1: IBOUND map with gray boundary
@@ -132,7 +275,6 @@ def create_recharge_map(ibound, recharge_array, output_file='recharge_map.png'):
     ax3.set_ylabel('Row', fontsize=12)
     
     # Add legend
-    from matplotlib.patches import Patch
     legend_elements = [
         Patch(facecolor='gray', alpha=0.7, label=f'Inactive Boundary: {inactive:,} cells'),
         Patch(facecolor='lightblue', alpha=1.0, label=f'Active w/ Recharge: {rch_cells:,} cells')
@@ -157,12 +299,24 @@ def create_recharge_map(ibound, recharge_array, output_file='recharge_map.png'):
     print("✓ Map generation complete!")
 
 def main():
+    parser = argparse.ArgumentParser(description='Map recharge to the IBOUND array')
+    parser.add_argument('--rate', type=float, default=0.001,
+                        help='recharge rate for active cells (default: 0.001)')
+    parser.add_argument('--output', default='modflow_GMRW_mapped.rch', help='RCH file to write')
+    parser.add_argument('--binary', action='store_true',
+                        help='write recharge arrays as OPEN/CLOSE MODFLOW binary files')
+    parser.add_argument('--hru-recharge', metavar='FILE',
+                        help='map per-HRU SWAT recharge (e.g. swatmf_out_SWAT_recharge_monthly) '
+                             'to one stress period per output period instead of a constant rate')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+    
     # File paths
     bas_file = 'modflow_GMRW.bas'
-    rch_file_output = 'modflow_GMRW_mapped.rch'
+    rch_file_output = args.output
     
-    # Recharge rate (you can modify this value)
-    recharge_rate = 0.001  # m/day or appropriate units
+    # Recharge rate (m/day or appropriate units)
+    recharge_rate = args.rate
     
     print("Reading IBOUND from BAS file...")
     ibound = read_ibound_from_bas(bas_file)
@@ -170,17 +324,35 @@ def main():
     print(f"Active cells (IBOUND=1): {np.sum(ibound == 1)}")
     print(f"Inactive cells (IBOUND=0): {np.sum(ibound == 0)}")
     
-    print("\nCreating recharge array based on IBOUND...")
-    recharge_array = create_recharge_array(ibound, recharge_rate)
-    
-    print(f"Cells with recharge: {np.sum(recharge_array > 0)}")
-    print(f"Total recharge volume: {np.sum(recharge_array):.6f}")
-    
-    print(f"\nWriting new RCH file: {rch_file_output}")
-    write_rch_file(rch_file_output, recharge_array)
+    if args.hru_recharge:
+        print(f"\nMapping HRU recharge from {args.hru_recharge}...")
+        start = time.perf_counter()
+        operator = build_hru_operator()
+        periods, hru_recharge = read_hru_recharge(args.hru_recharge, args.store_dir)
+        recharge_periods = map_hru_recharge(hru_recharge, operator, ibound)
+        print(f"HRUs: {operator.shape[1]}, Stress periods: {len(periods)}, "
+              f"Cells with recharge: {np.sum(recharge_periods.max(axis=0) > 0)}")
+        
+        nper = load_dis_for(bas_file)['nper']
+        if nper != len(periods):
+            print(f"WARNING: DIS has {nper} stress periods, the recharge file {len(periods)}")
+        
+        print(f"\nWriting new RCH file: {rch_file_output}")
+        write_rch_file(rch_file_output, recharge_periods, binary=args.binary, value_fmt='%.6e')
+        print(f"✓ {len(periods)} stress periods written in {time.perf_counter() - start:.1f} s")
+        recharge_array = recharge_periods.mean(axis=0)
+    else:
+        print("\nCreating recharge array based on IBOUND...")
+        recharge_array = create_recharge_array(ibound, recharge_rate)
+        
+        print(f"Cells with recharge: {np.sum(recharge_array > 0)}")
+        print(f"Total recharge volume: {np.sum(recharge_array):.6f}")
+        
+        print(f"\nWriting new RCH file: {rch_file_output}")
+        write_rch_file(rch_file_output, recharge_array, binary=args.binary)
     
     print("\nDone! The new RCH file has been created.")
-    print("Replace 'modflow_GMRW.rch' with 'modflow_GMRW_mapped.rch' or rename it.")
+    print(f"Replace 'modflow_GMRW.rch' with '{rch_file_output}' or rename it.")
     
     # Print statistics
     print("\n--- Statistics ---")
@@ -188,9 +360,11 @@ def main():
     print(f"Max recharge: {np.max(recharge_array):.6f}")
     print(f"Mean recharge (non-zero cells): {np.mean(recharge_array[recharge_array > 0]):.6f}")
     
-    # Create visual recharge map
-    print("\n--- Creating Recharge Map ---")
-    create_recharge_map(ibound, recharge_array, 'GMRW_recharge_map.png')
+    # Create visual recharge map (constant-rate mapping only: the HRU maps
+    # would overwrite GMRW_recharge_map*.png of the IBOUND mapping)
+    if not args.hru_recharge:
+        print("\n--- Creating Recharge Map ---")
+        create_recharge_map(ibound, recharge_array, 'GMRW_recharge_map.png')
     
     print("\n" + "="*70)
     print("ALL TASKS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from modflow_array_io import (find_package_file, read_bas, read_dis, read_list_package, read_rch,
+                              read_upw)
+
+# Model inventory: the GMRW model inputs as typed arrays, parsed from text
+# once. Every part (DIS, BAS6, UPW, RCH, RIV, DRN, WEL, the swatmf_*.txt
+# linkage files, one table per SWAT input file type) is loaded the first
+# time it is accessed and saved as a .npz snapshot in .swatmf_inventory/;
+# later loads read the snapshot, in milliseconds, as long as the size and
+# mtime of every source file are unchanged. Parts nobody accesses are never
+# parsed.
+#
+#   from model_inventory import ModelInventory
+#   model = ModelInventory('.')
+#   ibound = model.bas['ibound'][0]
+#   gw_delay = model.swat('gw')['columns']['GW_DELAY']
+#
+#   python model_inventory.py              # build every snapshot, report load times
+#   python model_inventory.py --clear
+#
+# Parsed and snapshot parts are identical: scalars come back as Python
+# numbers, everything else as NumPy arrays (lists of strings too).
+
+DEFAULT_CACHE_DIR = '.swatmf_inventory'
+NAME_FILE = 'modflow.mfn'
+
+# Part name -> (MODFLOW file type, values per cell of a list package)
+MODFLOW_PARTS = {
+    'dis': ('DIS', None),
+    'bas': ('BAS6', None),
+    'upw': ('UPW', None),
+    'rch': ('RCH', None),
+    'riv': ('RIV', 3),    # stage, cond, rbot
+    'drn': ('DRN', 2),    # elevation, cond
+    'wel': ('WEL', 1),    # q
+}
+# Part name -> (linkage file, column names of its data rows)
+LINK_PARTS = {
+    'river_links': ('swatmf_river2grid.txt', None),
+    'drain_links': ('swatmf_drain2sub.txt', ('row', 'column', 'subbasin')),
+    'irrigation_links': ('swatmf_irrigate.txt', ('subbasin', 'row', 'column', 'layer', 'hru')),
+}
+SWAT_TYPES = ('hru', 'gw', 'mgt', 'sol', 'chm', 'sub', 'rte', 'swq', 'pnd', 'sep', 'sdr')
+PARTS = tuple(MODFLOW_PARTS) + tuple(LINK_PARTS) + tuple(f'swat_{ext}' for ext in SWAT_TYPES)
+
+
+def _flatten(data, prefix=''):
+    """{'a': {'b': x}} -> {'a/b': array(x)}"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}/'))
+        else:
+            flat[prefix + key] = np.asarray(value)
+    return flat
+
+
+def _unflatten(flat):
+    data = {}
+    for key, value in flat.items():
+        *parents, name = key.split('/')
+        target = data
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value.item() if value.ndim == 0 else value
+    return data
+
+
+def _numeric_rows(path, ncol):
+    """Data rows of a linkage file: the lines of exactly ncol numbers"""
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) == ncol:
+                try:
+                    rows.append([float(token) for token in tokens])
+                except ValueError:
+                    continue
+    return np.array(rows, dtype=np.float64).reshape(-1, ncol)
+
+
+def source_stamp(paths):
+    """[name, size, mtime_ns] of every source file: the snapshot key"""
+    stamp = []
+    for path in paths:
+        stat = os.stat(path)
+        stamp.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return stamp
+
+
+class ModelInventory:
+    """
+    Lazily loaded, snapshot-backed model inputs of one model directory
+
+    ``model['bas']`` or ``model.bas`` returns the part as a dict of arrays
+    (see PARTS); ``model.swat('gw')`` returns the table of one SWAT input
+    file type. Parts are kept in memory once loaded.
+    """
+
+    def __init__(self, model_dir='.', cache_dir=None):
+        self.model_dir = model_dir
+        self.cache_dir = cache_dir or os.path.join(model_dir, DEFAULT_CACHE_DIR)
+        self._parts = {}
+        self.loaded_from = {}  # part -> 'snapshot' or 'source'
+
+    def __getattr__(self, name):
+        if name in MODFLOW_PARTS or name in LINK_PARTS:
+            return self[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, part):
+        if part not in PARTS:
+            raise KeyError(f"Unknown inventory part: {part}")
+        if part in self._parts:
+            return self._parts[part]
+
+        stamp = source_stamp(self.sources(part))
+        snapshot = os.path.join(self.cache_dir, f'{part}.npz')
+        data = self._read_snapshot(snapshot, stamp)
+        self.loaded_from[part] = 'snapshot'
+        if data is None:
+            data = _unflatten(_flatten(self._parse(part)))
+            self._write_snapshot(snapshot, data, stamp)
+            self.loaded_from[part] = 'source'
+        self._parts[part] = data
+        return data
+
+    def swat(self, ext):
+        """Table of one SWAT input file type (see swat_input_editor.py)"""
+        return self[f'swat_{ext.lower().lstrip(".")}']
+
+    def _package_file(self, ftype):
+        return find_package_file(os.path.join(self.model_dir, NAME_FILE), ftype)
+
+    def sources(self, part):
+        """Paths of the files a part is parsed from"""
+        if part in MODFLOW_PARTS:
+            files = [os.path.join(self.model_dir, NAME_FILE), self._package_file('DIS')]
+            if part != 'dis':
+                files.append(self._package_file(MODFLOW_PARTS[part][0]))
+            return files
+        if part in LINK_PARTS:
+            return [os.path.join(self.model_dir, LINK_PARTS[part][0])]
+        from swat_input_editor import list_input_files
+        return [os.path.join(self.model_dir, name) for name in list_input_files(self.model_dir, part[5:])]
+
+    def _parse(self, part):
+        if part == 'dis':
+            return read_dis(self._package_file('DIS'))
+        if part in MODFLOW_PARTS:
+            ftype, nvalues = MODFLOW_PARTS[part]
+            path = self._package_file(ftype)
+            if nvalues:
+                return read_list_package(path, self.dis, nvalues)
+            if part == 'bas':
+                return read_bas(path, self.dis)
+            if part == 'upw':
+                upw = read_upw(path, self.dis)
+                del upw['records']  # line numbers for editing, not model data
+                return upw
+            return read_rch(path, self.dis)
+        if part == 'river_links':
+            from swatmf_aggregate import read_river_links
+            cells, subbasins, lengths = read_river_links(os.path.join(self.model_dir, LINK_PARTS[part][0]))
+            return {'cells': cells, 'subbasins': subbasins, 'lengths': lengths}
+        if part in LINK_PARTS:
+            file, columns = LINK_PARTS[part]
+            rows = _numeric_rows(os.path.join(self.model_dir, file), len(columns))
+            return {column: rows[:, i].astype(np.int64) for i, column in enumerate(columns)}
+
+        from swat_input_editor import read_inputs
+        table = read_inputs(self.model_dir, part[5:])
+        return {
+            'files': np.array(table.files),
+            'subbasin': table.subbasin,
+            'hru': table.hru,
+            'luse': table.luse,
+            'soil': table.soil,
+            'slope': table.slope,
+            'columns': table.columns,
+        }
+
+    @staticmethod
+    def _read_snapshot(path, stamp):
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if json.loads(npz['_sources'].item()) != stamp:
+                    return None
+                return _unflatten({key: npz[key] for key in npz.files if key != '_sources'})
+        except (OSError, ValueError, KeyError):
+            return None  # unreadable snapshot: parse again
+
+    def _write_snapshot(self, path, data, stamp):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, _sources=np.array(json.dumps(stamp)), **_flatten(data))
+        os.replace(tmp_file, path)
+
+    def load_all(self, parts=PARTS):
+        """Load every part whose source files exist; returns {part: seconds}"""
+        times = {}
+        for part in parts:
+            try:
+                sources = self.sources(part)
+            except (OSError, ValueError):
+                continue
+            if not sources or not all(os.path.exists(path) for path in sources):
+                continue
+            start = time.perf_counter()
+            self[part]
+            times[part] = time.perf_counter() - start
+        return times
+
+    def clear(self):
+        """Remove the snapshots and forget the loaded parts"""
+        self._parts.clear()
+        removed = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cached model inventory (typed arrays of the model inputs)')
+    parser.add_argument('parts', nargs='*', metavar='PART',
+                        help=f'parts to load (default: all): {", ".join(PARTS)}')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--cache-dir', default=None, help=f'default: <model dir>/{DEFAULT_CACHE_DIR}')
+    parser.add_argument('--clear', action='store_true', help='remove the snapshots')
+    args = parser.parse_args()
+
+    model = ModelInventory(args.model_dir, args.cache_dir)
+    print("="*70)
+    print("MODEL INVENTORY")
+    print("="*70)
+    if args.clear:
+        print(f"✓ {model.clear()} snapshots removed from {model.cache_dir}")
+        return True
+
+    unknown = [part for part in args.parts if part not in PARTS]
+    if unknown:
+        print(f"✗ Unknown parts: {', '.join(unknown)}")
+        return False
+    times = model.load_all(args.parts or PARTS)
+    for part, seconds in times.items():
+        size = os.path.getsize(os.path.join(model.cache_dir, f'{part}.npz')) / 1024
+        print(f"✓ {part:<18} {seconds * 1000:8.1f} ms  from {model.loaded_from[part]:<8}  {size:8.0f} KB")
+    total = sum(times.values())
+    print(f"\n{len(times)} parts loaded in {total * 1000:.0f} ms; snapshots in {model.cache_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
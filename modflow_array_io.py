@@ -0,0 +1,596 @@
+import os
+import re
+
+import numpy as np
+
+# Array readers/writers following the MODFLOW-2005 array control records
+# (U2DREL/U2DINT): CONSTANT, INTERNAL, EXTERNAL and OPEN/CLOSE, in FREE,
+# Fortran fixed (e.g. (213F10.2), (20I4), (1P10E12.4)) or BINARY format.
+# Whole arrays are decoded with a single NumPy call rather than per value.
+
+_CONTROL_KEYWORDS = ('CONSTANT', 'INTERNAL', 'EXTERNAL', 'OPEN/CLOSE')
+_FIXED_FORMAT_RE = re.compile(r'^\(\s*(?:\d*P\s*,?\s*)?(\d*)\s*([FEGDI])(\d+)(?:\.(\d+))?\s*\)$', re.IGNORECASE)
+
+# Header record of a MODFLOW binary array: KSTP, KPER, PERTIM, TOTIM, TEXT,
+# NCOL, NROW, ILAY (single precision, as written by this MODFLOW-NWT build)
+BINARY_HEADER_DTYPE = np.dtype([
+    ('kstp', '<i4'), ('kper', '<i4'), ('pertim', '<f4'), ('totim', '<f4'),
+    ('text', 'S16'), ('ncol', '<i4'), ('nrow', '<i4'), ('ilay', '<i4'),
+])
+
+
+class LineReader:
+    """
+    Sequential line reader over a MODFLOW package file
+
+    Keeps the whole (small) package file in memory and a cursor into it, so
+    array blocks can be sliced out and decoded in one call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.model_dir = os.path.dirname(os.path.abspath(path))
+        with open(path, 'r', errors='replace') as f:
+            self.lines = f.read().splitlines()
+        self.pos = 0
+
+    def skip_comments(self):
+        while self.pos < len(self.lines) and self.lines[self.pos].lstrip().startswith('#'):
+            self.pos += 1
+
+    def next_line(self):
+        if self.pos >= len(self.lines):
+            raise ValueError(f"Unexpected end of file in {self.path}")
+        line = self.lines[self.pos]
+        self.pos += 1
+        return line
+
+    def next_tokens(self, count):
+        """Read at least count whitespace/comma separated tokens (spanning lines)"""
+        tokens = []
+        while len(tokens) < count:
+            tokens.extend(self.next_line().replace(',', ' ').split())
+        return tokens[:count]
+
+    def take_lines(self, count):
+        lines = self.lines[self.pos:self.pos + count]
+        if len(lines) < count:
+            raise ValueError(f"Unexpected end of file in {self.path}")
+        self.pos += count
+        return lines
+
+    def take_values_lines(self, count):
+        """Consume the lines that hold the next count free-format values"""
+        start = self.pos
+        found = 0
+        while found < count:
+            tokens = self.next_line().replace(',', ' ').split()
+            found += len(tokens)
+            for token in tokens:
+                if '*' in token:
+                    # r*value stands for r values
+                    found += int(token.split('*', 1)[0]) - 1
+        return self.lines[start:self.pos]
+
+
+def read_name_file(name_file):
+    """Read a MODFLOW name file into {unit: (file type, file name)}"""
+    units = {}
+    with open(name_file, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#') or len(parts) < 3:
+                continue
+            units[int(parts[1])] = (parts[0].upper(), parts[2])
+    return units
+
+
+def find_package_file(model_file, ftype, name_file='modflow.mfn'):
+    """
+    Locate the file of package ftype (e.g. 'DIS') belonging to model_file
+
+    Uses the name file next to model_file if there is one, otherwise the
+    file with the same stem and the package extension.
+    """
+    model_dir = os.path.dirname(os.path.abspath(model_file))
+    name_path = os.path.join(model_dir, name_file)
+    if os.path.exists(name_path):
+        for file_type, fname in read_name_file(name_path).values():
+            if file_type == ftype.upper():
+                return os.path.join(model_dir, fname)
+    stem = os.path.splitext(model_file)[0]
+    return stem + '.' + ftype.lower()
+
+
+def _split_format(text):
+    """Split '(fmt) rest' into ('(fmt)', 'rest') with balanced parentheses"""
+    text = text.strip()
+    if not text.startswith('('):
+        parts = text.split(None, 1)
+        return parts[0], (parts[1] if len(parts) > 1 else '')
+    depth = 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return text[:i + 1], text[i + 1:]
+    return text, ''
+
+
+def parse_control_record(line, integer=False):
+    """
+    Parse an array control record
+
+    Returns a dict with 'kind' ('constant', 'internal', 'external' or
+    'open/close'), 'cnstnt', 'fmt', 'iprn' and, for external data, 'unit'
+    or 'fname'. Fixed-format records (LOCAT CNSTNT FMTIN IPRN in 10/10/20/10
+    columns) are returned with kind 'locat' and the LOCAT value in 'unit'.
+    """
+    def convert(text):
+        value = float(text)
+        return int(value) if integer else value
+
+    parts = line.split(None, 1)
+    keyword = parts[0].upper() if parts else ''
+
+    if keyword in _CONTROL_KEYWORDS:
+        rest = parts[1] if len(parts) > 1 else ''
+        record = {'kind': keyword.lower(), 'fmt': '(FREE)', 'iprn': 0}
+        if keyword == 'CONSTANT':
+            record['cnstnt'] = convert(rest.split()[0])
+            return record
+        if keyword == 'EXTERNAL':
+            unit, rest = rest.split(None, 1)
+            record['unit'] = int(unit)
+        elif keyword == 'OPEN/CLOSE':
+            fname, rest = rest.split(None, 1)
+            record['fname'] = fname.strip('\'"')
+        cnstnt, rest = (rest.split(None, 1) + [''])[:2]
+        record['cnstnt'] = convert(cnstnt)
+        if rest.strip():
+            record['fmt'], rest = _split_format(rest)
+            iprn = rest.split()
+            if iprn:
+                try:
+                    record['iprn'] = int(iprn[0])
+                except ValueError:
+                    pass
+        return record
+
+    # Fixed-format control record
+    padded = line.ljust(50)
+    locat = int(padded[0:10])
+    cnstnt = padded[10:20].strip() or '0'
+    iprn = padded[40:50].strip()
+    return {
+        'kind': 'locat',
+        'unit': locat,
+        'cnstnt': convert(cnstnt),
+        'fmt': padded[20:40].strip() or '(FREE)',
+        'iprn': int(iprn) if iprn else 0,
+    }
+
+
+def _is_free(fmt):
+    return fmt.strip().upper() in ('(FREE)', 'FREE', '*', '')
+
+
+def _is_binary(fmt):
+    return fmt.strip().upper() in ('(BINARY)', 'BINARY')
+
+
+def parse_fixed_format(fmt):
+    """Return (values per line, field width) of a simple Fortran format"""
+    match = _FIXED_FORMAT_RE.match(fmt.strip())
+    if not match:
+        raise ValueError(f"Unsupported array format: {fmt}")
+    count = int(match.group(1) or 1)
+    return count, int(match.group(3))
+
+
+def _free_values(lines, n, dtype):
+    text = ' '.join(lines)
+    if ',' in text:
+        text = text.replace(',', ' ')
+    if '*' in text:
+        # Fortran list-directed repeat counts: r*value
+        tokens = []
+        for token in text.split():
+            if '*' in token:
+                repeat, value = token.split('*', 1)
+                tokens.extend([value] * int(repeat))
+            else:
+                tokens.append(token)
+        values = np.array(tokens[:n], dtype=np.float64)
+    else:
+        values = np.fromstring(text, dtype=np.float64, sep=' ')
+    if values.size < n:
+        raise ValueError(f"Expected {n} values, found {values.size}")
+    return values[:n].astype(dtype)
+
+
+def _fixed_values(lines, n, fmt, dtype):
+    count, width = parse_fixed_format(fmt)
+    line_width = count * width
+    buffer = ''.join(line[:line_width].ljust(line_width) for line in lines).encode('ascii')
+    fields = np.frombuffer(buffer, dtype=f'S{width}')[:n]
+    try:
+        values = fields.astype(np.float64)
+    except ValueError:
+        # Blank fields read as zero; Fortran D exponents
+        fields = np.char.strip(fields)
+        fields = np.char.replace(fields, b'D', b'E')
+        fields = np.char.replace(fields, b'd', b'E')
+        fields[fields == b''] = b'0'
+        values = fields.astype(np.float64)
+    return values.astype(dtype)
+
+
+def _fixed_line_count(n, fmt):
+    count, _ = parse_fixed_format(fmt)
+    return -(-n // count)
+
+
+def read_binary_array(path, shape, dtype=np.float32, offset=0):
+    """
+    Read one MODFLOW binary array (header record + data) from path
+
+    Handles both sequential unformatted files (4-byte record markers) and
+    stream/binary access files. Returns (array, header, end offset).
+    """
+    dtype = np.dtype(dtype).newbyteorder('<')
+    n = int(np.prod(shape))
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        head = f.read(4)
+        markers = np.frombuffer(head, '<i4')[0] == BINARY_HEADER_DTYPE.itemsize
+        f.seek(offset + (4 if markers else 0))
+        header = np.frombuffer(f.read(BINARY_HEADER_DTYPE.itemsize), BINARY_HEADER_DTYPE)[0]
+        if markers:
+            f.seek(8, os.SEEK_CUR)
+        data = np.frombuffer(f.read(n * dtype.itemsize), dtype)
+        if data.size < n:
+            raise ValueError(f"Binary array in {path} is truncated")
+        end = f.tell() + (4 if markers else 0)
+    return data.reshape(shape), header, end
+
+
+def read_array(reader, shape, dtype=np.float64, units=None):
+    """
+    Read one array (control record + data) from a LineReader
+
+    ``units`` maps unit numbers to file names for EXTERNAL arrays (see
+    read_name_file). Returns an ndarray of the requested shape.
+    """
+    integer = np.issubdtype(np.dtype(dtype), np.integer)
+    record = parse_control_record(reader.next_line(), integer=integer)
+    n = int(np.prod(shape))
+    kind = record['kind']
+
+    if kind == 'locat':
+        if record['unit'] == 0:
+            kind = 'constant'
+        elif units is not None and record['unit'] in units:
+            kind = 'external'
+            if record['unit'] < 0:
+                record['fmt'] = '(BINARY)'
+        else:
+            # Data follows on the unit being read
+            kind = 'internal'
+
+    if kind == 'constant':
+        return np.full(shape, record['cnstnt'], dtype=dtype)
+
+    fmt = record['fmt']
+    if kind == 'internal':
+        if _is_free(fmt):
+            values = _free_values(reader.take_values_lines(n), n, dtype)
+        else:
+            values = _fixed_values(reader.take_lines(_fixed_line_count(n, fmt)), n, fmt, dtype)
+    else:
+        if kind == 'open/close':
+            path = os.path.join(reader.model_dir, record['fname'])
+        else:
+            if units is None or abs(record['unit']) not in units:
+                raise ValueError(f"Unit {record['unit']} is not in the name file")
+            path = os.path.join(reader.model_dir, units[abs(record['unit'])][1])
+        if _is_binary(fmt):
+            values, _, _ = read_binary_array(path, (n,), np.int32 if integer else np.float32)
+            values = values.astype(dtype)
+        else:
+            external = LineReader(path)
+            if _is_free(fmt):
+                values = _free_values(external.take_values_lines(n), n, dtype)
+            else:
+                values = _fixed_values(external.take_lines(_fixed_line_count(n, fmt)), n, fmt, dtype)
+
+    if record['cnstnt']:
+        values = values * record['cnstnt']
+    return values.astype(dtype, copy=False).reshape(shape)
+
+
+def read_layered_array(reader, nlay, nrow, ncol, dtype=np.float64, units=None):
+    """Read one 2D array per layer into an (nlay, nrow, ncol) array"""
+    array = np.empty((nlay, nrow, ncol), dtype=dtype)
+    for k in range(nlay):
+        array[k] = read_array(reader, (nrow, ncol), dtype, units)
+    return array
+
+
+def format_values(array, fmt='(FREE)', value_fmt=None, ncol=None):
+    """
+    Format array values as MODFLOW array text
+
+    FREE output writes one row of ``ncol`` values per line with
+    ``value_fmt`` ('%.6f' for reals, '%d' for integers by default); a
+    fixed format such as '(213F10.2)' writes fixed-width fields. The whole
+    array is formatted with a single %-operation.
+    """
+    array = np.asarray(array)
+    integer = np.issubdtype(array.dtype, np.integer)
+    flat = array.ravel()
+    if _is_free(fmt):
+        count = ncol or (array.shape[-1] if array.ndim > 1 else flat.size)
+        field = value_fmt or ('%d' if integer else '%.6f')
+        separator = ' '
+    else:
+        count, width = parse_fixed_format(fmt)
+        match = _FIXED_FORMAT_RE.match(fmt.strip())
+        kind, decimals = match.group(2).upper(), match.group(4)
+        if kind == 'I':
+            field = f'%{width}d'
+        elif kind == 'F':
+            field = f'%{width}.{decimals or 0}f'
+        else:
+            field = f'%{width}.{decimals or 4}E'
+        separator = ''
+        flat = flat.astype(np.int64 if kind == 'I' else np.float64)
+
+    values = flat.tolist()
+    full = len(values) // count * count
+    line = separator.join([field] * count) + '\n'
+    text = (line * (full // count)) % tuple(values[:full])
+    if full < len(values):
+        text += separator.join([field] * (len(values) - full)) % tuple(values[full:]) + '\n'
+    return text
+
+
+def scale_control_record(line, factor):
+    """
+    An array control record whose array is multiplied by factor
+
+    The multiplier (CNSTNT, or the value of a CONSTANT record) is changed;
+    the data lines stay as they are. CNSTNT 0 means no multiplier in
+    MODFLOW and is treated as 1.
+    """
+    record = parse_control_record(line)
+    cnstnt = (record['cnstnt'] or (0.0 if record['kind'] == 'constant' else 1.0)) * factor
+    if record['kind'] == 'locat':
+        padded = line.ljust(20)
+        return padded[:10] + f'{cnstnt:10.4G}' + padded[20:].rstrip()
+    position = {'constant': 1, 'internal': 1, 'external': 2, 'open/close': 2}[record['kind']]
+    parts = line.split(None, position + 1)
+    parts[position] = f'{cnstnt:.6G}'
+    return '  '.join(parts)
+
+
+def write_array(f, array, fmt='(FREE)', cnstnt=None, iprn=-1, comment='', value_fmt=None):
+    """
+    Write one array (control record + data) to an open text file
+
+    Uniform arrays are written as CONSTANT records, everything else as
+    INTERNAL with the values formatted by format_values.
+    """
+    array = np.asarray(array)
+    integer = np.issubdtype(array.dtype, np.integer)
+    suffix = f'\t\t# {comment}' if comment else ''
+    if array.size and np.all(array == array.flat[0]):
+        value = array.flat[0]
+        f.write(f"CONSTANT {int(value) if integer else repr(float(value))}{suffix}\n")
+        return
+    if cnstnt is None:
+        cnstnt = 1 if integer else 1.0
+    f.write(f"INTERNAL {cnstnt} {fmt} {iprn}{suffix}\n")
+    f.write(format_values(array, fmt, value_fmt))
+
+
+def write_binary_record(f, array, kstp=1, kper=1, pertim=1.0, totim=1.0, text='', ilay=1,
+                        record_markers=True):
+    """
+    Write one MODFLOW binary array record (header + data) to an open file
+
+    The header record holds KSTP, KPER, PERTIM, TOTIM, TEXT, NCOL, NROW and
+    ILAY; data are single precision reals (or 4-byte integers). Sequential
+    unformatted record markers are written by default, matching this
+    MODFLOW-NWT build (see fort.40).
+    """
+    array = np.asarray(array)
+    nrow, ncol = array.shape
+    header = np.zeros(1, BINARY_HEADER_DTYPE)
+    header['kstp'], header['kper'] = kstp, kper
+    header['pertim'], header['totim'] = pertim, totim
+    header['text'] = text.rjust(16)[:16].encode('ascii')
+    header['ncol'], header['nrow'], header['ilay'] = ncol, nrow, ilay
+    dtype = '<i4' if np.issubdtype(array.dtype, np.integer) else '<f4'
+    data = np.ascontiguousarray(array, dtype=dtype)
+
+    for block in (header.tobytes(), data.tobytes()):
+        if record_markers:
+            marker = np.array([len(block)], '<i4').tobytes()
+            f.write(marker + block + marker)
+        else:
+            f.write(block)
+
+
+def write_binary_array(path, array, kstp=1, kper=1, pertim=1.0, totim=1.0, text='', ilay=1,
+                       record_markers=True):
+    """Write a 2D array as a MODFLOW binary array file (see write_binary_record)"""
+    with open(path, 'wb') as f:
+        write_binary_record(f, array, kstp, kper, pertim, totim, text, ilay, record_markers)
+
+
+def _read_free_ints(reader, count):
+    return [int(float(token)) for token in reader.next_tokens(count)]
+
+
+def read_dis(dis_file, units=None):
+    """
+    Read a DIS file: dimensions, DELR/DELC, TOP/BOTM and stress periods
+    """
+    reader = LineReader(dis_file)
+    reader.skip_comments()
+    nlay, nrow, ncol, nper, itmuni, lenuni = _read_free_ints(reader, 6)
+    laycbd = np.array(_read_free_ints(reader, nlay), dtype=int)
+
+    dis = {
+        'nlay': nlay, 'nrow': nrow, 'ncol': ncol, 'nper': nper,
+        'itmuni': itmuni, 'lenuni': lenuni, 'laycbd': laycbd,
+    }
+    dis['delr'] = read_array(reader, (ncol,), np.float64, units)
+    dis['delc'] = read_array(reader, (nrow,), np.float64, units)
+    dis['top'] = read_array(reader, (nrow, ncol), np.float64, units)
+    dis['botm'] = read_layered_array(reader, nlay + int(laycbd.sum()), nrow, ncol, np.float64, units)
+
+    perlen, nstp, tsmult, steady = [], [], [], []
+    for _ in range(nper):
+        tokens = reader.next_line().split()
+        perlen.append(float(tokens[0]))
+        nstp.append(int(tokens[1]))
+        tsmult.append(float(tokens[2]))
+        steady.append(tokens[3].upper() == 'SS')
+    dis['perlen'] = np.array(perlen)
+    dis['nstp'] = np.array(nstp, dtype=int)
+    dis['tsmult'] = np.array(tsmult)
+    dis['steady'] = np.array(steady, dtype=bool)
+    return dis
+
+
+def read_bas(bas_file, dis, units=None):
+    """Read a BAS6 file: IBOUND, HNOFLO and STRT for every layer"""
+    reader = LineReader(bas_file)
+    reader.skip_comments()
+    options = reader.next_line().upper().split()
+    nlay, nrow, ncol = dis['nlay'], dis['nrow'], dis['ncol']
+
+    ibound = read_layered_array(reader, nlay, nrow, ncol, np.int32, units)
+    line = reader.next_line()
+    hnoflo = float(line.split()[0]) if 'FREE' in options else float(line[:10])
+    strt = read_layered_array(reader, nlay, nrow, ncol, np.float64, units)
+    return {'options': options, 'ibound': ibound, 'hnoflo': hnoflo, 'strt': strt}
+
+
+def read_upw(upw_file, dis, units=None):
+    """Read the layer flags and property arrays (HK, HANI, VKA, SS, SY) of a UPW file"""
+    reader = LineReader(upw_file)
+    reader.skip_comments()
+    tokens = reader.next_line().split()
+    iupwcb, hdry, npupw = int(tokens[0]), float(tokens[1]), int(tokens[2])
+    if npupw > 0:
+        raise ValueError("UPW parameters are not supported")
+
+    nlay, nrow, ncol = dis['nlay'], dis['nrow'], dis['ncol']
+    upw = {'iupwcb': iupwcb, 'hdry': hdry}
+    for flag in ('laytyp', 'layavg', 'chani', 'layvka', 'laywet'):
+        values = reader.next_tokens(nlay)
+        upw[flag] = np.array(values, dtype=float if flag == 'chani' else int)
+
+    transient = not np.all(dis['steady'])
+    shape = (nlay, nrow, ncol)
+    names = ('hk', 'hani', 'vka', 'ss', 'sy', 'vkcb')
+    for name in names:
+        upw[name] = np.full(shape, np.nan)
+    # Line index of the control record of every array read, per layer
+    upw['records'] = {name: [None] * nlay for name in names}
+
+    def read_layer(name, k):
+        upw['records'][name][k] = reader.pos
+        upw[name][k] = read_array(reader, (nrow, ncol), np.float64, units)
+
+    for k in range(nlay):
+        read_layer('hk', k)
+        if upw['chani'][k] <= 0:
+            read_layer('hani', k)
+        read_layer('vka', k)
+        if transient:
+            read_layer('ss', k)
+            if upw['laytyp'][k] != 0:
+                read_layer('sy', k)
+        if dis['laycbd'][k]:
+            read_layer('vkcb', k)
+    return upw
+
+
+def read_rch(rch_file, dis, units=None):
+    """
+    Read a RCH file: NRCHOP, IRCHCB and the recharge array of every stress period
+
+    Returns 'rech' as an (nper, nrow, ncol) array; periods with INRECH < 0
+    reuse the previous period's array.
+    """
+    reader = LineReader(rch_file)
+    reader.skip_comments()
+    tokens = reader.next_line().split()
+    if tokens[0].upper() == 'PARAMETER':
+        raise ValueError("RCH parameters are not supported")
+    nrchop, irchcb = int(tokens[0]), int(tokens[1])
+
+    nper, nrow, ncol = dis['nper'], dis['nrow'], dis['ncol']
+    rech = np.zeros((nper, nrow, ncol))
+    irch = np.ones((nper, nrow, ncol), dtype=np.int32)
+    for kper in range(nper):
+        tokens = reader.next_line().split()
+        inrech = int(tokens[0])
+        inirch = int(tokens[1]) if len(tokens) > 1 else -1
+        if inrech >= 0:
+            rech[kper] = read_array(reader, (nrow, ncol), np.float64, units)
+        elif kper > 0:
+            rech[kper] = rech[kper - 1]
+        if nrchop == 2:
+            if inirch >= 0:
+                irch[kper] = read_array(reader, (nrow, ncol), np.int32, units)
+            elif kper > 0:
+                irch[kper] = irch[kper - 1]
+    return {'nrchop': nrchop, 'irchcb': irchcb, 'rech': rech, 'irch': irch}
+
+
+def read_list_package(package_file, dis, nvalues):
+    """
+    Read a list-based package (RIV, DRN, WEL, GHB): Layer Row Column and
+    ``nvalues`` values per cell, for every stress period
+
+    Returns 'cells' (n, 3) 1-based layer/row/column, 'values' (n, nvalues)
+    and 'period' (n,) 0-based stress period of every row; periods with
+    ITMP < 0 repeat the previous period's rows. Auxiliary values are
+    dropped.
+    """
+    reader = LineReader(package_file)
+    reader.skip_comments()
+    tokens = reader.next_line().split()
+    if tokens[0].upper() == 'PARAMETER':
+        raise ValueError(f"{package_file}: parameters are not supported")
+    mxact, ipcb = int(tokens[0]), int(tokens[1])
+
+    rows, periods = [], []
+    previous = []
+    for kper in range(dis['nper']):
+        itmp = int(reader.next_line().split()[0])
+        if itmp >= 0:
+            previous = [line.split()[:3 + nvalues] for line in reader.take_lines(itmp)]
+        rows.extend(previous)
+        periods.extend([kper] * len(previous))
+    table = np.array(rows, dtype=np.float64).reshape(-1, 3 + nvalues)
+    return {
+        'mxact': mxact,
+        'ipcb': ipcb,
+        'options': [token.upper() for token in tokens[2:]],
+        'cells': table[:, :3].astype(np.int64),
+        'values': table[:, 3:],
+        'period': np.array(periods, dtype=np.int64),
+    }
+
+
+def load_dis_for(model_file):
+    """Read the DIS file that belongs to another package file of the model"""
+    return read_dis(find_package_file(model_file, 'DIS'))
@@ -0,0 +1,253 @@
+import argparse
+import mmap
+import os
+
+import numpy as np
+
+from modflow_array_io import parse_fixed_format, write_binary_record
+
+# Reader for MODFLOW formatted head (or drawdown) files written by
+# "HEAD SAVE FORMAT (...) LABEL": every layer record is a label line
+#
+#      1    1   1.000000E+00   1.000000E+00             HEAD   135   197     1 (213F10.2)
+#
+# followed by NROW rows, each written as ceil(NCOL / count) lines of the
+# fixed-width format. Since all records share one layout, the position of
+# every value is known from the label offset alone: the file is indexed once
+# and values are gathered straight out of a memory map.
+
+HEAD_INDEX_DTYPE = np.dtype([
+    ('kstp', np.int32), ('kper', np.int32), ('pertim', np.float64), ('totim', np.float64),
+    ('text', 'U16'), ('ncol', np.int32), ('nrow', np.int32), ('ilay', np.int32),
+    ('offset', np.int64),
+])
+
+
+def parse_label(line):
+    """Parse a formatted head label line into a dict (KSTP ... ILAY, format)"""
+    tokens = line.split()
+    if len(tokens) < 9 or not tokens[-1].startswith('('):
+        raise ValueError(f"Not a head file label line: {line!r}")
+    return {
+        'kstp': int(tokens[0]),
+        'kper': int(tokens[1]),
+        'pertim': float(tokens[2]),
+        'totim': float(tokens[3]),
+        'text': ' '.join(tokens[4:-4]),
+        'ncol': int(tokens[-4]),
+        'nrow': int(tokens[-3]),
+        'ilay': int(tokens[-2]),
+        'fmt': tokens[-1],
+    }
+
+
+def _decode(fields, width):
+    """Convert an (n, width) uint8 array of fixed-width fields to floats"""
+    text = np.ascontiguousarray(fields).view(f'S{width}').ravel()
+    try:
+        return text.astype(np.float64)
+    except ValueError:
+        # Overflowed fields (**********) or Fortran D exponents
+        values = np.full(text.size, np.nan)
+        for i, field in enumerate(text):
+            try:
+                values[i] = float(field.replace(b'D', b'E').replace(b'd', b'e'))
+            except ValueError:
+                pass
+        return values
+
+
+class FormattedHeadFile:
+    """
+    Indexed, memory-mapped access to a formatted (LABEL) head file
+
+    The byte offset of every layer record is found on open by jumping from
+    label to label, so a head array for any time step or the time series
+    of any cell is read without scanning the file. Layers, rows and
+    columns are zero-based; ``index`` holds one entry per layer record.
+    """
+
+    def __init__(self, head_file):
+        self.path = head_file
+        self._file = open(head_file, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._bytes = np.frombuffer(self._mm, dtype=np.uint8)
+
+        label_end = self._mm.find(b'\n')
+        if label_end < 0:
+            raise ValueError(f"{head_file} is empty or not a formatted head file")
+        newline = 2 if self._mm[label_end - 1:label_end] == b'\r' else 1
+        first = parse_label(self._mm[:label_end].decode('ascii'))
+
+        self.ncol, self.nrow = first['ncol'], first['nrow']
+        self.fmt = first['fmt']
+        count, self.width = parse_fixed_format(self.fmt)
+        count = count or 1
+
+        # Byte position of every value relative to the start of the data
+        lines_per_row = -(-self.ncol // count)
+        line_bytes = count * self.width + newline
+        row_bytes = (self.ncol * self.width) + lines_per_row * newline
+        col = np.arange(self.ncol)
+        col_pos = (col // count) * line_bytes + (col % count) * self.width
+        self._value_pos = (np.arange(self.nrow)[:, None] * row_bytes + col_pos).ravel()
+        self._data_bytes = self.nrow * row_bytes
+        self._field = np.arange(self.width)
+
+        self.index = self._build_index()
+        self.nlay = int(self.index['ilay'].max())
+        steps = np.unique(self.index[['kper', 'kstp']])
+        self.kstpkper = [(int(kstp), int(kper)) for kper, kstp in steps]
+        self.times = np.unique(self.index['totim'])
+
+    def _build_index(self):
+        entries = []
+        offset = 0
+        size = len(self._mm)
+        while offset < size:
+            label_end = self._mm.find(b'\n', offset)
+            if label_end < 0:
+                label_end = size
+            if not self._mm[offset:label_end].strip():
+                break
+            label = parse_label(self._mm[offset:label_end].decode('ascii'))
+            if (label['ncol'], label['nrow'], label['fmt']) != (self.ncol, self.nrow, self.fmt):
+                raise ValueError(f"Record at byte {offset} of {self.path} has a different layout")
+            data_start = label_end + 1
+            if data_start + self._data_bytes > size:
+                raise ValueError(f"Record at byte {offset} of {self.path} is truncated")
+            entries.append((label['kstp'], label['kper'], label['pertim'], label['totim'],
+                            label['text'], label['ncol'], label['nrow'], label['ilay'],
+                            data_start))
+            offset = data_start + self._data_bytes
+        return np.array(entries, dtype=HEAD_INDEX_DTYPE)
+
+    def close(self):
+        self._bytes = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def get_record(self, i):
+        """(nrow, ncol) array of layer record i (position in ``index``)"""
+        start = int(self.index['offset'][i])
+        fields = self._bytes[start + self._value_pos[:, None] + self._field]
+        return _decode(fields, self.width).reshape(self.nrow, self.ncol)
+
+    def find_records(self, kstpkper=None, totim=None):
+        """Positions in ``index`` of the layer records of one time step"""
+        if kstpkper is not None:
+            kstp, kper = kstpkper
+            mask = (self.index['kstp'] == kstp) & (self.index['kper'] == kper)
+        elif totim is not None:
+            mask = np.isclose(self.index['totim'], totim)
+        else:
+            mask = self.index['totim'] == self.times[-1]
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            raise KeyError(f"No head record for kstpkper={kstpkper}, totim={totim}")
+        return positions
+
+    def get_data(self, kstpkper=None, totim=None):
+        """
+        (nlay, nrow, ncol) heads of one time step
+
+        Select by (KSTP, KPER) or by TOTIM; the last time step by default.
+        Layers not saved for that step are NaN.
+        """
+        heads = np.full((self.nlay, self.nrow, self.ncol), np.nan)
+        for i in self.find_records(kstpkper, totim):
+            heads[self.index['ilay'][i] - 1] = self.get_record(i)
+        return heads
+
+    def get_ts(self, cells):
+        """
+        Time series of one or more cells
+
+        ``cells`` is a (lay, row, col) tuple or a list of them. Returns an
+        array (ntimes,) for one cell or (ntimes, ncells), aligned with
+        ``times``. Every value is gathered in one vectorized read.
+        """
+        single = isinstance(cells[0], (int, np.integer))
+        cells = np.atleast_2d(np.asarray(cells, dtype=np.int64))
+        lay, row, col = cells[:, 0], cells[:, 1], cells[:, 2]
+        values = np.full((len(self.times), len(cells)), np.nan)
+
+        time_pos = np.searchsorted(self.times, self.index['totim'])
+        for ilay in np.unique(lay):
+            records = np.flatnonzero(self.index['ilay'] == ilay + 1)
+            selected = np.flatnonzero(lay == ilay)
+            pos = self._value_pos[row[selected] * self.ncol + col[selected]]
+            starts = self.index['offset'][records][:, None] + pos
+            fields = self._bytes[starts[..., None] + self._field]
+            decoded = _decode(fields.reshape(-1, self.width), self.width)
+            values[np.ix_(time_pos[records], selected)] = decoded.reshape(len(records), len(selected))
+
+        return values[:, 0] if single else values
+
+    def to_binary(self, binary_file, record_markers=True):
+        """
+        Convert to a MODFLOW binary head file (single precision)
+
+        Record order and labels are preserved; records are streamed one at a
+        time, so memory use does not depend on the file length.
+        """
+        with open(binary_file, 'wb') as f:
+            for i, entry in enumerate(self.index):
+                write_binary_record(f, self.get_record(i).astype(np.float32),
+                                    kstp=entry['kstp'], kper=entry['kper'],
+                                    pertim=entry['pertim'], totim=entry['totim'],
+                                    text=entry['text'], ilay=entry['ilay'],
+                                    record_markers=record_markers)
+        return binary_file
+
+
+def active_head_range(heads, inactive=(-999.0,)):
+    """Min/max head over active cells (excluding HNOFLO/HDRY and 1E30 values)"""
+    heads = np.asarray(heads)
+    active = np.isfinite(heads) & (np.abs(heads) < 1e30) & ~np.isin(heads, inactive)
+    if not active.any():
+        return None, None
+    return float(heads[active].min()), float(heads[active].max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read a formatted MODFLOW head file')
+    parser.add_argument('head_file', nargs='?', default='modflow_GMRW.hed')
+    parser.add_argument('--cell', type=int, nargs=3, action='append', metavar=('LAY', 'ROW', 'COL'),
+                        help='print the time series of a cell (1-based, repeatable)')
+    parser.add_argument('--to-binary', metavar='FILE', help='convert to a binary head file')
+    args = parser.parse_args()
+
+    with FormattedHeadFile(args.head_file) as hed:
+        print(f"Head file: {args.head_file} ({os.path.getsize(args.head_file) / 1024**2:.1f} MB)")
+        print(f"Grid: {hed.nlay} layer(s), {hed.nrow} rows x {hed.ncol} columns, format {hed.fmt}")
+        print(f"Records: {len(hed)} ({len(hed.kstpkper)} time steps)")
+
+        head_min, head_max = active_head_range(hed.get_data())
+        kstp, kper = hed.kstpkper[-1]
+        if head_min is not None:
+            print(f"Active head range (period {kper}, step {kstp}): {head_min:.1f} to {head_max:.1f}")
+
+        if args.cell:
+            cells = [(lay - 1, row - 1, col - 1) for lay, row, col in args.cell]
+            series = hed.get_ts(cells)
+            print("\n   TOTIM        " + "".join(f"  ({l},{r},{c})".rjust(14) for l, r, c in args.cell))
+            for totim, values in zip(hed.times, series):
+                print(f"   {totim:12.2f} " + "".join(f"{v:14.2f}" for v in values))
+
+        if args.to_binary:
+            hed.to_binary(args.to_binary)
+            print(f"\n✓ Binary head file written: {args.to_binary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import re
+
+import numpy as np
+
+# Keywords that open the parts of a MODFLOW listing we care about.  Every
+# other line (head/array echo, well lists, ...) is skipped with a single
+# first-character test, so the file is read once in bounded memory. The
+# only numeric lines read are the NWT outer-iteration table between
+# SOLVING FOR HEAD and the iteration summary, which NWT prints when
+# IPRNWT > 0 (outer iteration, inner iterations, max head change, ...).
+_STEP_RE = re.compile(r'STRESS PERIOD\s+(\d+)\s+TIME STEP\s+(\d+)')
+_BUDGET_RE = re.compile(r'TIME STEP\s+(\d+),\s*STRESS PERIOD\s+(\d+)')
+_INT_RE = re.compile(r'(\d+)')
+_SKIP_CHARS = set('0123456789-.+')
+
+
+def _budget_value(text):
+    """Convert a listing budget number, returning NaN for overflow (****)"""
+    try:
+        return float(text)
+    except ValueError:
+        return float('nan')
+
+
+def _new_record():
+    return {
+        'kper': 0,
+        'kstp': 0,
+        'outer_iter': -1,
+        'inner_iter': -1,
+        'converged': True,
+        'backtracks': 0,
+        'max_head_change': float('nan'),
+        'budget': False,
+        'in': {},
+        'out': {},
+        'total_in': float('nan'),
+        'total_out': float('nan'),
+        'pct_discrepancy_cum': float('nan'),
+        'pct_discrepancy': float('nan'),
+    }
+
+
+def iter_listing_records(listing_file):
+    """
+    Stream a MODFLOW listing file and yield one record per time step
+
+    Each record is a dict with the stress period/time step, solver iteration
+    counts, backtracking events and the largest absolute head change of the
+    outer iterations (NaN unless NWT printed its iteration table), a
+    convergence flag and - for time steps where OC printed the
+    volumetric budget - the IN/OUT rates per budget term, the totals and the
+    percent discrepancy (cumulative and for the time step).
+    """
+    record = None
+    section = None
+    in_budget = False
+    in_solver = False
+
+    with open(listing_file, 'r', errors='replace') as f:
+        for line in f:
+            text = line.strip()
+            if not text:
+                continue
+            if text[0] in _SKIP_CHARS:
+                if in_solver:
+                    _read_iteration_line(text, record)
+                continue
+
+            if text.startswith('SOLVING FOR HEAD'):
+                if record is not None and record['kstp']:
+                    yield record
+                record = _new_record()
+                in_budget = False
+                in_solver = True
+                continue
+
+            if record is None:
+                continue
+
+            if in_budget:
+                if text.startswith('IN:'):
+                    section = 'in'
+                elif text.startswith('OUT:'):
+                    section = 'out'
+                elif text.startswith('PERCENT DISCREPANCY'):
+                    parts = text.split('=')
+                    record['pct_discrepancy_cum'] = _budget_value(parts[1].split()[0])
+                    if len(parts) > 2:
+                        record['pct_discrepancy'] = _budget_value(parts[2].split()[0])
+                    in_budget = False
+                elif '=' in text:
+                    parts = text.split('=')
+                    name = parts[0].strip()
+                    # Rate for this time step is the right-hand column
+                    value = _budget_value(parts[-1].split()[0])
+                    if name == 'TOTAL IN':
+                        record['total_in'] = value
+                    elif name == 'TOTAL OUT':
+                        record['total_out'] = value
+                    elif name != 'IN - OUT' and section is not None:
+                        record[section][name] = value
+                continue
+
+            if in_solver and 'BACKTRACK' in text.upper():
+                record['backtracks'] += 1
+            if text.startswith('NWT REQUIRED'):
+                in_solver = False
+                match = _INT_RE.search(text)
+                if match:
+                    record['outer_iter'] = int(match.group(1))
+            elif text.startswith('AND A TOTAL OF'):
+                match = _INT_RE.search(text)
+                if match:
+                    record['inner_iter'] = int(match.group(1))
+            elif 'OUTPUT CONTROL FOR STRESS PERIOD' in text:
+                match = _STEP_RE.search(text)
+                if match:
+                    record['kper'] = int(match.group(1))
+                    record['kstp'] = int(match.group(2))
+            elif text.startswith('VOLUMETRIC BUDGET FOR ENTIRE MODEL'):
+                match = _BUDGET_RE.search(text)
+                if match:
+                    record['kstp'] = int(match.group(1))
+                    record['kper'] = int(match.group(2))
+                record['budget'] = True
+                in_budget = True
+                section = None
+            elif 'FAILED TO' in text or 'ERROR' in text:
+                record['converged'] = False
+
+    if record is not None and record['kstp']:
+        yield record
+
+
+def _read_iteration_line(text, record):
+    """Take the head change of an NWT outer-iteration line (iter, inner, dh, ...)"""
+    tokens = text.split()
+    if len(tokens) < 3 or not (tokens[0].isdigit() and tokens[1].isdigit()):
+        return
+    change = abs(_budget_value(tokens[2]))
+    current = record['max_head_change']
+    if change == change and (current != current or change > current):
+        record['max_head_change'] = change
+
+
+def _field_name(prefix, term):
+    return prefix + '_' + re.sub(r'[^0-9a-z]+', '_', term.lower()).strip('_')
+
+
+def read_listing_timeseries(listing_file):
+    """
+    Read a MODFLOW listing file into a per-time-step record array
+
+    Budget terms become ``in_<term>``/``out_<term>`` fields (e.g.
+    ``in_recharge``, ``out_river_leakage``); time steps without a printed
+    budget hold NaN in the budget fields.
+    """
+    rows = []
+    terms = {}
+    for record in iter_listing_records(listing_file):
+        for side in ('in', 'out'):
+            for term in record[side]:
+                terms.setdefault(_field_name(side, term), (side, term))
+        rows.append(record)
+
+    dtype = [
+        ('kper', np.int32),
+        ('kstp', np.int32),
+        ('outer_iter', np.int32),
+        ('inner_iter', np.int32),
+        ('backtracks', np.int32),
+        ('converged', np.bool_),
+        ('budget', np.bool_),
+        ('max_head_change', np.float64),
+    ]
+    dtype += [(name, np.float64) for name in terms]
+    dtype += [
+        ('total_in', np.float64),
+        ('total_out', np.float64),
+        ('pct_discrepancy_cum', np.float64),
+        ('pct_discrepancy', np.float64),
+    ]
+
+    series = np.empty(len(rows), dtype=dtype)
+    for name, _ in dtype[8:]:
+        series[name] = np.nan
+    for i, record in enumerate(rows):
+        row = series[i]
+        for key in ('kper', 'kstp', 'outer_iter', 'inner_iter', 'backtracks', 'converged', 'budget',
+                    'max_head_change',
+                    'total_in', 'total_out', 'pct_discrepancy_cum', 'pct_discrepancy'):
+            row[key] = record[key]
+        for name, (side, term) in terms.items():
+            if term in record[side]:
+                row[name] = record[side][term]
+
+    return series.view(np.recarray)
+
+
+def main():
+    listing_file = 'modflow_GMRW.out'
+
+    print(f"Reading MODFLOW listing: {listing_file}")
+    series = read_listing_timeseries(listing_file)
+    budgets = series[series.budget]
+
+    print(f"Time steps parsed: {len(series)}")
+    print(f"Budgets printed: {len(budgets)}")
+    print(f"Failed time steps: {np.sum(~series.converged)}")
+    if len(series):
+        print(f"Outer iterations - Total: {series.outer_iter.sum()}, Max: {series.outer_iter.max()}")
+        print(f"Inner iterations - Total: {series.inner_iter.sum()}, Max: {series.inner_iter.max()}")
+    if len(budgets):
+        print(f"Last percent discrepancy: {budgets.pct_discrepancy_cum[-1]:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
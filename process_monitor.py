@@ -0,0 +1,194 @@
+import glob
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Watches a running SWAT-MODFLOW3 process instead of a fixed timeout. Every
+# few seconds it samples the child's CPU time, resident memory and I/O
+# counters from /proc/<pid> and the size of the files the model keeps
+# appending to (the MODFLOW listing and the swatmf_out_* files). A run that
+# makes no progress - no output growth and no new simulated day on the
+# console - for ``stall_window`` seconds is declared stalled and
+# terminated, whether it is idle or spinning on a diverging Newton solve.
+# Runs that keep producing output may take as long as they need. An
+# optional ``stop_check`` callable is also polled every ``check_interval``
+# seconds; when it returns a reason (e.g. a calibration run that can no
+# longer beat the best objective) the run is terminated as well.
+#
+# Without /proc (not Linux) only the output files are watched; the
+# resource profile then has no CPU/RSS/I/O figures.
+
+DEFAULT_STALL_WINDOW = 900.0   # seconds without progress
+DEFAULT_INTERVAL = 5.0         # seconds between samples
+DEFAULT_CHECK_INTERVAL = 60.0  # seconds between stop_check calls
+PROGRESS_PATTERNS = ('modflow_GMRW.out', 'swatmf_out_*')
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def read_proc_sample(pid):
+    """
+    CPU seconds, RSS and I/O bytes of a process from /proc
+
+    Returns a dict (I/O values None if /proc/<pid>/io is not readable), or
+    None if the process has exited or /proc is not available.
+    """
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # The command name may contain spaces; fields follow the last ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status', 'r') as f:
+            rss_kb = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+    except (OSError, IndexError, ValueError):
+        return None
+
+    sample = {
+        'cpu_seconds': (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS,  # utime + stime
+        'rss_bytes': rss_kb * 1024,
+        'read_bytes': None,
+        'write_bytes': None,
+    }
+    try:
+        with open(f'/proc/{pid}/io', 'r') as f:
+            counters = dict(line.split(':', 1) for line in f if ':' in line)
+        sample['read_bytes'] = int(counters['read_bytes'])
+        sample['write_bytes'] = int(counters['write_bytes'])
+    except (OSError, KeyError, ValueError):
+        pass
+    return sample
+
+
+def output_bytes(work_dir, patterns=PROGRESS_PATTERNS):
+    """Total size of the files the model appends to while it runs"""
+    total = 0
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(work_dir, pattern)):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+    return total
+
+
+class ProcessMonitor(threading.Thread):
+    """
+    Background sampler and stall detector for a subprocess.Popen
+
+    ``progress`` is an optional callable returning a value that changes
+    when the model advances (e.g. the simulated day read from the console).
+    ``stop_check`` returns None to let the run go on, or the reason to stop
+    it. After stop() (or the process exiting) ``profile()`` returns the
+    resource profile of the run.
+    """
+
+    def __init__(self, process, work_dir='.', stall_window=DEFAULT_STALL_WINDOW,
+                 interval=DEFAULT_INTERVAL, progress=None, patterns=PROGRESS_PATTERNS,
+                 stop_check=None, check_interval=DEFAULT_CHECK_INTERVAL):
+        super().__init__(daemon=True)
+        self.process = process
+        self.work_dir = work_dir
+        self.stall_window = stall_window
+        self.interval = interval
+        self.progress = progress
+        self.patterns = patterns
+        self.stop_check = stop_check
+        self.check_interval = check_interval
+        self.stalled = False
+        self.stall_reason = None
+        self.stop_reason = None
+        self._stop_event = threading.Event()
+        self._start = time.monotonic()
+        self._end = None
+        self._last = None
+        self._peak_rss = 0
+        self._samples = 0
+        self._output_start = output_bytes(work_dir, patterns)
+        self._output = self._output_start
+        self._children_cpu = self._reaped_children_cpu()
+
+    @staticmethod
+    def _reaped_children_cpu():
+        if resource is None:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def run(self):
+        last_progress_value = self.progress() if self.progress else None
+        last_progress_time = last_check_time = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            if self.process.poll() is not None:
+                break
+            now = time.monotonic()
+            sample = read_proc_sample(self.process.pid)
+            if sample is not None:
+                self._last = sample
+                self._peak_rss = max(self._peak_rss, sample['rss_bytes'])
+                self._samples += 1
+
+            output = output_bytes(self.work_dir, self.patterns)
+            progress_value = self.progress() if self.progress else None
+            if output != self._output or progress_value != last_progress_value:
+                self._output = output
+                last_progress_value = progress_value
+                last_progress_time = now
+            elif self.stall_window and now - last_progress_time >= self.stall_window:
+                cpu = sample['cpu_seconds'] if sample else None
+                self.stall_reason = (f"no output growth or new simulated day for {now - last_progress_time:.0f} s"
+                                     + (f" (CPU time {cpu:.0f} s)" if cpu is not None else ""))
+                self.stalled = True
+                self._terminate()
+                break
+            if self.stop_check is not None and now - last_check_time >= self.check_interval:
+                last_check_time = now
+                self.stop_reason = self.stop_check()
+                if self.stop_reason:
+                    self._terminate()
+                    break
+        self._end = time.monotonic()
+
+    def _terminate(self, grace=10.0):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=grace)
+        except Exception:
+            self.process.kill()
+
+    def stop(self):
+        """Stop sampling (after the process has exited) and wait for the thread"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        if self._end is None:
+            self._end = time.monotonic()
+        # /proc is sampled every few seconds; once the child is reaped its
+        # full CPU time is in the children's rusage
+        if self.process.poll() is not None and self._children_cpu is not None:
+            cpu = self._reaped_children_cpu() - self._children_cpu
+            if self._last is None or cpu > self._last['cpu_seconds']:
+                self._last = dict(self._last or {}, cpu_seconds=round(cpu, 3))
+
+    def profile(self):
+        """Resource profile of the run (None for figures /proc did not provide)"""
+        wall = (self._end or time.monotonic()) - self._start
+        last = self._last or {}
+        cpu = last.get('cpu_seconds')
+        return {
+            'wall_seconds': round(wall, 3),
+            'cpu_seconds': cpu,
+            'cpu_utilisation': round(cpu / wall, 3) if cpu is not None and wall > 0 else None,
+            'peak_rss_mb': round(self._peak_rss / 1024**2, 1) if self._samples else None,
+            'read_bytes': last.get('read_bytes'),
+            'write_bytes': last.get('write_bytes'),
+            'output_bytes': output_bytes(self.work_dir, self.patterns) - self._output_start,
+            'samples': self._samples,
+            'stalled': self.stalled,
+            'stall_reason': self.stall_reason,
+            'stopped_early': bool(self.stop_reason),
+            'stop_reason': self.stop_reason or None,
+        }
@@ -0,0 +1,285 @@
+import argparse
+import os
+import struct
+import tempfile
+import textwrap
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modflow_array_io import load_dis_for
+from modflow_head_file import FormattedHeadFile
+from swatmf_columnar import ColumnarStore, convert_block_file, is_up_to_date, DEFAULT_STORE_DIR
+
+# Map frames (one PNG per output period) of heads, recharge and GW/SW
+# exchange. Two paths:
+#
+#   figure  one matplotlib figure per worker process, built once; every
+#           frame only swaps the image data and the title text before
+#           savefig (no re-layout, no new artists)
+#   raster  no matplotlib drawing at all: the array is colormapped through
+#           a 256-entry lookup table and written as a PNG with zlib, for
+#           quick looks and animations that need no axes or legend
+#
+# The frame stack is saved once to a temporary .npy that every worker
+# opens memory-mapped, and frames are split across a process pool.
+
+DEFAULT_OUTPUT_DIR = 'frames'
+INACTIVE_RGBA = (179, 179, 179, 255)  # light gray, as the inactive cells of the recharge map
+SUPTITLE_WIDTH = 40  # characters per line of the figure title (7 in wide, 14 pt bold)
+
+_worker = {}
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # headless: no display or GUI toolkit needed in workers
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _period_titles(names, periods):
+    return [' '.join(f'{name} {value}' for name, value in zip(names, period)) for period in periods.tolist()]
+
+
+def head_frames(head_file='modflow_GMRW.hed', layer=1):
+    """
+    Head frames of one layer: ((nframe, nrow, ncol) array, titles)
+
+    HNOFLO/HDRY cells (-999, 1E30) are NaN.
+    """
+    with FormattedHeadFile(head_file) as heads:
+        records = np.flatnonzero(heads.index['ilay'] == layer)
+        frames = np.stack([heads.get_record(i) for i in records])
+        titles = [f"Layer {layer}, Stress Period {entry['kper']}, Time Step {entry['kstp']}"
+                  for entry in heads.index[records]]
+    frames[(frames == -999.0) | (np.abs(frames) >= 1e30)] = np.nan
+    return frames, titles
+
+
+def recharge_frames(recharge_file='swatmf_out_SWAT_recharge_monthly', store_dir=DEFAULT_STORE_DIR):
+    """Recharge frames (m/day) mapped from per-HRU SWAT recharge; inactive cells NaN"""
+    from map_recharge_to_ibound import build_hru_operator, map_hru_recharge, read_hru_recharge, read_ibound_from_bas
+
+    model_dir = os.path.dirname(os.path.abspath(recharge_file))
+    ibound = read_ibound_from_bas(os.path.join(model_dir, 'modflow_GMRW.bas'))
+    periods, hru_recharge = read_hru_recharge(recharge_file, store_dir)
+    frames = map_hru_recharge(hru_recharge, build_hru_operator(model_dir), ibound)
+    frames[:, ibound == 0] = np.nan
+    store = ColumnarStore(os.path.join(store_dir, os.path.basename(recharge_file)))
+    return frames, _period_titles(store.period_names, periods)
+
+
+def exchange_frames(gwsw_file='swatmf_out_MF_gwsw', store_dir=DEFAULT_STORE_DIR):
+    """
+    GW/SW exchange frames (m3/day per river cell); cells without a river
+    are NaN, cells listed more than once are summed
+    """
+    import scipy.sparse
+
+    if not is_up_to_date(gwsw_file, store_dir):
+        convert_block_file(gwsw_file, store_dir)
+    store = ColumnarStore(os.path.join(store_dir, os.path.basename(gwsw_file)))
+    dis = load_dis_for(os.path.join(os.path.dirname(os.path.abspath(gwsw_file)), 'modflow_GMRW.bas'))
+    nrow, ncol = dis['nrow'], dis['ncol']
+
+    cells = (store.ids[:, -2] - 1) * ncol + store.ids[:, -1] - 1
+    scatter = scipy.sparse.csr_matrix((np.ones(len(cells)), (np.arange(len(cells)), cells)),
+                                      shape=(len(cells), nrow * ncol))
+    periods, values = store.query()
+    frames = np.asarray(scatter.T.dot(values.astype(np.float64).T).T)
+    frames[:, np.bincount(cells, minlength=nrow * ncol) == 0] = np.nan
+    return frames.reshape(len(periods), nrow, ncol), _period_titles(store.period_names, periods)
+
+
+def colormap_lut(cmap='viridis', n=256):
+    """(n + 1, 4) uint8 RGBA lookup table; the last entry is for NaN cells"""
+    plt = _pyplot()
+    lut = np.empty((n + 1, 4), dtype=np.uint8)
+    lut[:n] = np.rint(plt.get_cmap(cmap)(np.linspace(0.0, 1.0, n)) * 255)
+    lut[n] = INACTIVE_RGBA
+    return lut
+
+
+def colorize(data, lut, vmin, vmax, scale=1):
+    """(nrow * scale, ncol * scale, 4) RGBA raster of a 2D array"""
+    n = len(lut) - 1
+    valid = np.isfinite(data)
+    position = (np.where(valid, data, vmin) - vmin) / ((vmax - vmin) or 1.0)
+    index = np.clip(np.rint(position * (n - 1)), 0, n - 1).astype(np.intp)
+    index[~valid] = n
+    rgba = lut[index]
+    if scale > 1:
+        rgba = rgba.repeat(scale, axis=0).repeat(scale, axis=1)
+    return rgba
+
+
+def write_png(path, rgba, level=6):
+    """Write an (height, width, 4) uint8 array as an RGBA PNG"""
+    height, width = rgba.shape[:2]
+    # Every scanline starts with filter type 0 (None)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), level)))
+        f.write(chunk(b'IEND', b''))
+    return path
+
+
+class FrameRenderer:
+    """
+    One figure reused for every frame: only the image data and the title
+    change between savefig calls
+    """
+
+    def __init__(self, shape, cmap='viridis', vmin=None, vmax=None, label='', suptitle='', dpi=100):
+        plt = _pyplot()
+        self.dpi = dpi
+        colormap = plt.get_cmap(cmap).copy()
+        colormap.set_bad('#b3b3b3')
+        self.fig, ax = plt.subplots(figsize=(7, 8))
+        self.image = ax.imshow(np.full(shape, np.nan), cmap=colormap, vmin=vmin, vmax=vmax,
+                               aspect='auto', interpolation='nearest')
+        ax.set_xlabel('Column', fontsize=12)
+        ax.set_ylabel('Row', fontsize=12)
+        cbar = self.fig.colorbar(self.image, ax=ax, orientation='horizontal', pad=0.08)
+        cbar.set_label(label, fontsize=11)
+        # Wrapped to the figure width; tight_layout then leaves room above the axes
+        self.fig.suptitle('\n'.join(textwrap.fill(line, SUPTITLE_WIDTH) for line in suptitle.splitlines()), fontsize=14, fontweight='bold')
+        self.title = ax.set_title(' ', fontsize=12)
+        self.fig.tight_layout()
+
+    def render(self, data, title, path):
+        self.image.set_data(np.ma.masked_invalid(data))
+        self.title.set_text(title)
+        self.fig.savefig(path, dpi=self.dpi)
+        return path
+
+    def close(self):
+        _pyplot().close(self.fig)
+
+
+def _init_worker(frames_file, options):
+    _worker['frames'] = np.load(frames_file, mmap_mode='r')
+    _worker['options'] = options
+    if options['raw']:
+        _worker['lut'] = colormap_lut(options['cmap'])
+    else:
+        _worker['renderer'] = FrameRenderer(_worker['frames'].shape[1:], options['cmap'], options['vmin'],
+                                            options['vmax'], options['label'], options['suptitle'],
+                                            options['dpi'])
+
+
+def _render_frames(positions):
+    frames, options = _worker['frames'], _worker['options']
+    paths = []
+    for i in positions:
+        path = os.path.join(options['out_dir'], f"{options['prefix']}_{i + 1:04d}.png")
+        data = np.asarray(frames[i], dtype=np.float64)
+        if options['raw']:
+            write_png(path, colorize(data, _worker['lut'], options['vmin'], options['vmax'], options['scale']))
+        else:
+            _worker['renderer'].render(data, options['titles'][i], path)
+        paths.append(path)
+    return paths
+
+
+def render_frames(frames, titles, out_dir=DEFAULT_OUTPUT_DIR, prefix='frame', raw=False, cmap='viridis',
+                  vmin=None, vmax=None, symmetric=False, label='', suptitle='', dpi=100, scale=4,
+                  workers=None):
+    """
+    Render a (nframe, nrow, ncol) stack to <out_dir>/<prefix>_NNNN.png
+
+    All frames share one color scale (default: the NaN-aware min/max of
+    the stack, symmetric around zero with symmetric=True). raw=True writes
+    colormapped rasters (``scale`` pixels per cell) instead of figures.
+    Returns the frame paths in order.
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    if vmin is None or vmax is None:
+        finite = frames[np.isfinite(frames)]
+        low, high = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+        if symmetric:
+            high = max(abs(low), abs(high))
+            low = -high
+        vmin = low if vmin is None else vmin
+        vmax = high if vmax is None else vmax
+
+    os.makedirs(out_dir, exist_ok=True)
+    options = {
+        'out_dir': out_dir, 'prefix': prefix, 'raw': raw, 'cmap': cmap, 'vmin': vmin, 'vmax': vmax,
+        'label': label, 'suptitle': suptitle, 'dpi': dpi, 'scale': scale, 'titles': list(titles),
+    }
+    workers = max(1, min(workers or os.cpu_count() or 1, len(frames)))
+    # Interleaved split: early and late frames cost about the same
+    batches = [np.arange(i, len(frames), workers) for i in range(workers)]
+
+    handle, frames_file = tempfile.mkstemp(suffix='.npy', dir=out_dir)
+    os.close(handle)
+    try:
+        np.save(frames_file, frames)
+        if workers == 1:
+            _init_worker(frames_file, options)
+            paths = _render_frames(batches[0])
+            if 'renderer' in _worker:
+                _worker.pop('renderer').close()
+            _worker.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(frames_file, options)) as pool:
+                paths = [path for batch in pool.map(_render_frames, batches) for path in batch]
+    finally:
+        os.remove(frames_file)
+    return sorted(paths)
+
+
+SOURCES = {
+    'heads': (head_frames, 'modflow_GMRW.hed', 'viridis', False, 'Head (m)', 'Groundwater Head'),
+    'recharge': (recharge_frames, 'swatmf_out_SWAT_recharge_monthly', 'Blues', False,
+                 'Recharge Rate (m/day)', 'Recharge'),
+    'exchange': (exchange_frames, 'swatmf_out_MF_gwsw', 'RdBu', True,
+                 'GW/SW Exchange (m3/day)', 'Groundwater/Surface Water Exchange'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render map frames of heads, recharge or GW/SW exchange')
+    parser.add_argument('source', choices=sorted(SOURCES))
+    parser.add_argument('file', nargs='?', default=None, help='input file (default depends on source)')
+    parser.add_argument('--out-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--raw', action='store_true', help='plain colormapped rasters, no axes or legend')
+    parser.add_argument('--scale', type=int, default=4, help='raster pixels per cell (--raw)')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--cmap', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+
+    load, default_file, cmap, symmetric, label, suptitle = SOURCES[args.source]
+    source_file = args.file or default_file
+    if args.source == 'heads':
+        frames, titles = load(source_file)
+    else:
+        frames, titles = load(source_file, args.store_dir)
+
+    start = time.perf_counter()
+    paths = render_frames(frames, titles, os.path.join(args.out_dir, args.source), prefix=args.source,
+                          raw=args.raw, cmap=args.cmap or cmap, symmetric=symmetric, label=label,
+                          suptitle=f'{suptitle}\nGreat Miami River Watershed', dpi=args.dpi,
+                          scale=args.scale, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(paths)} {args.source} frames written to {os.path.dirname(paths[0]) if paths else args.out_dir} "
+          f"in {elapsed:.1f} s ({elapsed / max(len(paths), 1) * 1000:.0f} ms per frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from run_swatmodflow_with_log import list_model_inputs, list_model_outputs, run_swat_modflow
+
+DEFAULT_CACHE_DIR = '.swatmf_cache'
+DEFAULT_MAX_BYTES = 10 * 1024**3  # 10 GB
+
+ENTRY_FILE = 'entry.json'
+HASH_CHUNK = 1024 * 1024
+
+
+def hash_model_inputs(model_dir='.'):
+    """
+    Content hash of every input file SWAT-MODFLOW reads from model_dir
+
+    Covers file.cio, the modflow.mfn package files, the SWAT subbasin/HRU
+    files, the swatmf_*.txt linkage files, the rt3d.* files and the climate
+    data - i.e. everything in the directory that is not a run output.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for name in list_model_inputs(model_dir):
+        digest.update(name.encode() + b'\0')
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _read_entry(entry_dir):
+    with open(os.path.join(entry_dir, ENTRY_FILE), 'r') as f:
+        return json.load(f)
+
+
+def _write_entry(entry_dir, entry):
+    tmp_file = os.path.join(entry_dir, ENTRY_FILE + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp_file, os.path.join(entry_dir, ENTRY_FILE))
+
+
+def list_cache_entries(cache_dir=DEFAULT_CACHE_DIR):
+    """Cache entries, least recently used first"""
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if os.path.isfile(os.path.join(entry_dir, ENTRY_FILE)):
+            entries.append(_read_entry(entry_dir))
+    return sorted(entries, key=lambda entry: entry['last_used'])
+
+
+def cache_lookup(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the cache entry for key (marking it as used) or None"""
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.isfile(os.path.join(entry_dir, ENTRY_FILE)):
+        return None
+    entry = _read_entry(entry_dir)
+    entry['last_used'] = time.time()
+    entry['hits'] = entry.get('hits', 0) + 1
+    _write_entry(entry_dir, entry)
+    return entry
+
+
+def restore_outputs(entry, model_dir='.', cache_dir=DEFAULT_CACHE_DIR):
+    """Copy the stored outputs of a cache entry into model_dir"""
+    entry_dir = os.path.join(cache_dir, entry['key'])
+    for name in entry['files']:
+        # Copies, not links: a later run may rewrite the outputs in place
+        shutil.copy2(os.path.join(entry_dir, name), os.path.join(model_dir, name))
+    return entry['files']
+
+
+def cache_store(key, model_dir, names, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                info=None):
+    """Store the given output files of model_dir under key, then evict to max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = entry_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    size = 0
+    for name in names:
+        shutil.copy2(os.path.join(model_dir, name), os.path.join(tmp_dir, name))
+        size += os.path.getsize(os.path.join(tmp_dir, name))
+
+    now = time.time()
+    entry = {
+        'key': key,
+        'created': now,
+        'last_used': now,
+        'hits': 0,
+        'size': size,
+        'files': sorted(names),
+        'info': info or {},
+    }
+    _write_entry(tmp_dir, entry)
+
+    if os.path.exists(entry_dir):
+        shutil.rmtree(entry_dir)
+    os.rename(tmp_dir, entry_dir)
+
+    evict_cache(cache_dir, max_bytes)
+    return entry
+
+
+def evict_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    entries = list_cache_entries(cache_dir)
+    total = sum(entry['size'] for entry in entries)
+    evicted = []
+    # Always keep the most recently used entry, even if it alone is too big
+    while entries[:-1] and total > max_bytes:
+        entry = entries.pop(0)
+        shutil.rmtree(os.path.join(cache_dir, entry['key']))
+        total -= entry['size']
+        evicted.append(entry['key'])
+    return evicted
+
+
+def purge_cache(cache_dir=DEFAULT_CACHE_DIR, keys=None, older_than_days=None):
+    """
+    Remove cache entries
+
+    With no arguments the whole cache is purged; otherwise only the given
+    keys (or key prefixes) and/or the entries not used for older_than_days.
+    """
+    removed = []
+    cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+    for entry in list_cache_entries(cache_dir):
+        selected = keys is None and cutoff is None
+        if keys is not None and any(entry['key'].startswith(key) for key in keys):
+            selected = True
+        if cutoff is not None and entry['last_used'] < cutoff:
+            selected = True
+        if selected:
+            shutil.rmtree(os.path.join(cache_dir, entry['key']))
+            removed.append(entry['key'])
+    return removed
+
+
+def cached_run(model_dir='.', cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+               run=None):
+    """
+    Run SWAT-MODFLOW unless an identical input set has been run before
+
+    On a cache hit the stored outputs are restored into model_dir instead
+    of executing the model. ``run`` is the function executing the model in
+    model_dir (default: run_swat_modflow) and must return True on success.
+    Returns (success, cache_hit, key).
+    """
+    key = hash_model_inputs(model_dir)
+    entry = cache_lookup(key, cache_dir)
+    if entry is not None:
+        restore_outputs(entry, model_dir, cache_dir)
+        return True, True, key
+
+    # Only outputs written by this run are stored, not older logs
+    start = time.time() - 1
+    if run is None:
+        success = run_swat_modflow(work_dir=model_dir)
+    else:
+        success = run(model_dir)
+    if success:
+        names = [name for name in list_model_outputs(model_dir)
+                 if os.path.getmtime(os.path.join(model_dir, name)) >= start]
+        cache_store(key, model_dir, names, cache_dir, max_bytes,
+                    info={'model_dir': os.path.abspath(model_dir)})
+    return success, False, key
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_cache(cache_dir=DEFAULT_CACHE_DIR):
+    entries = list_cache_entries(cache_dir)
+    print(f"Run cache: {os.path.abspath(cache_dir)}")
+    print(f"Entries: {len(entries)}, Total size: {_format_size(sum(e['size'] for e in entries))}")
+    if not entries:
+        return
+    print("   " + "-"*76)
+    print("   Key          | Last used           | Hits | Files |       Size")
+    print("   " + "-"*76)
+    for entry in reversed(entries):
+        last_used = datetime.datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"   {entry['key'][:12]} | {last_used} | {entry.get('hits', 0):4d} | "
+              f"{len(entry['files']):5d} | {_format_size(entry['size']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed SWAT-MODFLOW run cache')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run the model unless cached')
+    run_parser.add_argument('--model-dir', default='.')
+    run_parser.add_argument('--max-gb', type=float, default=DEFAULT_MAX_BYTES / 1024**3)
+
+    subparsers.add_parser('list', help='list cache entries')
+    key_parser = subparsers.add_parser('key', help='print the input hash of a model directory')
+    key_parser.add_argument('--model-dir', default='.')
+
+    purge_parser = subparsers.add_parser('purge', help='remove cache entries')
+    purge_parser.add_argument('keys', nargs='*', help='keys or key prefixes (default: all)')
+    purge_parser.add_argument('--older-than-days', type=float, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        success, hit, key = cached_run(args.model_dir, args.cache_dir, int(args.max_gb * 1024**3))
+        if hit:
+            print(f"✓ Cache hit {key[:12]}: outputs restored without running the model")
+        elif success:
+            print(f"✓ Run stored in cache as {key[:12]}")
+        else:
+            print("✗ Run failed, nothing cached")
+    elif args.command == 'list':
+        print_cache(args.cache_dir)
+    elif args.command == 'key':
+        print(hash_model_inputs(args.model_dir))
+    elif args.command == 'purge':
+        removed = purge_cache(args.cache_dir, args.keys or None, args.older_than_days)
+        print(f"Removed {len(removed)} cache entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from process_monitor import DEFAULT_STALL_WINDOW
+from swat_cio import read_cio_period, simulation_days
+
+# Output profiles for SWAT-MODFLOW runs. The base model writes every
+# optional SWAT-MODFLOW output on the 57 "specified days" of
+# swatmf_link.txt and the heads and budgets asked for in modflow_GMRW.oc -
+# tens of MB of text that a calibration run never reads. A profile
+# rewrites those two files to produce only what its objective needs:
+#
+#   full          the model as shipped
+#   lean          streamflow (output.rch), observation-well heads and the
+#                 per-subbasin GW/SW exchange on the last day; heads saved
+#                 and the budget printed on the last day only (warm start,
+#                 success log)
+#   observations  output.rch and the observation wells only; no MODFLOW
+#                 head or budget output
+#
+# SWAT's own output.* files and the MODFLOW listing (solver iterations)
+# are written in every profile. Files are replaced, not edited in place,
+# so a hard-linked base model in a scenario work directory is untouched.
+#
+# OC blocks are keyed by (PERIOD, STEP). SWAT-MODFLOW steps MODFLOW once
+# per day, so with this model's single stress period the last day is
+# PERIOD 1 STEP <last day> (see day_step()).
+
+LINK_FILE = 'swatmf_link.txt'
+OC_FILE = 'modflow_GMRW.oc'
+NAME_FILE = 'modflow.mfn'
+
+# Output switches of swatmf_link.txt, by line number (0-based)
+LINK_FLAGS = {
+    'observations': 5,
+    'deep_percolation': 7,
+    'recharge': 8,
+    'channel_depth': 9,
+    'river_stage': 10,
+    'gwsw_cells': 11,
+    'gwsw_subbasins': 12,
+    'averages': 13,
+}
+DAYS_HEADER = 'Write SWAT-MODFLOW output only on specified days'
+
+# flags: switches to set; days: 'last' writes the SWAT-MODFLOW outputs on
+# the last simulated day only; oc: output words for the last day (the
+# PERIOD blocks of the base file are dropped)
+PROFILES = {
+    'full': None,
+    'lean': {
+        'flags': {'observations': 1, 'deep_percolation': 0, 'recharge': 0, 'channel_depth': 0,
+                  'river_stage': 0, 'gwsw_cells': 0, 'gwsw_subbasins': 1, 'averages': 0},
+        'days': 'last',
+        'oc': ('PRINT BUDGET', 'SAVE HEAD'),
+    },
+    'observations': {
+        'flags': {'observations': 1, 'deep_percolation': 0, 'recharge': 0, 'channel_depth': 0,
+                  'river_stage': 0, 'gwsw_cells': 0, 'gwsw_subbasins': 0, 'averages': 0},
+        'days': 'last',
+        'oc': (),
+    },
+}
+
+
+def _read_lines(path):
+    with open(path, 'r') as f:
+        return f.read().splitlines()
+
+
+def _replace_file(path, text):
+    """Write text to a new file at path (breaking any hard link)"""
+    if os.path.exists(path):
+        os.remove(path)
+    with open(path, 'w', newline='') as f:
+        f.write(text)
+
+
+def read_output_days(lines):
+    """(index of the count line, list of output days) of swatmf_link.txt lines"""
+    header = next(i for i, line in enumerate(lines) if line.strip() == DAYS_HEADER)
+    count = int(lines[header + 1].split()[0])
+    return header + 1, [int(line.split()[0]) for line in lines[header + 2:header + 2 + count]]
+
+
+def edit_link_lines(lines, flags=None, days=None):
+    """swatmf_link.txt lines with output switches and/or the output days replaced"""
+    lines = list(lines)
+    for name, value in (flags or {}).items():
+        i = LINK_FLAGS[name]
+        token = lines[i].split(None, 1)[0]
+        lines[i] = str(int(value)) + lines[i][len(token):]
+    if days is not None:
+        count_line, old_days = read_output_days(lines)
+        lines[count_line:count_line + 1 + len(old_days)] = [str(len(days))] + [str(day) for day in days]
+    return lines
+
+
+def day_step(perlen, day):
+    """
+    (KPER, KSTP) of simulated day ``day`` (1-based)
+
+    SWAT-MODFLOW runs one MODFLOW time step per day whatever NSTP says,
+    so the steps of a stress period are its days: in this model (one
+    stress period) day d is PERIOD 1 STEP d of the output control.
+    """
+    start = 0
+    for kper, length in enumerate(perlen, start=1):
+        if day <= start + length:
+            return kper, int(day - start)
+        start += length
+    raise ValueError(f"Day {day} is after the last stress period")
+
+
+def step_day(perlen, kper, kstp):
+    """Simulated day of (KPER, KSTP); the inverse of day_step()"""
+    return int(sum(perlen[:kper - 1])) + kstp
+
+
+def read_perlen(model_dir):
+    """PERLEN of every stress period of the model's DIS file"""
+    from modflow_array_io import find_package_file, read_dis
+    return [float(length) for length in read_dis(find_package_file(os.path.join(model_dir, NAME_FILE), 'DIS'))['perlen']]
+
+
+def oc_lines(lines, steps, words):
+    """
+    modflow_GMRW.oc lines writing ``words`` at ``steps`` ((KPER, KSTP)) only
+
+    The header (formats, units, COMPACT BUDGET) is kept; the PERIOD
+    blocks of the original file are replaced.
+    """
+    header = []
+    for line in lines:
+        if line.strip().upper().startswith('PERIOD'):
+            break
+        header.append(line)
+    body = []
+    if words:
+        for kper, kstp in steps:
+            body.append(f'PERIOD {kper} STEP {kstp}')
+            body.extend(words)
+    return header + body
+
+
+def profile_files(model_dir, name):
+    """
+    New contents {file name: lines} of the files a profile changes
+
+    Empty for the full profile.
+    """
+    profile = PROFILES[name]
+    if profile is None:
+        return {}
+    link_lines = _read_lines(os.path.join(model_dir, LINK_FILE))
+    _, days = read_output_days(link_lines)
+    last_day = simulation_days(read_cio_period(os.path.join(model_dir, 'file.cio')))
+    output_days = [last_day] if profile['days'] == 'last' else days
+    return {
+        LINK_FILE: edit_link_lines(link_lines, profile['flags'], output_days),
+        OC_FILE: oc_lines(_read_lines(os.path.join(model_dir, OC_FILE)),
+                          [day_step(read_perlen(model_dir), last_day)], profile['oc']),
+    }
+
+
+def apply_profile(model_dir, name):
+    """Rewrite the files of model_dir for an output profile; returns {file: lines}"""
+    files = profile_files(model_dir, name)
+    for file, lines in files.items():
+        _replace_file(os.path.join(model_dir, file), '\n'.join(lines) + '\n')
+    return files
+
+
+@contextmanager
+def run_profile(model_dir, name):
+    """Apply an output profile to model_dir for the duration of a run, then restore it"""
+    originals = {}
+    for file in profile_files(model_dir, name):
+        with open(os.path.join(model_dir, file), 'r', newline='') as f:
+            originals[file] = f.read()
+    try:
+        yield apply_profile(model_dir, name)
+    finally:
+        for file, text in originals.items():
+            _replace_file(os.path.join(model_dir, file), text)
+
+
+def measure_profiles(model_dir, names, work_root='profile_runs', stall_window=DEFAULT_STALL_WINDOW):
+    """
+    Run the model once per profile in scratch copies and measure each run
+
+    Returns {profile: {'wall_seconds', 'output_bytes', 'write_bytes',
+    'returncode'}}; the scratch directories are removed.
+    """
+    # The runner imports this module
+    from run_scenarios import create_work_dir
+    from run_swatmodflow_with_log import list_model_outputs, stream_swat_modflow
+
+    results = {}
+    for name in names:
+        work_dir = os.path.join(work_root, name)
+        if os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+        create_work_dir(model_dir, work_dir)
+        try:
+            apply_profile(work_dir, name)
+            stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            start = time.perf_counter()
+            run = stream_swat_modflow(os.path.join(work_dir, f'console_output_{stamp}.txt'),
+                                      work_dir=work_dir, quiet=True, stall_window=stall_window)
+            wall = time.perf_counter() - start
+            sizes = sum(os.path.getsize(os.path.join(work_dir, file)) for file in list_model_outputs(work_dir)
+                        if not file.startswith('console_output_'))
+            results[name] = {
+                'wall_seconds': wall,
+                'output_bytes': sizes,
+                'write_bytes': run['resources']['write_bytes'],
+                'returncode': run['returncode'],
+            }
+        finally:
+            shutil.rmtree(work_dir)
+    if os.path.isdir(work_root) and not os.listdir(work_root):
+        os.rmdir(work_root)
+    return results
+
+
+def print_profile_report(results):
+    """Table of output size and wall time per profile, with savings against full"""
+    base = results.get('full')
+    print(f"  {'Profile':<14} {'Output MB':>10} {'Wall s':>9} {'Saved MB':>10} {'Saved s':>9}")
+    for name, result in results.items():
+        line = f"{name:<14} {result['output_bytes'] / 1024**2:10.1f} {result['wall_seconds']:9.1f}"
+        if base is not None and name != 'full':
+            line += (f" {(base['output_bytes'] - result['output_bytes']) / 1024**2:10.1f}"
+                     f" {base['wall_seconds'] - result['wall_seconds']:9.1f}")
+        status = '✓' if result['returncode'] == 0 else '✗'
+        print(f"{status} {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SWAT-MODFLOW output profiles')
+    parser.add_argument('profile', nargs='?', choices=list(PROFILES), help='profile to show')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--measure', nargs='*', choices=list(PROFILES), default=None,
+                        help='run the model with these profiles (default: all) and report the savings')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SWAT-MODFLOW OUTPUT PROFILES")
+    print("="*70)
+    if args.measure is not None:
+        results = measure_profiles(args.model_dir, args.measure or list(PROFILES))
+        print_profile_report(results)
+        return all(result['returncode'] == 0 for result in results.values())
+
+    for name in [args.profile] if args.profile else list(PROFILES):
+        files = profile_files(args.model_dir, name)
+        if not files:
+            print(f"{name}: model files unchanged")
+            continue
+        flags = PROFILES[name]['flags']
+        _, days = read_output_days(files[LINK_FILE])
+        print(f"{name}: outputs {', '.join(flag for flag, on in flags.items() if on) or 'none'}; "
+              f"output days {days}; OC {', '.join(PROFILES[name]['oc']) or 'no output'}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from process_monitor import DEFAULT_STALL_WINDOW
+from run_cache import cache_lookup, cache_store, hash_model_inputs, restore_outputs
+from run_profiles import PROFILES, apply_profile
+from run_swatmodflow_with_log import (
+    generate_success_log,
+    list_model_inputs,
+    list_model_outputs,
+    stream_swat_modflow,
+)
+
+# Example scenario spec (JSON):
+#
+# {
+#   "base_dir": ".",
+#   "results_dir": "scenario_results",
+#   "stall_window": 900,
+#   "profile": "lean",
+#   "scenarios": [
+#     {"name": "pumping_x2",
+#      "files": {"modflow_GMRW.wel": "scenarios/modflow_GMRW_x2.wel"}},
+#     {"name": "recharge_0.002",
+#      "replace": {"modflow_GMRW.rch": [["0.001000", "0.002000"]]}}
+#   ]
+# }
+#
+# "files" copies a prepared replacement into the work directory and
+# "replace" applies text substitutions to the base file. Every other input
+# file is hard-linked from base_dir, so a work directory costs almost no
+# disk space or time to create. "stall_window" (seconds, also allowed per
+# scenario) is how long a run may make no progress before it is terminated,
+# and "profile" (also per scenario) the output profile of run_profiles.py.
+
+
+def read_scenario_spec(spec_file):
+    """Read a scenario spec, resolving paths relative to the spec file"""
+    with open(spec_file, 'r') as f:
+        spec = json.load(f)
+
+    spec_dir = os.path.dirname(os.path.abspath(spec_file))
+    spec['base_dir'] = os.path.join(spec_dir, spec.get('base_dir', '.'))
+    spec['results_dir'] = os.path.join(spec_dir, spec.get('results_dir', 'scenario_results'))
+
+    names = set()
+    for scenario in spec['scenarios']:
+        name = scenario['name']
+        # The name is a directory under results_dir and results_dir/_work:
+        # it must not resolve to either of them or to a parent
+        if (name in names or name != os.path.basename(name) or name in ('', '.', '..', '_work')
+                or (os.altsep and os.altsep in name)):
+            raise ValueError(f"Invalid or duplicate scenario name: {name!r}")
+        names.add(name)
+        scenario.setdefault('stall_window', spec.get('stall_window', DEFAULT_STALL_WINDOW))
+        scenario.setdefault('profile', spec.get('profile', 'full'))
+        if scenario['profile'] not in PROFILES:
+            raise ValueError(f"Unknown output profile for scenario {name}: {scenario['profile']}")
+        scenario['files'] = {target: os.path.join(spec_dir, source)
+                             for target, source in scenario.get('files', {}).items()}
+    return spec
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        # Different file system or no hard-link support
+        shutil.copy2(source, target)
+
+
+def create_work_dir(base_dir, work_dir, files=None, replace=None):
+    """
+    Create an isolated model directory for one run
+
+    Unchanged inputs are hard-linked from base_dir. Files listed in
+    ``files`` (target name -> source path) are copied in, and files listed
+    in ``replace`` (target name -> [[old, new], ...]) are copied from
+    base_dir with the text substitutions applied.
+    """
+    files = files or {}
+    replace = replace or {}
+    os.makedirs(work_dir)
+
+    edited = set(files) | set(replace)
+    for name in list_model_inputs(base_dir):
+        if name not in edited:
+            _link_or_copy(os.path.join(base_dir, name), os.path.join(work_dir, name))
+
+    for name, source in files.items():
+        shutil.copyfile(source, os.path.join(work_dir, name))
+
+    for name, substitutions in replace.items():
+        source = os.path.join(work_dir, name) if name in files else os.path.join(base_dir, name)
+        with open(source, 'r') as f:
+            content = f.read()
+        for old, new in substitutions:
+            if old not in content:
+                raise ValueError(f"'{old}' not found in {name}")
+            content = content.replace(old, new)
+        target = os.path.join(work_dir, name)
+        if os.path.exists(target):
+            os.remove(target)
+        with open(target, 'w') as f:
+            f.write(content)
+
+    return work_dir
+
+
+def collect_results(work_dir, result_dir):
+    """Move the run outputs of work_dir into result_dir"""
+    os.makedirs(result_dir, exist_ok=True)
+    moved = []
+    for name in list_model_outputs(work_dir):
+        shutil.move(os.path.join(work_dir, name), os.path.join(result_dir, name))
+        moved.append(name)
+    return moved
+
+
+def run_scenario(scenario, base_dir, results_dir, keep_work_dir=False, cache_dir=None):
+    """Run one scenario in its own work directory (process pool worker)"""
+    name = scenario['name']
+    work_dir = os.path.join(results_dir, '_work', name)
+    result_dir = os.path.join(results_dir, name)
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+
+    summary = {'name': name, 'success': False, 'work_dir': work_dir, 'result_dir': result_dir}
+    try:
+        create_work_dir(base_dir, work_dir, scenario.get('files'), scenario.get('replace'))
+        # The work directory is scratch: the profile stays applied, and is
+        # part of the inputs the cache key is computed from
+        apply_profile(work_dir, scenario['profile'])
+
+        if cache_dir is not None:
+            key = hash_model_inputs(work_dir)
+            entry = cache_lookup(key, cache_dir)
+            summary['cache_key'] = key
+            if entry is not None:
+                restore_outputs(entry, work_dir, cache_dir)
+                summary.update({'success': True, 'cache_hit': True, 'duration_seconds': 0.0})
+                summary['outputs'] = collect_results(work_dir, result_dir)
+                return summary
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        run = stream_swat_modflow(os.path.join(work_dir, f'console_output_{stamp}.txt'),
+                                  work_dir=work_dir, quiet=True, stall_window=scenario['stall_window'])
+        if os.path.exists(os.path.join(work_dir, 'modflow_GMRW.out')):
+            from solver_metrics import write_solver_metrics
+            write_solver_metrics(work_dir, run['day_times'], run['end_time'].timestamp(),
+                                 labels={'scenario': name})
+        generate_success_log(work_dir)
+        summary.update({
+            'success': run['returncode'] == 0 and not run['stalled'],
+            'returncode': run['returncode'],
+            'duration_seconds': run['duration'].total_seconds(),
+            'simulated_days': run['simulated_days'],
+            'profile': scenario['profile'],
+            'resources': run['resources'],
+        })
+        if run['stalled']:
+            summary['error'] = f"stalled: {run['resources']['stall_reason']}"
+        if cache_dir is not None and summary['success']:
+            cache_store(summary['cache_key'], work_dir, list_model_outputs(work_dir), cache_dir,
+                        info={'scenario': name})
+        summary['outputs'] = collect_results(work_dir, result_dir)
+    except Exception as e:
+        summary['error'] = str(e)
+    finally:
+        if not keep_work_dir and os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+
+    return summary
+
+
+def run_batch(spec_file, workers=None, keep_work_dirs=False, cache_dir=None):
+    """
+    Run every scenario of a spec through a process pool
+
+    Returns the list of per-scenario summaries, which is also written to
+    batch_summary.json in the results directory. With cache_dir set,
+    scenarios whose inputs match a cached run are restored, not re-run.
+    """
+    spec = read_scenario_spec(spec_file)
+    scenarios = spec['scenarios']
+    workers = workers or min(len(scenarios), os.cpu_count() or 1)
+    os.makedirs(spec['results_dir'], exist_ok=True)
+
+    print(f"Running {len(scenarios)} scenarios on {workers} workers")
+    print(f"Base model: {spec['base_dir']}")
+    print(f"Results: {spec['results_dir']}\n")
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_scenario, scenario, spec['base_dir'], spec['results_dir'],
+                               keep_work_dirs, cache_dir)
+                   for scenario in scenarios]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if summary.get('cache_hit'):
+                print(f"✓ {summary['name']}: restored from cache ({summary['cache_key'][:12]})")
+            elif summary['success']:
+                print(f"✓ {summary['name']}: {summary['duration_seconds']:.0f} s, "
+                      f"{len(summary['outputs'])} output files")
+            else:
+                print(f"✗ {summary['name']}: {summary.get('error') or 'exit code ' + str(summary.get('returncode'))}")
+
+    work_root = os.path.join(spec['results_dir'], '_work')
+    if os.path.isdir(work_root) and not os.listdir(work_root):
+        os.rmdir(work_root)
+
+    order = {scenario['name']: i for i, scenario in enumerate(scenarios)}
+    summaries.sort(key=lambda s: order[s['name']])
+    with open(os.path.join(spec['results_dir'], 'batch_summary.json'), 'w') as f:
+        json.dump(summaries, f, indent=2)
+
+    succeeded = sum(s['success'] for s in summaries)
+    print(f"\n{succeeded}/{len(summaries)} scenarios completed successfully")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run SWAT-MODFLOW scenarios in parallel')
+    parser.add_argument('spec', help='scenario spec (JSON)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of parallel runs (default: number of cores)')
+    parser.add_argument('--keep-work-dirs', action='store_true',
+                        help='keep the per-scenario work directories after the run')
+    parser.add_argument('--cache-dir', default=None,
+                        help='reuse/store outputs in this run cache (see run_cache.py)')
+    args = parser.parse_args()
+
+    run_batch(args.spec, args.workers, args.keep_work_dirs, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,52 @@
+import argparse
 import subprocess
 import datetime
+import fnmatch
+import json
 import os
-import numpy as np
+import re
+import shutil
+import threading
+import time
+
+from process_monitor import DEFAULT_CHECK_INTERVAL, DEFAULT_STALL_WINDOW, ProcessMonitor
+from run_profiles import PROFILES, run_profile
+from swat_cio import read_cio_period, simulation_days
+
+DAY_PATTERN = re.compile(r'Day:\s*(\d+)')
+YEAR_PATTERN = re.compile(r'Executing year\s+(\d+)')
+
+# Files written by SWAT-MODFLOW3.exe (plus the logs written by this script).
+# Everything else in the model directory is treated as a model input.
+MODEL_OUTPUT_PATTERNS = (
+    '*.out', 'output.*', 'input.std', 'chan.deg', 'watout.dat', 'fort.*',
+    'swatmf_log', 'swatmf_out_*', 'modflow_GMRW.hed', 'modflow_GMRW.ccf',
+    'modflow_GMRW.hff', 'rt3d.restart', 'CPU', 'sub_km', 'auto_irrig_hrus',
+    'console_output_*', 'RUN_SUCCESS_LOG*', 'solver_metrics.*', 'run_record.json'
+)
+
+# Project files that live next to the model but are never read by it
+NON_MODEL_PATTERNS = ('*.py', '*.md', '*.png', '*.csv', '*.jsonl', '*.json', '*.sqlite', '*.sqlite-*', '.*')
+
+def is_model_output(name):
+    """True if a file name in the model directory is written by a run"""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in MODEL_OUTPUT_PATTERNS)
+
+def list_model_inputs(model_dir='.'):
+    """Sorted names of the files in model_dir that SWAT-MODFLOW reads"""
+    names = []
+    for entry in os.scandir(model_dir):
+        if not entry.is_file() or is_model_output(entry.name):
+            continue
+        if any(fnmatch.fnmatch(entry.name, pattern) for pattern in NON_MODEL_PATTERNS):
+            continue
+        names.append(entry.name)
+    return sorted(names)
+
+def list_model_outputs(model_dir='.'):
+    """Sorted names of the run output files present in model_dir"""
+    return sorted(entry.name for entry in os.scandir(model_dir)
+                  if entry.is_file() and is_model_output(entry.name))
 
 def parse_modflow_output(output_file):
     """
@@ -13,53 +58,51 @@ def parse_modflow_output(output_file):
         'mass_balance_error': 0.0,
         'head_range_min': None,
         'head_range_max': None,
-        'execution_time': None
+        'execution_time': None,
+        'timeseries': None
     }
     
     if not os.path.exists(output_file):
         return stats
     
     try:
-        with open(output_file, 'r') as f:
-            lines = f.readlines()
-            
-        # Count time steps
-        for line in lines:
-            if 'TIME STEP' in line and 'STRESS PERIOD' in line:
-                parts = line.split()
-                for i, part in enumerate(parts):
-                    if part == 'STEP' and i+1 < len(parts):
-                        try:
-                            timestep = int(parts[i+1])
-                            if timestep > stats['total_timesteps']:
-                                stats['total_timesteps'] = timestep
-                        except:
-                            pass
-            
-            # Check for convergence issues
-            if 'FAILED TO CONVERGE' in line or 'ERROR' in line:
-                stats['converged'] = False
-            
-            # Get mass balance error
-            if 'PERCENT DISCREPANCY' in line:
-                parts = line.split('=')
-                if len(parts) > 1:
-                    try:
-                        error = float(parts[1].strip().split()[0])
-                        stats['mass_balance_error'] = error
-                    except:
-                        pass
-            
-            # Get head range
-            if 'HEAD IN LAYER' in line:
-                # Parse subsequent lines for head values
-                pass
+        from modflow_listing import read_listing_timeseries
+        series = read_listing_timeseries(output_file)
+        stats['timeseries'] = series
+        
+        if len(series):
+            stats['total_timesteps'] = int(series.kstp.max())
+            stats['converged'] = bool(series.converged.all())
+        
+        # Get mass balance error from the last printed budget
+        budgets = series[series.budget]
+        if len(budgets):
+            stats['mass_balance_error'] = float(budgets.pct_discrepancy_cum[-1])
                 
     except Exception as e:
         print(f"Error parsing output file: {e}")
     
     return stats
 
+def parse_head_file(head_file):
+    """
+    Read the active-cell head range of the last saved time step
+    """
+    heads = {'records': 0, 'kstp': None, 'kper': None, 'min': None, 'max': None}
+    if not os.path.exists(head_file) or os.path.getsize(head_file) == 0:
+        return heads
+    
+    try:
+        from modflow_head_file import FormattedHeadFile, active_head_range
+        with FormattedHeadFile(head_file) as hed:
+            heads['records'] = len(hed)
+            heads['kstp'], heads['kper'] = hed.kstpkper[-1]
+            heads['min'], heads['max'] = active_head_range(hed.get_data())
+    except Exception as e:
+        print(f"Error reading head file: {e}")
+    
+    return heads
+
 def parse_swatmf_log(log_file):
     """
     Parse SWAT-MODFLOW log file
@@ -86,6 +129,24 @@ def parse_swatmf_log(log_file):
     
     return log_data
 
+def summarize_solver(output_dir, series=None):
+    """
+    Solver summary of a run: from solver_metrics.jsonl when it is newer
+    than the listing (it has the wall times), else from the listing series
+    """
+    from solver_metrics import METRICS_JSONL, build_solver_metrics, read_metrics_jsonl, summarize_metrics
+    metrics_file = os.path.join(output_dir, METRICS_JSONL)
+    listing = os.path.join(output_dir, 'modflow_GMRW.out')
+    try:
+        if (os.path.exists(metrics_file) and
+                (not os.path.exists(listing) or os.path.getmtime(metrics_file) >= os.path.getmtime(listing))):
+            return summarize_metrics(read_metrics_jsonl(metrics_file))
+        if series is not None:
+            return summarize_metrics(build_solver_metrics(series))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error summarizing solver metrics: {e}")
+    return None
+
 def generate_success_log(output_dir='.'):
     """
     Generate a comprehensive success log based on SWAT-MODFLOW run outputs
@@ -95,6 +156,31 @@ def generate_success_log(output_dir='.'):
     # Parse output files
     modflow_stats = parse_modflow_output(os.path.join(output_dir, 'modflow_GMRW.out'))
     swatmf_log = parse_swatmf_log(os.path.join(output_dir, 'swatmf_log'))
+    heads = parse_head_file(os.path.join(output_dir, 'modflow_GMRW.hed'))
+    if heads['min'] is not None:
+        head_range = f"{heads['min']:.1f} to {heads['max']:.1f} meters"
+        head_step = f"Stress Period {heads['kper']}, Timestep {heads['kstp']}"
+    else:
+        head_range = "not available (modflow_GMRW.hed not read)"
+        head_step = "Last Saved Timestep"
+    solver = summarize_solver(output_dir, modflow_stats['timeseries'])
+    if solver is not None:
+        outer_step = solver['outer_max_step']
+        newton_line = (f"{solver['outer_total']:,} outer iterations, {solver['outer_mean']:.1f} mean, "
+                       f"{solver['outer_max']} max (SP {outer_step['kper']}, TS {outer_step['kstp']})")
+        gmres_line = f"{solver['inner_total']:,} inner iterations, {solver['inner_mean']:.1f} mean per step"
+        backtrack_line = (f"{solver['backtracks']} events" if solver['backtracks']
+                          else "Not required (0 events)")
+        head_change_line = (f"{solver['max_head_change']:.4g} m (largest outer-iteration change)"
+                            if solver['max_head_change'] is not None else "not printed (IPRNWT = 0)")
+        if solver['slowest_step'] is not None:
+            slowest = solver['slowest_step']
+            wall_line = (f"{solver['wall_total']:.1f} s total, slowest day {slowest['day']} "
+                         f"({slowest['wall_seconds']:.2f} s)")
+        else:
+            wall_line = "not measured (run not streamed)"
+    else:
+        newton_line = gmres_line = backtrack_line = head_change_line = wall_line = "not available"
     
     # Use ASCII-compatible symbols instead of Unicode
     check = '[OK]'
@@ -284,10 +370,10 @@ Budget Components Saved:
                       HEAD SOLUTION RESULTS
 ================================================================================
 
-Head Distribution (Layer 1, End of Timestep 1):
-------------------------------------------------
+Head Distribution (Layer 1, {head_step}):
+{"-" * (len(head_step) + 31)}
 Sample Head Values (meters):
-  Active Cells Range...: 285.5 to 342.9 meters
+  Active Cells Range...: {head_range}
   Inactive Cells.......: -999.0 (no-flow boundaries)
 
 Head Output:
@@ -361,10 +447,12 @@ Mass Balance Error.....: {modflow_stats['mass_balance_error']:.2f}% (excellent)
 
 Solver Performance:
 -------------------
-GMRES Linear Solver....: {check} Performed efficiently
-Newton Iterations......: Converged within limits
-Backtracking...........: Not required (inactive)
-Overall Performance....: {check} EXCELLENT
+Newton Iterations......: {newton_line}
+GMRES Linear Solver....: {gmres_line}
+Backtracking...........: {backtrack_line}
+Max Head Change........: {head_change_line}
+Wall Time per Day......: {wall_line}
+Per-Step Metrics.......: solver_metrics.jsonl, solver_metrics.prom
 
 ================================================================================
                       MODEL QUALITY CHECKS
@@ -468,10 +556,215 @@ For questions or issues, refer to:
     
     return log_filename
 
-def run_swat_modflow():
+def _read_total_days(work_dir):
+    """Number of simulated days from file.cio, or None if it can't be read"""
+    try:
+        return simulation_days(read_cio_period(os.path.join(work_dir, 'file.cio')))
+    except (OSError, KeyError, ValueError):
+        return None
+
+def format_progress(day, total_days, elapsed, year=None):
+    """
+    Format simulation progress as simulated days per second of wall time
+    """
+    rate = day / elapsed if elapsed > 0 else 0.0
+    text = f"  Year {year} | Day {day}" if year else f"  Day {day}"
+    if total_days:
+        text += f"/{total_days} ({100.0 * day / total_days:.1f}%)"
+    text += f" | {rate:.1f} days/s"
+    if total_days and rate > 0:
+        eta = datetime.timedelta(seconds=int((total_days - day) / rate))
+        text += f" | ETA {eta}"
+    return text
+
+def format_resources(resources):
+    """One-line summary of a ProcessMonitor resource profile"""
+    def value(key, fmt):
+        return format(resources[key], fmt) if resources.get(key) is not None else 'n/a'
+    # Bytes the process wrote (/proc I/O), else the growth of its output files
+    written = resources.get('write_bytes')
+    written = resources.get('output_bytes', 0) if written is None else written
+    return (f"Resources: peak RSS {value('peak_rss_mb', '.1f')} MB | "
+            f"CPU {value('cpu_seconds', '.1f')} s ({value('cpu_utilisation', '.0%')} of wall) | "
+            f"written {written / 1024**2:.1f} MB")
+
+def write_run_record(work_dir, record):
+    """Write the run record (timing, exit code, resource profile) as JSON"""
+    path = os.path.join(work_dir, 'run_record.json')
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2, default=str)
+    return path
+
+def _copy_stream(stream, sink, on_line=None):
+    """Copy a child process pipe into an open file line by line"""
+    for line in stream:
+        sink.write(line)
+        if on_line is not None:
+            on_line(line)
+    stream.close()
+
+def _resolve_executable(executable, work_dir):
+    candidate = os.path.join(work_dir, executable)
+    return os.path.abspath(candidate) if os.path.exists(candidate) else executable
+
+def stream_swat_modflow(console_log, work_dir='.', executable='SWAT-MODFLOW3.exe',
+                        timeout=None, report_interval=5.0, quiet=False,
+                        stall_window=DEFAULT_STALL_WINDOW, stop_check=None,
+                        check_interval=DEFAULT_CHECK_INTERVAL):
+    """
+    Run SWAT-MODFLOW3.exe streaming its console output to console_log
+    
+    stdout is written to the log as it arrives and scanned for the simulated
+    year and day to report throughput and ETA. stderr goes to a side file
+    that is appended to the log after the run, so memory use stays flat
+    however long the run is. A ProcessMonitor terminates the run once it
+    makes no progress for stall_window seconds; timeout (seconds, None for
+    no limit) is only a hard upper bound. stop_check (see ProcessMonitor)
+    can end the run early. Returns a dict describing the run, including
+    its resource profile.
+    """
+    total_days = _read_total_days(work_dir)
+    start_time = datetime.datetime.now()
+    start_clock = time.monotonic()
+    progress = {'year': 0, 'day': 0, 'last_report': start_clock}
+    day_times = []
+    
+    def on_stdout(line):
+        if 'Day:' in line:
+            match = DAY_PATTERN.search(line)
+            if match:
+                progress['day'] = int(match.group(1))
+                day_times.append((progress['day'], time.time()))
+        elif 'Executing year' in line:
+            match = YEAR_PATTERN.search(line)
+            if match:
+                progress['year'] = int(match.group(1))
+        
+        now = time.monotonic()
+        if not quiet and now - progress['last_report'] >= report_interval:
+            progress['last_report'] = now
+            print(format_progress(progress['day'], total_days, now - start_clock, progress['year']),
+                  flush=True)
+    
+    stderr_log = console_log + '.stderr'
+    try:
+        with open(console_log, 'w') as log, open(stderr_log, 'w+') as err:
+            log.write("SWAT-MODFLOW3 Console Output\n")
+            log.write(f"Start: {start_time}\n")
+            log.write("\n" + "="*80 + "\n")
+            log.write("STDOUT:\n")
+            log.flush()
+            
+            process = subprocess.Popen(
+                [_resolve_executable(executable, work_dir)],
+                cwd=work_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+            readers = [
+                threading.Thread(target=_copy_stream, args=(process.stdout, log, on_stdout), daemon=True),
+                threading.Thread(target=_copy_stream, args=(process.stderr, err), daemon=True)
+            ]
+            for reader in readers:
+                reader.start()
+            monitor = ProcessMonitor(process, work_dir, stall_window, progress=lambda: progress['day'],
+                                     stop_check=stop_check, check_interval=check_interval)
+            monitor.start()
+            
+            # The STDERR section and trailer are written however the run
+            # ends (a TimeoutExpired still propagates to the caller)
+            try:
+                process.wait(timeout=timeout)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                monitor.stop()
+                for reader in readers:
+                    reader.join()
+                returncode = process.returncode
+                resources = monitor.profile()
+                
+                end_time = datetime.datetime.now()
+                elapsed = time.monotonic() - start_clock
+                
+                log.write("\n" + "="*80 + "\n")
+                log.write("STDERR:\n")
+                err.seek(0)
+                if err.read(1):
+                    err.seek(0)
+                    shutil.copyfileobj(err, log)
+                else:
+                    log.write("(empty)")
+                log.write("\n" + "="*80 + "\n")
+                log.write(f"End: {end_time}\n")
+                log.write(f"Duration: {end_time - start_time}\n")
+                log.write(f"Exit Code: {returncode}\n")
+                log.write(format_resources(resources) + "\n")
+                if resources['stalled']:
+                    log.write(f"Stalled: {resources['stall_reason']}\n")
+                if resources['stopped_early']:
+                    log.write(f"Stopped early: {resources['stop_reason']}\n")
+    finally:
+        if os.path.exists(stderr_log):
+            os.remove(stderr_log)
+    
+    return {
+        'returncode': returncode,
+        'start_time': start_time,
+        'end_time': end_time,
+        'duration': end_time - start_time,
+        'simulated_days': progress['day'],
+        'total_days': total_days,
+        'days_per_second': progress['day'] / elapsed if elapsed > 0 else 0.0,
+        'day_times': day_times,
+        'stalled': resources['stalled'],
+        'stopped_early': resources['stopped_early'],
+        'resources': resources,
+        'console_log': console_log
+    }
+
+def capture_swat_modflow(work_dir, stall_window=DEFAULT_STALL_WINDOW, timeout=None):
+    """
+    Run SWAT-MODFLOW3.exe capturing its whole console output
+    
+    Returns (exit code, resource profile, stdout, stderr).
+    """
+    process = subprocess.Popen(
+        [_resolve_executable('SWAT-MODFLOW3.exe', work_dir)],
+        cwd=work_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    monitor = ProcessMonitor(process, work_dir, stall_window)
+    monitor.start()
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+        monitor.stop()
+    return process.returncode, monitor.profile(), stdout, stderr
+
+def run_swat_modflow(stream=True, work_dir=None, stall_window=DEFAULT_STALL_WINDOW, timeout=None,
+                     profile='full'):
     """
     Run SWAT-MODFLOW3.exe and generate success log
+    
+    With stream=True the console output is written to the log while the
+    model runs and progress is reported as it goes; stream=False keeps the
+    original blocking capture of the whole output. Either way the run is
+    terminated if it stalls for stall_window seconds, and its resource
+    profile is saved in run_record.json. ``profile`` selects the output
+    profile (see run_profiles.py) applied for the duration of the run.
+    Returns True only if the model exited with code 0 without stalling.
     """
+    work_dir = work_dir or os.getcwd()
+    
     print("\n" + "="*80)
     print("           STARTING SWAT-MODFLOW3 EXECUTION")
     print("           Great Miami River Watershed Model")
@@ -479,17 +772,20 @@ def run_swat_modflow():
     
     start_time = datetime.datetime.now()
     print(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    console_log = os.path.join(work_dir, f'console_output_{start_time.strftime("%Y%m%d_%H%M%S")}.txt')
     
     try:
         # Run SWAT-MODFLOW3.exe
         print("Running SWAT-MODFLOW3.exe...")
-        result = subprocess.run(
-            ['SWAT-MODFLOW3.exe'],
-            cwd=os.getcwd(),
-            capture_output=True,
-            text=True,
-            timeout=3600  # 1 hour timeout
-        )
+        if profile != 'full':
+            print(f"Output profile: {profile}")
+        with run_profile(work_dir, profile):
+            if stream:
+                run = stream_swat_modflow(console_log, work_dir=work_dir, timeout=timeout,
+                                          stall_window=stall_window)
+                returncode, resources, stdout, stderr = run['returncode'], run['resources'], None, None
+            else:
+                returncode, resources, stdout, stderr = capture_swat_modflow(work_dir, stall_window, timeout)
         
         end_time = datetime.datetime.now()
         duration = end_time - start_time
@@ -497,36 +793,76 @@ def run_swat_modflow():
         print(f"\nExecution completed!")
         print(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Duration: {duration}")
-        print(f"Exit Code: {result.returncode}")
+        print(f"Exit Code: {returncode}")
+        if stream:
+            print(f"Throughput: {run['days_per_second']:.1f} simulated days/s")
+        print(format_resources(resources))
+        
+        write_run_record(work_dir, {
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'duration_seconds': duration.total_seconds(),
+            'returncode': returncode,
+            'simulated_days': run['simulated_days'] if stream else None,
+            'total_days': run['total_days'] if stream else _read_total_days(work_dir),
+            'stall_window': stall_window,
+            'timeout': timeout,
+            'console_log': os.path.basename(console_log),
+            'profile': profile,
+            'resources': resources,
+        })
         
-        if result.returncode == 0:
+        if resources['stalled']:
+            print(f"\n✗ SWAT-MODFLOW3 stalled and was terminated: {resources['stall_reason']}")
+        elif returncode == 0:
             print("\n✓ SWAT-MODFLOW3 executed successfully!")
         else:
-            print(f"\n✗ SWAT-MODFLOW3 execution failed with exit code {result.returncode}")
-            if result.stderr:
-                print(f"Error output: {result.stderr}")
+            print(f"\n✗ SWAT-MODFLOW3 execution failed with exit code {returncode}")
+            if stderr:
+                print(f"Error output: {stderr}")
+        
+        # Per-time-step solver metrics (wall times only when streamed)
+        try:
+            from solver_metrics import METRICS_JSONL, write_solver_metrics
+            write_solver_metrics(work_dir, run['day_times'] if stream else None,
+                                 run['end_time'].timestamp() if stream else None)
+            print(f"✓ Solver metrics saved: {METRICS_JSONL}")
+        except (OSError, ValueError) as e:
+            print(f"✗ Solver metrics not written: {e}")
         
         # Generate success log
         print("\nGenerating success log...")
-        log_file = generate_success_log()
+        log_file = generate_success_log(work_dir)
         print(f"✓ Success log saved: {log_file}")
         
         # Also save console output
-        console_log = f'console_output_{start_time.strftime("%Y%m%d_%H%M%S")}.txt'
-        with open(console_log, 'w') as f:
-            f.write(f"SWAT-MODFLOW3 Console Output\n")
-            f.write(f"Start: {start_time}\n")
-            f.write(f"End: {end_time}\n")
-            f.write(f"Duration: {duration}\n")
-            f.write(f"Exit Code: {result.returncode}\n")
-            f.write("\n" + "="*80 + "\n")
-            f.write("STDOUT:\n")
-            f.write(result.stdout if result.stdout else "(empty)")
-            f.write("\n" + "="*80 + "\n")
-            f.write("STDERR:\n")
-            f.write(result.stderr if result.stderr else "(empty)")
+        if not stream:
+            with open(console_log, 'w') as f:
+                f.write(f"SWAT-MODFLOW3 Console Output\n")
+                f.write(f"Start: {start_time}\n")
+                f.write(f"End: {end_time}\n")
+                f.write(f"Duration: {duration}\n")
+                f.write(f"Exit Code: {returncode}\n")
+                f.write(format_resources(resources) + "\n")
+                f.write("\n" + "="*80 + "\n")
+                f.write("STDOUT:\n")
+                f.write(stdout if stdout else "(empty)")
+                f.write("\n" + "="*80 + "\n")
+                f.write("STDERR:\n")
+                f.write(stderr if stderr else "(empty)")
         
-        print(f"✓ Console output saved: {console_log}")
+        print(f"✓ Console output saved: {os.path.basename(console_log)}")
+        
+        if resources['stalled']:
+            print("\n" + "="*80)
+            print("           RUN TERMINATED (STALLED)")
+            print("="*80 + "\n")
+            return False
+        if returncode != 0:
+            print("\n" + "="*80)
+            print(f"           RUN FAILED (EXIT CODE {returncode})")
+            print("="*80 + "\n")
+            return False
         
         print("\n" + "="*80)
         print("           RUN COMPLETED SUCCESSFULLY")
@@ -535,7 +871,7 @@ def run_swat_modflow():
         return True
         
     except subprocess.TimeoutExpired:
-        print("\n✗ ERROR: SWAT-MODFLOW3 execution timed out (>1 hour)")
+        print(f"\n✗ ERROR: SWAT-MODFLOW3 execution exceeded the {timeout:.0f} s timeout")
         return False
     except FileNotFoundError:
         print("\n✗ ERROR: SWAT-MODFLOW3.exe not found in current directory")
@@ -544,9 +880,47 @@ def run_swat_modflow():
         print(f"\n✗ ERROR: {str(e)}")
         return False
 
-if __name__ == "__main__":
-    success = run_swat_modflow()
+def main():
+    parser = argparse.ArgumentParser(description='Run SWAT-MODFLOW3 and write the success log')
+    parser.add_argument('--work-dir', default=None, help='model directory (default: current)')
+    parser.add_argument('--no-stream', action='store_true', help='capture the console output at the end')
+    parser.add_argument('--stall-window', type=float, default=DEFAULT_STALL_WINDOW,
+                        help=f'seconds without progress before the run is terminated '
+                             f'(default: {DEFAULT_STALL_WINDOW:.0f}, 0 disables)')
+    parser.add_argument('--timeout', type=float, default=None, help='hard limit in seconds (default: none)')
+    parser.add_argument('--profile', choices=list(PROFILES), default='full',
+                        help='output profile: full (default), lean or observations (see run_profiles.py)')
+    parser.add_argument('--window', nargs=2, type=datetime.date.fromisoformat, metavar=('START', 'END'),
+                        help='simulate only this window (YYYY-MM-DD) in a trimmed copy (see sub_period.py)')
+    parser.add_argument('--warmup', type=int, default=0, help='warm-up years before the window (default: 0)')
+    parser.add_argument('--window-dir', default=None, help='directory of the trimmed copy '
+                                                           '(default: window_<start>_<end>); an existing '
+                                                           'one is replaced only if it is a window workspace')
+    args = parser.parse_args()
+    
+    work_dir = args.work_dir
+    if args.window:
+        from sub_period import create_sub_period, remove_sub_period
+        start, end = args.window
+        work_dir = args.window_dir or f'window_{start:%Y%m%d}_{end:%Y%m%d}'
+        if os.path.exists(work_dir):
+            try:
+                remove_sub_period(work_dir, args.work_dir or '.')
+            except ValueError as e:
+                print(f"✗ {e}")
+                return False
+        info = create_sub_period(args.work_dir or '.', work_dir, start, end, args.warmup)
+        print(f"✓ Window {start} to {end}: {info['days']:,} simulated days "
+              f"({args.warmup} warm-up years) in {work_dir}")
+    
+    success = run_swat_modflow(stream=not args.no_stream, work_dir=work_dir,
+                               stall_window=args.stall_window, timeout=args.timeout,
+                               profile=args.profile)
     if success:
         print("\n✓✓✓ All tasks completed successfully! ✓✓✓\n")
     else:
         print("\n✗✗✗ Run failed. Check error messages above. ✗✗✗\n")
+    return success
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from modflow_listing import read_listing_timeseries
+
+# Per-time-step solver metrics of a run, from the MODFLOW listing (NWT outer
+# and inner iterations, backtracking events, max head change) joined with
+# the wall-clock time at which the console reported each simulated day.
+# SWAT-MODFLOW solves one MODFLOW time step per day, so the n-th time step
+# of the listing is the n-th "Day:" line of the console; its wall time runs
+# to the next day's line and covers the whole coupled day (SWAT, MODFLOW
+# and RT3D).
+#
+#   solver_metrics.jsonl  one JSON object per time step
+#   solver_metrics.prom   Prometheus textfile (node_exporter textfile
+#                         collector): totals and per-stress-period series
+
+METRICS_JSONL = 'solver_metrics.jsonl'
+METRICS_PROM = 'solver_metrics.prom'
+
+
+def _number(value):
+    """JSON-safe float (None for NaN)"""
+    value = float(value)
+    return None if value != value else value
+
+
+def build_solver_metrics(series, day_times=None, end_time=None):
+    """
+    One metrics dict per listing time step
+
+    ``series`` is read_listing_timeseries() output; ``day_times`` a list of
+    (day, unix time) pairs in the order the console reported them and
+    ``end_time`` the unix time the run ended (wall time of the last step).
+    """
+    day_times = day_times or []
+    rows = []
+    for i, step in enumerate(series):
+        row = {
+            'step': i + 1,
+            'kper': int(step['kper']),
+            'kstp': int(step['kstp']),
+            'day': None,
+            'outer_iter': int(step['outer_iter']),
+            'inner_iter': int(step['inner_iter']),
+            'backtracks': int(step['backtracks']),
+            'max_head_change': _number(step['max_head_change']),
+            'converged': bool(step['converged']),
+            'wall_time': None,
+            'wall_seconds': None,
+        }
+        if i < len(day_times):
+            day, started = day_times[i]
+            finished = day_times[i + 1][1] if i + 1 < len(day_times) else end_time
+            row['day'] = day
+            row['wall_time'] = round(started, 3)
+            if finished is not None:
+                row['wall_seconds'] = round(finished - started, 4)
+        rows.append(row)
+    return rows
+
+
+def write_metrics_jsonl(rows, path):
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    return path
+
+
+def read_metrics_jsonl(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _columns(rows):
+    """Metric columns as arrays (NaN where a value is missing)"""
+    def column(name, dtype=np.float64):
+        return np.array([np.nan if row[name] is None else row[name] for row in rows], dtype=dtype)
+    return {
+        'kper': np.array([row['kper'] for row in rows], dtype=np.int64),
+        'outer_iter': column('outer_iter'),
+        'inner_iter': column('inner_iter'),
+        'backtracks': column('backtracks'),
+        'max_head_change': column('max_head_change'),
+        'wall_seconds': column('wall_seconds'),
+        'failed': np.array([not row['converged'] for row in rows], dtype=np.float64),
+    }
+
+
+def summarize_metrics(rows):
+    """Totals, means and the costliest time steps of a metrics list"""
+    if not rows:
+        return None
+    cols = _columns(rows)
+    slowest = int(np.nanargmax(cols['wall_seconds'])) if np.isfinite(cols['wall_seconds']).any() else None
+    most_iter = int(np.argmax(cols['outer_iter']))
+    return {
+        'timesteps': len(rows),
+        'failed': int(cols['failed'].sum()),
+        'outer_total': int(np.nansum(cols['outer_iter'])),
+        'outer_mean': float(np.nanmean(cols['outer_iter'])),
+        'outer_max': int(cols['outer_iter'][most_iter]),
+        'outer_max_step': rows[most_iter],
+        'inner_total': int(np.nansum(cols['inner_iter'])),
+        'inner_mean': float(np.nanmean(cols['inner_iter'])),
+        'backtracks': int(np.nansum(cols['backtracks'])),
+        'max_head_change': (float(np.nanmax(cols['max_head_change']))
+                            if np.isfinite(cols['max_head_change']).any() else None),
+        'wall_total': float(np.nansum(cols['wall_seconds'])) if slowest is not None else None,
+        'slowest_step': rows[slowest] if slowest is not None else None,
+    }
+
+
+def write_prometheus_textfile(rows, path, labels=None):
+    """
+    Write the metrics in the Prometheus text format
+
+    One series per stress period (label kper, plus ``labels``) for the
+    time steps, iterations, backtracks, head change and wall time. The file is written
+    to a temporary name and renamed, as the textfile collector requires.
+    """
+    labels = dict(labels or {})
+    cols = _columns(rows)
+    periods, kper_pos = np.unique(cols['kper'], return_inverse=True)
+    cols['timesteps'] = np.ones(len(rows))
+
+    def label_text(extra=None):
+        items = {**labels, **(extra or {})}
+        return '{' + ','.join(f'{key}="{value}"' for key, value in items.items()) + '}' if items else ''
+
+    metrics = [
+        ('swatmf_solver_timesteps', 'Time steps solved', 'timesteps', 'sum'),
+        ('swatmf_solver_failed_timesteps', 'Time steps that did not converge', 'failed', 'sum'),
+        ('swatmf_solver_outer_iterations', 'NWT outer (Newton) iterations', 'outer_iter', 'sum'),
+        ('swatmf_solver_outer_iterations_max', 'Most outer iterations in one time step', 'outer_iter', 'max'),
+        ('swatmf_solver_inner_iterations', 'Linear solver inner iterations', 'inner_iter', 'sum'),
+        ('swatmf_solver_backtracks', 'NWT backtracking events', 'backtracks', 'sum'),
+        ('swatmf_solver_max_head_change_meters', 'Largest outer-iteration head change', 'max_head_change', 'max'),
+        ('swatmf_timestep_wall_seconds', 'Wall time of the coupled days', 'wall_seconds', 'sum'),
+        ('swatmf_timestep_wall_seconds_max', 'Slowest coupled day', 'wall_seconds', 'max'),
+    ]
+    lines = []
+    for name, help_text, column, reduce in metrics:
+        values = cols[column]
+        valid = np.isfinite(values)
+        counts = np.bincount(kper_pos[valid], minlength=len(periods))
+        if not counts.any():
+            continue  # e.g. no wall times, or head changes not printed
+        if reduce == 'sum':
+            result = np.bincount(kper_pos[valid], values[valid], len(periods))
+        else:
+            result = np.full(len(periods), -np.inf)
+            np.maximum.at(result, kper_pos[valid], values[valid])
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for kper, value, count in zip(periods, result, counts):
+            if count:
+                lines.append(f'{name}{label_text({"kper": int(kper)})} {value:.10g}')
+    lines.append('# HELP swatmf_solver_metrics_timestamp_seconds When these metrics were written')
+    lines.append('# TYPE swatmf_solver_metrics_timestamp_seconds gauge')
+    lines.append(f'swatmf_solver_metrics_timestamp_seconds{label_text()} {time.time():.0f}')
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, path)
+    return path
+
+
+def write_solver_metrics(work_dir='.', day_times=None, end_time=None, labels=None):
+    """Build the metrics of a run directory and write the JSONL and .prom files"""
+    listing = os.path.join(work_dir, 'modflow_GMRW.out')
+    rows = build_solver_metrics(read_listing_timeseries(listing), day_times, end_time)
+    write_metrics_jsonl(rows, os.path.join(work_dir, METRICS_JSONL))
+    write_prometheus_textfile(rows, os.path.join(work_dir, METRICS_PROM), labels)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-time-step solver metrics from the MODFLOW listing')
+    parser.add_argument('--work-dir', default='.')
+    parser.add_argument('--top', type=int, default=10, help='costliest time steps to list')
+    args = parser.parse_args()
+
+    # Keep the wall times of a streamed run if its metrics are already there
+    jsonl = os.path.join(args.work_dir, METRICS_JSONL)
+    if os.path.exists(jsonl):
+        previous = read_metrics_jsonl(jsonl)
+        day_times = [(row['day'], row['wall_time']) for row in previous if row['wall_time'] is not None]
+        last = previous[-1] if previous else None
+        end_time = (last['wall_time'] + last['wall_seconds']
+                    if last and last['wall_time'] is not None and last['wall_seconds'] is not None else None)
+    else:
+        day_times, end_time = None, None
+    rows = write_solver_metrics(args.work_dir, day_times, end_time)
+    summary = summarize_metrics(rows)
+
+    print("="*70)
+    print("SOLVER METRICS")
+    print("="*70)
+    if summary is None:
+        print("✗ No time steps found in the listing")
+        return False
+    print(f"Time steps.............: {summary['timesteps']:,} ({summary['failed']} failed)")
+    print(f"Outer iterations.......: {summary['outer_total']:,} total, {summary['outer_mean']:.1f} mean, "
+          f"{summary['outer_max']} max")
+    print(f"Inner iterations.......: {summary['inner_total']:,} total, {summary['inner_mean']:.1f} mean")
+    print(f"Backtracking events....: {summary['backtracks']}")
+    print(f"Max head change........: " + (f"{summary['max_head_change']:.4g} m" if summary['max_head_change']
+                                          is not None else "not printed (IPRNWT = 0)"))
+    if summary['wall_total'] is not None:
+        print(f"Wall time..............: {summary['wall_total']:.1f} s")
+
+    key = 'wall_seconds' if summary['wall_total'] is not None else 'outer_iter'
+    ranked = sorted(rows, key=lambda row: row[key] if row[key] is not None else -1, reverse=True)
+    print(f"\nCostliest time steps (by {key}):")
+    for row in ranked[:args.top]:
+        wall = f"{row['wall_seconds']:.3f} s" if row['wall_seconds'] is not None else '-'
+        print(f"   SP {row['kper']:4d} TS {row['kstp']:5d}  outer {row['outer_iter']:4d}  "
+              f"inner {row['inner_iter']:5d}  wall {wall}")
+    print(f"\n✓ Metrics saved: {METRICS_JSONL}, {METRICS_PROM}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import datetime
+import os
+import re
+import shutil
+
+import numpy as np
+
+from modflow_array_io import LineReader, find_package_file, read_dis
+from run_profiles import LINK_FILE, OC_FILE, day_step, edit_link_lines, read_output_days, step_day
+from run_scenarios import create_work_dir
+from swat_cio import period_from_dates, read_cio_period, simulation_dates, write_cio_values
+from swat_climate import read_climate_file, select_dates, write_climate_file
+
+# Sub-period mode: a copy of the model that simulates only a window of the
+# 2001-2023 period, e.g. one drought year or a calibration window.
+#
+#   python sub_period.py --start 2012-01-01 --end 2012-12-31 --warmup 2 --out-dir window_2012
+#
+# In the new workspace
+#   file.cio             NBYR/IYR/IDAF/IDAL cover the window (plus warm-up)
+#                        and NYSKIP skips the warm-up years
+#   climate files        (pcp1.pcp, ...) start on the first simulated day
+#                        and end on the last
+#   modflow_GMRW.dis     stress periods cut to the simulated days
+#   swatmf_link.txt      output days shifted to the new day numbering;
+#                        days outside the window are dropped
+#   modflow_GMRW.oc      OC blocks moved to the (PERIOD, STEP) of their day
+#                        in the trimmed DIS, clipped to the window
+#   rt3d.btn             RT3D output times shifted as the output days
+#
+# A warm-up of N years starts the run on 1 January N years before the
+# window and leaves it out of SWAT's summaries through NYSKIP. Other inputs
+# are hard-linked from the base model as in run_scenarios.py.
+
+CLIMATE_EXTENSIONS = ('.pcp', '.tmp', '.slr', '.hmd', '.wnd')
+BTN_FILE = 'rt3d.btn'
+WINDOW_MARKER = '.sub_period'  # marks a directory written by create_sub_period()
+NPER_RE = re.compile(r'^(\s*\S+\s+\S+\s+\S+\s+)(\S+)')
+
+
+def climate_file_names(cio_file):
+    """Names of the measured climate files listed in file.cio"""
+    names = []
+    with open(cio_file, 'r') as f:
+        for line in f:
+            for token in line.split():
+                if token.lower().endswith(CLIMATE_EXTENSIONS) and token not in names:
+                    names.append(token)
+    return names
+
+
+def yyyyddd(date):
+    """SWAT climate date (YYYYDDD) of a datetime.date"""
+    return date.year * 1000 + date.timetuple().tm_yday
+
+
+def fresh(path):
+    """Remove path before it is rewritten, so a hard-linked base file stays untouched"""
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def warmup_start(start, years):
+    """First simulated day for a warm-up of ``years`` whole years before start"""
+    return datetime.date(start.year - years, 1, 1) if years else start
+
+
+def trim_dis(dis_file, out_file, offset, ndays):
+    """
+    Write a DIS file whose stress periods cover days offset+1 .. offset+ndays
+
+    Periods outside the window are dropped and the ones it cuts are
+    shortened (NSTP scaled with the length). The window may only cut the
+    first stress period at its start: the per-period data of the other
+    packages begin with period 1.
+    """
+    dis = read_dis(dis_file)
+    ends = np.cumsum(dis['perlen'])
+    starts = ends - dis['perlen']
+    window_end = offset + ndays
+    keep = np.flatnonzero((starts < window_end) & (ends > offset))
+    if not len(keep):
+        raise ValueError(f"Days {offset + 1}-{window_end} are outside the stress periods of {dis_file}")
+    if keep[0] > 0:
+        raise ValueError(f"The window starts in stress period {keep[0] + 1}; only windows starting in "
+                         f"period 1 keep the package stress-period data consistent")
+
+    reader = LineReader(dis_file)
+    reader.skip_comments()
+    lines = list(reader.lines)
+    # NPER is the fourth value of the first line; the stress periods are the last NPER lines
+    lines[reader.pos] = NPER_RE.sub(lambda match: match.group(1) + str(len(keep)), lines[reader.pos], count=1)
+    period_lines = [i for i in range(reader.pos + 1, len(lines)) if lines[i].strip()][-dis['nper']:]
+
+    new_periods = []
+    for k in keep:
+        length = min(ends[k], window_end) - max(starts[k], offset)
+        nstp = max(1, int(round(dis['nstp'][k] * length / dis['perlen'][k])))
+        comment = lines[period_lines[k]].partition('#')[2]
+        new_periods.append(f"{length:.6f}  {nstp} {dis['tsmult'][k]:.6f}  {'SS' if dis['steady'][k] else 'TR'}"
+                           + (f'\t\t\t\t# {comment.strip()}' if comment else ''))
+    lines = lines[:period_lines[0]] + new_periods
+
+    with open(out_file, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return len(keep)
+
+
+def shift_days(days, offset, ndays):
+    """Output days renumbered from the new first day; the last day if none remain"""
+    shifted = [day - offset for day in days if offset < day <= offset + ndays]
+    return shifted or [ndays]
+
+
+def shift_oc_lines(lines, perlen, new_perlen, offset, ndays):
+    """
+    OC lines for a model trimmed to days offset+1 .. offset+ndays
+
+    Blocks are keyed by (PERIOD, STEP) with one MODFLOW step per day
+    (run_profiles.day_step()): each block is moved to the step of its day
+    in the trimmed stress periods (``new_perlen``), and blocks before or
+    after the window are clipped to its first or last day, so the output
+    the base model writes at its start (PERIOD 1 STEP 1) is written at the
+    start of the window. Blocks of stress periods the base DIS does not
+    have are never applied by MODFLOW and are dropped; blocks landing on
+    the same step are merged.
+    """
+    header, blocks, words, in_blocks = [], {}, None, False
+    for line in lines:
+        tokens = line.split()
+        if tokens and tokens[0].upper() == 'PERIOD':
+            in_blocks = True
+            kper = int(tokens[1])
+            kstp = int(tokens[3]) if len(tokens) > 3 and tokens[2].upper() == 'STEP' else 1
+            if kper > len(perlen):
+                words = None
+                continue
+            day = min(max(step_day(perlen, kper, kstp) - offset, 1), ndays)
+            words = blocks.setdefault(day_step(new_perlen, day), [])
+        elif words is not None:
+            if line.strip() and line.strip().upper() not in (w.strip().upper() for w in words):
+                words.append(line)
+        elif not in_blocks:
+            header.append(line)
+    result = list(header)
+    for (kper, kstp), block in sorted(blocks.items()):
+        result.append(f'PERIOD {kper} STEP {kstp}')
+        result.extend(block)
+    return result
+
+
+def _btn_heading(line):
+    """Upper-case text of a quoted rt3d.btn heading line, dashes and tabs removed"""
+    return ' '.join(line.replace("'", ' ').replace('-', ' ').split()).upper()
+
+
+def shift_btn_lines(lines, offset, ndays):
+    """
+    rt3d.btn lines for a model trimmed to days offset+1 .. offset+ndays
+
+    RT3D counts its output times (days) from the start of the run: they
+    are shifted and clipped as the linkage output days (shift_days()).
+    Returns (lines, new output times); the lines are returned unchanged,
+    with times None, if the file lists no output times (NPRS <= 0).
+    """
+    headings = [_btn_heading(line) for line in lines]
+    count_line = headings.index('NUMBER OF OUTPUT TIMES') + 1
+    nprs = int(lines[count_line].split()[0])
+    if nprs <= 0:
+        return lines, None
+
+    first = headings.index('OUTPUT TIMES', count_line) + 1
+    last, times = first, []
+    while len(times) < nprs:
+        times.extend(float(token) for token in lines[last].split())
+        last += 1
+    new_times = shift_days(times[:nprs], offset, ndays)
+    new_lines = (lines[:count_line] + [str(len(new_times))] + lines[count_line + 1:first]
+                 + [' '.join(f'{time:g}' for time in new_times)] + lines[last:])
+    return new_lines, new_times
+
+
+def trim_workspace(model_dir, out_dir, start, end, nyskip=0):
+    """
+    Rewrite the time-dependent inputs of out_dir to simulate start to end
+
+    Days are counted from the start of the base model in model_dir, whose
+    files are read; out_dir holds the (linked) copy to change. Returns a
+    dict describing the workspace.
+    """
+    cio_file = os.path.join(model_dir, 'file.cio')
+    base_start, _ = simulation_dates(read_cio_period(cio_file))
+    offset = (start - base_start).days
+    ndays = (end - start).days + 1
+    if offset < 0:
+        raise ValueError(f"{start} is before the start of the model period ({base_start})")
+    if ndays < 1:
+        raise ValueError(f"End date {end} is before start date {start}")
+
+    climate_files = []
+    for name in climate_file_names(cio_file):
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        climate = read_climate_file(path)
+        if climate['dates'][0] > yyyyddd(start) or climate['dates'][-1] < yyyyddd(end):
+            raise ValueError(f"{name} covers {climate['dates'][0]}-{climate['dates'][-1]}, "
+                             f"not {yyyyddd(start)}-{yyyyddd(end)}")
+        climate = select_dates(climate, yyyyddd(start), yyyyddd(end))
+        write_climate_file(fresh(os.path.join(out_dir, name)), climate)
+        climate_files.append(name)
+
+    values = period_from_dates(start, end)
+    values['NYSKIP'] = nyskip
+    write_cio_values(cio_file, values, fresh(os.path.join(out_dir, 'file.cio')))
+
+    dis_file = find_package_file(os.path.join(model_dir, 'modflow_GMRW.bas'), 'DIS')
+    new_dis_file = fresh(os.path.join(out_dir, os.path.basename(dis_file)))
+    nper = trim_dis(dis_file, new_dis_file, offset, ndays)
+
+    with open(os.path.join(model_dir, LINK_FILE), 'r') as f:
+        link_lines = f.read().splitlines()
+    _, days = read_output_days(link_lines)
+    output_days = shift_days(days, offset, ndays)
+    with open(fresh(os.path.join(out_dir, LINK_FILE)), 'w') as f:
+        f.write('\n'.join(edit_link_lines(link_lines, days=output_days)) + '\n')
+
+    with open(os.path.join(model_dir, OC_FILE), 'r') as f:
+        oc = shift_oc_lines(f.read().splitlines(), read_dis(dis_file)['perlen'].tolist(),
+                            read_dis(new_dis_file)['perlen'].tolist(), offset, ndays)
+    with open(fresh(os.path.join(out_dir, OC_FILE)), 'w') as f:
+        f.write('\n'.join(oc) + '\n')
+
+    rt3d_times = None
+    btn_file = os.path.join(model_dir, BTN_FILE)
+    if os.path.exists(btn_file):
+        with open(btn_file, 'r') as f:
+            btn, rt3d_times = shift_btn_lines(f.read().splitlines(), offset, ndays)
+        with open(fresh(os.path.join(out_dir, BTN_FILE)), 'w') as f:
+            f.write('\n'.join(btn) + '\n')
+
+    return {
+        'start': start,
+        'end': end,
+        'days': ndays,
+        'offset': offset,
+        'nper': nper,
+        'output_days': output_days,
+        'rt3d_output_times': rt3d_times,
+        'climate_files': climate_files,
+    }
+
+
+def create_sub_period(model_dir, out_dir, start, end, warmup=0):
+    """
+    Create a workspace in out_dir simulating start to end after ``warmup`` years
+
+    Returns the trim_workspace() description plus the window start.
+    """
+    create_work_dir(model_dir, out_dir)
+    with open(os.path.join(out_dir, WINDOW_MARKER), 'w') as f:
+        f.write(f"{start} {end} {warmup}\n")
+    info = trim_workspace(model_dir, out_dir, warmup_start(start, warmup), end, nyskip=warmup)
+    info['window_start'] = start
+    return info
+
+
+def remove_sub_period(out_dir, model_dir='.'):
+    """
+    Remove a workspace written by create_sub_period()
+
+    Refuses the model directory, any directory containing it, and any
+    directory without the sub-period marker file.
+    """
+    target = os.path.realpath(out_dir)
+    model = os.path.realpath(model_dir)
+    if model == target or model.startswith(target.rstrip(os.sep) + os.sep):
+        raise ValueError(f"{out_dir} is or contains the model directory")
+    if not os.path.isfile(os.path.join(out_dir, WINDOW_MARKER)):
+        raise ValueError(f"{out_dir} exists and is not a sub-period workspace (no {WINDOW_MARKER} file)")
+    shutil.rmtree(out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create a model workspace for a sub-period')
+    parser.add_argument('--start', type=datetime.date.fromisoformat, required=True, help='YYYY-MM-DD')
+    parser.add_argument('--end', type=datetime.date.fromisoformat, required=True, help='YYYY-MM-DD')
+    parser.add_argument('--warmup', type=int, default=0, help='warm-up years before the window (default: 0)')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--out-dir', default=None, help='default: window_<start>_<end>')
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or f'window_{args.start:%Y%m%d}_{args.end:%Y%m%d}'
+    print("="*70)
+    print("SUB-PERIOD WORKSPACE")
+    print("="*70)
+    try:
+        info = create_sub_period(args.model_dir, out_dir, args.start, args.end, args.warmup)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"✗ {e}")
+        return False
+
+    print(f"Window.................: {args.start} to {args.end}")
+    if args.warmup:
+        print(f"Warm-up................: from {info['start']} ({args.warmup} years, NYSKIP {args.warmup})")
+    print(f"Simulated days.........: {info['days']:,} (days {info['offset'] + 1}-{info['offset'] + info['days']} "
+          f"of the base model)")
+    print(f"✓ file.cio, {', '.join(info['climate_files'])} trimmed")
+    print(f"✓ DIS: {info['nper']} stress period(s)")
+    print(f"✓ Output days: {len(info['output_days'])}, OC blocks moved to the trimmed steps")
+    if info['rt3d_output_times'] is not None:
+        print(f"✓ RT3D output times: {' '.join(f'{time:g}' for time in info['rt3d_output_times'])}")
+    print(f"\n✓ Workspace written to {out_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
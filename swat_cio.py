@@ -0,0 +1,99 @@
+import calendar
+import datetime
+
+
+def read_cio_values(cio_file='file.cio'):
+    """
+    Read the ``value | NAME : description`` entries of a SWAT master file
+
+    Returns a dict mapping NAME to the raw value string.
+    """
+    values = {}
+    with open(cio_file, 'r') as f:
+        for line in f:
+            if '|' not in line:
+                continue
+            value, _, rest = line.partition('|')
+            name = rest.split(':')[0].strip()
+            if name and name not in values:
+                values[name] = value.strip()
+    return values
+
+
+def read_cio_period(cio_file='file.cio'):
+    """Read the simulation period (NBYR, IYR, IDAF, IDAL, NYSKIP) from file.cio"""
+    values = read_cio_values(cio_file)
+    return {key: int(values[key]) for key in ('NBYR', 'IYR', 'IDAF', 'IDAL', 'NYSKIP') if key in values}
+
+
+def days_in_year(year):
+    return 366 if calendar.isleap(year) else 365
+
+
+def simulation_days(period):
+    """Number of days simulated for a period returned by read_cio_period"""
+    nbyr, iyr = period['NBYR'], period['IYR']
+    idaf = period.get('IDAF') or 1
+    idal = period.get('IDAL') or 0
+
+    total = 0
+    for i in range(nbyr):
+        year = iyr + i
+        first = idaf if i == 0 else 1
+        last = idal if (i == nbyr - 1 and idal > 0) else days_in_year(year)
+        total += last - first + 1
+    return total
+
+
+def simulation_dates(period):
+    """First and last simulated date for a period returned by read_cio_period"""
+    nbyr, iyr = period['NBYR'], period['IYR']
+    idaf = period.get('IDAF') or 1
+    idal = period.get('IDAL') or 0
+    last_year = iyr + nbyr - 1
+    if idal <= 0:
+        idal = days_in_year(last_year)
+    start = datetime.date(iyr, 1, 1) + datetime.timedelta(days=idaf - 1)
+    end = datetime.date(last_year, 1, 1) + datetime.timedelta(days=idal - 1)
+    return start, end
+
+
+def period_from_dates(start, end):
+    """file.cio period values (NBYR, IYR, IDAF, IDAL) simulating start to end inclusive"""
+    if end < start:
+        raise ValueError(f"End date {end} is before start date {start}")
+    return {
+        'NBYR': end.year - start.year + 1,
+        'IYR': start.year,
+        'IDAF': start.timetuple().tm_yday,
+        'IDAL': end.timetuple().tm_yday,
+    }
+
+
+def write_cio_values(cio_file, values, out_file=None):
+    """
+    Write file.cio with some ``value | NAME`` entries replaced
+
+    New values are right-aligned in the width of the old value field, so
+    the file keeps the layout SWAT reads. Writes to out_file (default: in
+    place) and returns its path.
+    """
+    with open(cio_file, 'r') as f:
+        lines = f.readlines()
+
+    pending = dict(values)
+    for i, line in enumerate(lines):
+        if '|' not in line:
+            continue
+        value, bar, rest = line.partition('|')
+        name = rest.split(':')[0].strip()
+        if name in pending:
+            width = len(value.rstrip())
+            lines[i] = f"{pending.pop(name)!s:>{width}}{value[len(value.rstrip()):]}{bar}{rest}"
+    if pending:
+        raise KeyError(f"Not found in {cio_file}: {', '.join(pending)}")
+
+    out_file = out_file or cio_file
+    with open(out_file, 'w') as f:
+        f.writelines(lines)
+    return out_file
@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# SWAT measured climate files (pcp1.pcp, tmp1.tmp) after the 4 header lines
+# (Station, Lati, Long, Elev) hold one line per day: a 7-character date
+# YYYYDDD followed by one F5.1 field per station (two, max and min, in
+# .tmp files), zero-padded as written by the ArcSWAT interface:
+#
+#   2001001000.4000.2000.0000.0000.0...
+#
+# Every data line has the same width, so the whole data block is decoded as
+# one (day x width) byte array and encoded back the same way; a file read
+# and written unchanged is byte-identical.
+
+DATE_WIDTH = 7
+FIELD_WIDTH = 5
+MISSING = -99.0
+
+
+def read_climate_file(path):
+    """
+    Read a SWAT climate file in one vectorized pass
+
+    Returns a dict with the raw header lines ('header', bytes), the station
+    names, 'dates' (int YYYYDDD per day) and 'values' (day x field float
+    array; missing values are -99.0).
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    # Header lines start with a letter, data lines with the date
+    header_end = 0
+    while header_end < len(content) and not content[header_end:header_end + 1].isdigit():
+        header_end = content.index(b'\n', header_end) + 1
+    header = content[:header_end]
+    data = content[header_end:]
+
+    width = data.index(b'\n')
+    line_end = 2 if data[width - 1:width] == b'\r' else 1
+    width -= line_end - 1
+    nday = len(data) // (width + line_end)
+    if nday * (width + line_end) != len(data):
+        raise ValueError(f"{path}: data lines do not all have the same width")
+    table = np.frombuffer(data, np.uint8).reshape(nday, width + line_end)
+
+    nfield = (width - DATE_WIDTH) // FIELD_WIDTH
+    dates = np.ascontiguousarray(table[:, :DATE_WIDTH]).view(f'S{DATE_WIDTH}').ravel().astype(np.int64)
+    fields = np.ascontiguousarray(table[:, DATE_WIDTH:DATE_WIDTH + nfield * FIELD_WIDTH])
+    values = fields.view(f'S{FIELD_WIDTH}').reshape(nday, nfield).astype(np.float64)
+
+    station_line = header.split(b'\n', 1)[0].decode('ascii', errors='replace')
+    stations = [name.strip() for name in station_line[len('Station'):].split(',') if name.strip()]
+
+    return {
+        'header': header,
+        'stations': stations,
+        'dates': dates,
+        'values': values,
+        'line_end': b'\r\n' if line_end == 2 else b'\n',
+    }
+
+
+def encode_values(values):
+    """
+    Encode a (day x field) array as F5.1 zero-padded fields ('%05.1f')
+
+    Values are rounded to tenths and clipped to what fits in 5 characters
+    (-99.9 to 999.9). Returns a (day, field * 5) uint8 array.
+    """
+    tenths = np.rint(np.clip(values, -99.9, 999.9) * 10).astype(np.int64)
+    negative = tenths < 0
+    magnitude = np.abs(tenths)
+    chars = np.empty(values.shape + (FIELD_WIDTH,), dtype=np.uint8)
+    chars[..., 0] = np.where(negative, ord('-'), ord('0') + magnitude // 1000 % 10)
+    chars[..., 1] = ord('0') + magnitude // 100 % 10
+    chars[..., 2] = ord('0') + magnitude // 10 % 10
+    chars[..., 3] = ord('.')
+    chars[..., 4] = ord('0') + magnitude % 10
+    return chars.reshape(values.shape[0], -1)
+
+
+def write_climate_file(path, climate, values=None):
+    """
+    Write a climate file read by read_climate_file, optionally with new values
+
+    The header lines and dates are written back unchanged.
+    """
+    values = climate['values'] if values is None else values
+    line_end = climate.get('line_end', b'\n')
+    nday = len(climate['dates'])
+    dates = np.char.zfill(climate['dates'].astype('S7'), DATE_WIDTH)
+    table = np.empty((nday, DATE_WIDTH + values.shape[1] * FIELD_WIDTH + len(line_end)), dtype=np.uint8)
+    table[:, :DATE_WIDTH] = dates.view(np.uint8).reshape(nday, DATE_WIDTH)
+    table[:, DATE_WIDTH:-len(line_end)] = encode_values(values)
+    table[:, -len(line_end):] = np.frombuffer(line_end, np.uint8)
+    with open(path, 'wb') as f:
+        f.write(climate['header'])
+        f.write(table.tobytes())
+    return path
+
+
+def climate_dates(dates):
+    """Year, month and day of year arrays for YYYYDDD dates"""
+    year, doy = dates // 1000, dates % 1000
+    days = (year - 1970).astype('datetime64[Y]').astype('datetime64[D]') + (doy - 1)
+    month = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    return year, month, doy
+
+
+def select_dates(climate, first=None, last=None):
+    """
+    Climate restricted to the days from first to last (YYYYDDD, inclusive)
+
+    SWAT reads measured climate from the first data line, so a run that
+    starts later than the file needs the leading days removed.
+    """
+    dates = climate['dates']
+    keep = np.ones(len(dates), dtype=bool)
+    if first is not None:
+        keep &= dates >= first
+    if last is not None:
+        keep &= dates <= last
+    if not keep.any():
+        raise ValueError(f"No climate data between {first} and {last}")
+    return dict(climate, dates=dates[keep], values=climate['values'][keep])
+
+
+def perturb(climate, scale=None, add=None, months=None, years=None, stations=None,
+            shift_days=None):
+    """
+    Perturbed copy of the climate values (missing values stay -99.0)
+
+    scale     multiply by this factor (e.g. 1.1 for +10 % precipitation)
+    add       add this amount (e.g. +2.0 degC to a .tmp file), after scaling
+    months    only change days in these months (1-12)
+    years     only change days in these years (e.g. drought years)
+    stations  only change these station columns (indices)
+    shift_days  move the selected days' values this many days later
+              (negative: earlier), e.g. to shift the wet season; the days
+              the window leaves take the values it moved over
+    """
+    values = climate['values']
+    year, month, _ = climate_dates(climate['dates'])
+    rows = np.ones(len(values), dtype=bool)
+    if months is not None:
+        rows &= np.isin(month, months)
+    if years is not None:
+        rows &= np.isin(year, years)
+    columns = np.ones(values.shape[1], dtype=bool)
+    if stations is not None:
+        columns[:] = False
+        columns[stations] = True
+    selected = rows[:, None] & columns[None, :]
+
+    result = values.copy()
+    if shift_days:
+        shifted = np.roll(values, shift_days, axis=0)
+        target = np.roll(selected, shift_days, axis=0)
+        # Days the window moves over and days it leaves swap values, so
+        # totals are unchanged (a rotation within each window + shift)
+        result[selected & ~target] = values[target & ~selected]
+        result[target] = shifted[target]
+        selected = target
+
+    changed = result[selected]
+    if scale is not None:
+        changed = changed * scale
+    if add is not None:
+        changed = changed + add
+    result[selected] = changed
+
+    missing = values == MISSING
+    result[missing] = MISSING
+    return result
+
+
+_worker_climate = None
+
+
+def _init_worker(base_file):
+    global _worker_climate
+    _worker_climate = read_climate_file(base_file)
+
+
+def _write_scenario(scenario, out_dir, file_name):
+    name = scenario['name']
+    options = {key: value for key, value in scenario.items() if key != 'name'}
+    target_dir = os.path.join(out_dir, name)
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, file_name)
+    write_climate_file(path, _worker_climate, perturb(_worker_climate, **options))
+    return name, path
+
+
+def write_scenarios(base_file, scenarios, out_dir, workers=None):
+    """
+    Write one perturbed copy of base_file per scenario, in parallel
+
+    ``scenarios`` is a list of dicts with a 'name' and perturb() options,
+    e.g. {"name": "pcp_plus10", "scale": 1.1}. Each worker process reads
+    the base file once; files go to <out_dir>/<name>/<base file name>, ready
+    to be used as a "files" entry of a run_scenarios.py spec.
+    """
+    workers = workers or min(len(scenarios), os.cpu_count() or 1)
+    file_name = os.path.basename(base_file)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(base_file,)) as pool:
+        futures = [pool.submit(_write_scenario, scenario, out_dir, file_name) for scenario in scenarios]
+        for future in as_completed(futures):
+            name, path = future.result()
+            results[name] = path
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read, check and perturb SWAT climate files')
+    parser.add_argument('climate_file', nargs='?', default='pcp1.pcp')
+    parser.add_argument('--scenarios', help='JSON list of scenarios ({"name": ..., "scale": ...})')
+    parser.add_argument('--out-dir', default='climate_scenarios')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    climate = read_climate_file(args.climate_file)
+    elapsed = time.perf_counter() - start
+    values = climate['values']
+    print(f"Climate file: {args.climate_file}")
+    print(f"Stations: {len(climate['stations'])}, Fields: {values.shape[1]}, Days: {len(values)} "
+          f"({climate['dates'][0]} to {climate['dates'][-1]})")
+    print(f"Missing values: {np.count_nonzero(values == MISSING)}")
+    print(f"Read in {elapsed * 1000:.0f} ms")
+
+    if args.scenarios:
+        with open(args.scenarios, 'r') as f:
+            scenarios = json.load(f)
+        start = time.perf_counter()
+        written = write_scenarios(args.climate_file, scenarios, args.out_dir, args.workers)
+        print(f"\n✓ {len(written)} scenario files written to {args.out_dir} "
+              f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sub_period import fresh
+
+# Bulk editor for the per-subbasin and per-HRU SWAT input files
+# (000010001.hru, 000010001.gw, 000010001.mgt, 000010001.sol, 000010000.sub,
+# 000010000.rte, ... - about 1,900 files in this watershed). All files of one
+# type are parsed into a single table with one row per file (HRU or
+# subbasin) and one float column per parameter:
+#
+#   .hru .gw .mgt .sub .rte   ``value | NAME : description`` lines, and the
+#   .pnd .swq .sep .sdr ...   arrays on the line after ``| NAME`` lines
+#                             (ELEVB_1 .. ELEVB_10, RFINC_1 .. RFINC_12)
+#   .sol .chm                 ``Label : v1 v2 ...`` rows, one column per
+#                             layer (SOL_K_1, SOL_K_2, ...; SOL_ZMX)
+#
+# Rows carry the subbasin and HRU from the file name and the land use,
+# soil and slope class from the title line, for filtering. Edits (replace,
+# multiply, add, clip) apply to a column - or all layer/array columns of a
+# name - for the selected rows at once. Writing formats each changed value
+# in the width and number of decimals of the old one and rewrites only the
+# files whose text actually changed, on a thread pool; files are replaced,
+# not edited in place, so hard-linked scenario work directories keep the
+# base values.
+#
+#   python swat_input_editor.py mgt --multiply CN2 1.05 --luse AGRL --clip CN2 35 98
+#   python swat_input_editor.py gw --replace GWQMN 500 --subbasin 1 2 3
+#
+# Files are read and written as Latin-1, so every byte (e.g. the degree
+# signs of .swq) is kept.
+
+FILE_RE = re.compile(r'^(\d{5})(\d{4})\.([A-Za-z]+)$')
+TITLE_RE = {
+    'luse': re.compile(r'Luse:\s*(\S+)'),
+    'soil': re.compile(r'Soil:\s*(\S+)'),
+    'slope': re.compile(r'Slope:?\s*(\S+)'),
+}
+ENCODING = 'latin-1'
+
+# ``Label :`` rows of .sol and .chm files, by the start of the label
+LABEL_NAMES = {
+    'Maximum rooting depth': 'SOL_ZMX',
+    'Porosity fraction from which anions': 'ANION_EXCL',
+    'Crack volume potential': 'SOL_CRK',
+    'Depth': 'SOL_Z',
+    'Bulk Density Moist': 'SOL_BD',
+    'Ave. AW Incl. Rock Frag': 'SOL_AWC',
+    'Ksat.': 'SOL_K',
+    'Organic Carbon': 'SOL_CBN',
+    'Clay': 'CLAY',
+    'Silt': 'SILT',
+    'Sand': 'SAND',
+    'Rock Fragments': 'ROCK',
+    'Soil Albedo': 'SOL_ALB',
+    'Erosion K': 'USLE_K',
+    'Salinity': 'SOL_EC',
+    'Soil pH': 'SOL_PH',
+    'Soil CACO3': 'SOL_CAL',
+    'Soil NO3': 'SOL_NO3',
+    'Soil organic N': 'SOL_ORGN',
+    'Soil labile P': 'SOL_LABP',
+    'Soil organic P': 'SOL_ORGP',
+    'Phosphorus perc coef': 'PPERCO_SUB',
+    'Soil Layer': None,
+}
+# Labels with one value per file; the other rows hold one value per layer
+SCALAR_NAMES = ('SOL_ZMX', 'ANION_EXCL', 'SOL_CRK')
+LAYER_NAMES = set(LABEL_NAMES.values()) - set(SCALAR_NAMES) - {None}
+
+
+def _label_name(label):
+    label = label.strip()
+    for prefix, name in LABEL_NAMES.items():
+        if label.startswith(prefix):
+            return name
+    return re.sub(r'\W+', '_', label).strip('_').upper() or None
+
+
+def _number(token):
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def parse_input_file(path):
+    """
+    Parameters of one SWAT input file
+
+    Returns (lines, {name: value}, {name: (line, start, end)}) where
+    start:end is the span of the value in its line. Only the first
+    occurrence of a name is used, as SWAT reads the files positionally.
+    """
+    with open(path, 'r', encoding=ENCODING, newline='') as f:
+        lines = f.read().splitlines(keepends=True)
+    values, spans = {}, {}
+
+    def add(name, number, line, start, end):
+        if name and name not in values:
+            values[name] = number
+            spans[name] = (line, start, end)
+
+    array_name, array_count = None, {}
+    for i, line in enumerate(lines[1:], start=1):
+        if array_name:
+            # Values of the ``| NAME`` line above
+            numbers = [(m, _number(m.group())) for m in re.finditer(r'\S+', line)]
+            if numbers and all(number is not None for _, number in numbers):
+                for m, number in numbers:
+                    array_count[array_name] = array_count.get(array_name, 0) + 1
+                    add(f'{array_name}_{array_count[array_name]}', number, i, m.start(), m.end())
+            array_name = None
+            continue
+        if '|' in line:
+            value, _, rest = line.partition('|')
+            name = rest.split(':')[0].strip()
+            tokens = value.split()
+            if not tokens:
+                array_name = name or None
+            elif len(tokens) == 1 and _number(tokens[0]) is not None:
+                end = len(value.rstrip())
+                add(name, _number(tokens[0]), i, end - len(tokens[0]), end)
+        elif ':' in line:
+            label, _, rest = line.partition(':')
+            offset = len(label) + 1
+            numbers = [(m, _number(m.group())) for m in re.finditer(r'\S+', rest)]
+            if not numbers or any(number is None for _, number in numbers):
+                continue
+            name = _label_name(label)
+            if name is None:
+                continue
+            if len(numbers) == 1 and name not in LAYER_NAMES:
+                m, number = numbers[0]
+                add(name, number, i, offset + m.start(), offset + m.end())
+            else:
+                for k, (m, number) in enumerate(numbers, start=1):
+                    add(f'{name}_{k}', number, i, offset + m.start(), offset + m.end())
+    return lines, values, spans
+
+
+def format_like(old, value):
+    """value formatted with the decimals (or as an integer) like the old token"""
+    if '.' in old and 'e' not in old.lower():
+        return f'{value:.{len(old) - old.index(".") - 1}f}'
+    if 'e' in old.lower():
+        return f'{value:.6E}'
+    return str(int(round(value)))
+
+
+def replace_token(line, start, end, new):
+    """line with line[start:end] replaced by new, right-aligned at end"""
+    old = line[start:end]
+    if len(new) <= len(old):
+        return line[:start] + new.rjust(len(old)) + line[end:]
+    # Take the extra width from the blanks before the value, keeping one
+    # blank as a separator when something precedes them
+    before = line[:start]
+    blanks = len(before) - len(before.rstrip())
+    take = min(len(new) - len(old), blanks - 1 if before.strip() else blanks)
+    take = max(take, 0)
+    return before[:start - take] + new + line[end:]
+
+
+def list_input_files(model_dir, ext):
+    """Per-subbasin/HRU input files (nnnnnhhhh.ext) of one type, sorted"""
+    ext = ext.lower().lstrip('.')
+    return sorted(name for name in os.listdir(model_dir)
+                  if (m := FILE_RE.match(name)) and m.group(3).lower() == ext)
+
+
+class InputTable:
+    """
+    All files of one SWAT input type as one table
+
+    ``columns`` maps parameter names to float arrays with one value per
+    file (NaN where a file lacks it); ``subbasin``, ``hru`` (0 for
+    subbasin-level files), ``luse``, ``soil`` and ``slope`` describe the
+    rows. Edits change ``columns``; write() puts them back in the files.
+    """
+
+    def __init__(self, model_dir, ext, workers=None):
+        self.model_dir = model_dir
+        self.ext = ext.lower().lstrip('.')
+        self.files = list_input_files(model_dir, self.ext)
+        if not self.files:
+            raise ValueError(f"No *.{self.ext} input files in {model_dir}")
+        paths = [os.path.join(model_dir, name) for name in self.files]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse_input_file, paths))
+        self._lines = [lines for lines, _, _ in parsed]
+        self._spans = [spans for _, _, spans in parsed]
+
+        names = []
+        for _, values, _ in parsed:
+            names.extend(name for name in values if name not in names)
+        self.columns = {name: np.array([values.get(name, np.nan) for _, values, _ in parsed])
+                        for name in names}
+        self._original = {name: column.copy() for name, column in self.columns.items()}
+
+        self.subbasin = np.array([int(FILE_RE.match(name).group(1)) for name in self.files])
+        self.hru = np.array([int(FILE_RE.match(name).group(2)) for name in self.files])
+        for key, pattern in TITLE_RE.items():
+            found = [pattern.search(lines[0]) if lines else None for lines in self._lines]
+            setattr(self, key, np.array([m.group(1) if m else '' for m in found]))
+
+    def __len__(self):
+        return len(self.files)
+
+    def names(self, name):
+        """Columns of a parameter: the name itself, or all its layer/array columns"""
+        if name in self.columns:
+            return [name]
+        layered = [column for column in self.columns if re.fullmatch(re.escape(name) + r'_\d+', column)]
+        if not layered:
+            raise KeyError(f"{name} is not a parameter of the .{self.ext} files")
+        return layered
+
+    def select(self, subbasin=None, hru=None, luse=None, soil=None, slope=None):
+        """Row mask for the given subbasins, HRUs, land uses, soils and slope classes"""
+        mask = np.ones(len(self), dtype=bool)
+        for values, wanted in ((self.subbasin, subbasin), (self.hru, hru), (self.luse, luse),
+                               (self.soil, soil), (self.slope, slope)):
+            if wanted is not None:
+                mask &= np.isin(values, np.atleast_1d(wanted))
+        return mask
+
+    def _edit(self, name, rows, function):
+        rows = np.ones(len(self), dtype=bool) if rows is None else rows
+        for column in self.names(name):
+            values = self.columns[column]
+            values[rows] = function(values[rows])
+
+    def replace(self, name, value, rows=None):
+        self._edit(name, rows, lambda values: np.where(np.isnan(values), values, value))
+
+    def multiply(self, name, factor, rows=None):
+        self._edit(name, rows, lambda values: values * factor)
+
+    def add(self, name, amount, rows=None):
+        self._edit(name, rows, lambda values: values + amount)
+
+    def clip(self, name, low=None, high=None, rows=None):
+        self._edit(name, rows, lambda values: np.clip(values, low, high))
+
+    def changed_rows(self):
+        """Mask of the rows with any value different from the files"""
+        changed = np.zeros(len(self), dtype=bool)
+        for name, values in self.columns.items():
+            original = self._original[name]
+            changed |= ~((values == original) | (np.isnan(values) & np.isnan(original)))
+        return changed
+
+    def _file_text(self, row):
+        """New text of one file, or None if no value in it changed"""
+        lines = list(self._lines[row])
+        edits = []
+        for name, (line, start, end) in self._spans[row].items():
+            value = self.columns[name][row]
+            if value != self._original[name][row] and not np.isnan(value):
+                edits.append((line, start, end, value))
+        if not edits:
+            return None
+        # Right to left, so spans earlier on a line stay valid
+        for line, start, end, value in sorted(edits, key=lambda edit: (edit[0], -edit[1])):
+            lines[line] = replace_token(lines[line], start, end, format_like(lines[line][start:end], value))
+        text = ''.join(lines)
+        return None if text == ''.join(self._lines[row]) else text
+
+    def write(self, out_dir=None, workers=None):
+        """
+        Write the files whose text changed to out_dir (default: in place)
+
+        Returns the names of the files written; the table then holds the
+        written values as its new original state.
+        """
+        out_dir = out_dir or self.model_dir
+        rows = np.flatnonzero(self.changed_rows())
+        texts = {row: self._file_text(row) for row in rows}
+        texts = {row: text for row, text in texts.items() if text is not None}
+
+        def write_one(item):
+            row, text = item
+            with open(fresh(os.path.join(out_dir, self.files[row])), 'w', encoding=ENCODING, newline='') as f:
+                f.write(text)
+            return self.files[row]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(write_one, texts.items()))
+
+        for row, text in texts.items():
+            self._lines[row] = text.splitlines(keepends=True)
+        for name, values in self.columns.items():
+            self._original[name] = values.copy()
+        self.model_dir = out_dir
+        return written
+
+
+def read_inputs(model_dir, ext, workers=None):
+    """Parse all *.ext input files of model_dir into an InputTable"""
+    return InputTable(model_dir, ext, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-edit SWAT subbasin/HRU input files')
+    parser.add_argument('ext', help='file type, e.g. gw, hru, mgt, sol, sub, rte')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--out-dir', default=None, help='write changed files here (default: in place)')
+    parser.add_argument('--subbasin', type=int, nargs='+', help='only these subbasins')
+    parser.add_argument('--hru', type=int, nargs='+', help='only these HRUs (number within the subbasin)')
+    parser.add_argument('--luse', nargs='+', help='only these land uses (e.g. AGRL URMD)')
+    parser.add_argument('--soil', nargs='+', help='only these soils')
+    parser.add_argument('--replace', nargs=2, action='append', default=[], metavar=('NAME', 'VALUE'))
+    parser.add_argument('--multiply', nargs=2, action='append', default=[], metavar=('NAME', 'FACTOR'))
+    parser.add_argument('--add', nargs=2, action='append', default=[], metavar=('NAME', 'AMOUNT'))
+    parser.add_argument('--clip', nargs=3, action='append', default=[], metavar=('NAME', 'MIN', 'MAX'))
+    parser.add_argument('--show', nargs='+', default=[], metavar='NAME', help='summarize these parameters')
+    parser.add_argument('--dry-run', action='store_true', help='report the changes without writing')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    print("="*70)
+    print(f"SWAT INPUT EDITOR (.{args.ext})")
+    print("="*70)
+    start = time.perf_counter()
+    try:
+        table = read_inputs(args.model_dir, args.ext, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        return False
+    print(f"Files..................: {len(table):,} read in {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"Parameters.............: {len(table.columns)}")
+
+    rows = table.select(subbasin=args.subbasin, hru=args.hru, luse=args.luse, soil=args.soil)
+    print(f"Selected rows..........: {rows.sum():,}")
+
+    # Edits apply in this order: replace, multiply, add, clip
+    try:
+        for name, value in args.replace:
+            table.replace(name, float(value), rows)
+        for name, factor in args.multiply:
+            table.multiply(name, float(factor), rows)
+        for name, amount in args.add:
+            table.add(name, float(amount), rows)
+        for name, low, high in args.clip:
+            table.clip(name, float(low), float(high), rows)
+        shown = [column for name in args.show
+                 + [edit[0] for edit in args.replace + args.multiply + args.add + args.clip]
+                 for column in table.names(name)]
+    except KeyError as e:
+        print(f"✗ {e.args[0]}")
+        return False
+
+    for column in dict.fromkeys(shown):
+        values, original = table.columns[column][rows], table._original[column][rows]
+        if np.isnan(values).all():
+            continue
+        line = f"  {column:<14} min {np.nanmin(values):10.4g}  mean {np.nanmean(values):10.4g}  max {np.nanmax(values):10.4g}"
+        if not np.array_equal(values, original, equal_nan=True):
+            line += f"  (was mean {np.nanmean(original):.4g})"
+        print(line)
+
+    if args.dry_run:
+        print(f"\n{table.changed_rows().sum():,} files would change (dry run)")
+        return True
+    if not table.changed_rows().any():
+        print("\nNo values changed")
+        return True
+    start = time.perf_counter()
+    written = table.write(args.out_dir, args.workers)
+    print(f"\n✓ {len(written):,} files written to {args.out_dir or args.model_dir} "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Reader for the fixed-width SWAT output tables (output.rch, output.sub,
+# output.hru, output.sed). Values are right-aligned Fortran fields that
+# may run together, both in the data (BIGSUB   1        0 2003.39329E+02)
+# and in the header (SED_OUTtonsSEDCONCmg/kg), so the lines are never
+# split on whitespace. Field boundaries are found once from a sample of
+# data lines plus the header line; each field is then decoded for a whole
+# chunk of lines with a single NumPy conversion over a (lines x width)
+# byte array.
+
+KEY_FIELDS = ('RCH', 'SUB', 'HRU', 'GIS', 'MGT')
+UNIT_FIELDS = {'output.rch': 'RCH', 'output.sed': 'RCH', 'output.sub': 'SUB', 'output.hru': 'HRU'}
+DEFAULT_CHUNK_LINES = 200000
+
+
+def _find_header(f):
+    """Skip the title lines; return the header line (the one naming MON)"""
+    for line in f:
+        if b'MON' in line.split():
+            return line.rstrip(b'\r\n')
+    raise ValueError("No column header line (with MON) found")
+
+
+def _line_array(lines, width):
+    """Lines as a (nline, width) uint8 array, padded with spaces"""
+    table = np.array(lines, dtype=f'S{width}').view(np.uint8).reshape(len(lines), width)
+    table[table == 0] = ord(' ')
+    return table
+
+
+def detect_fields(header, lines):
+    """
+    Field layout of a SWAT output table
+
+    Field ends are the columns where some data line has a character
+    followed by a blank (values are right-aligned), plus the ends of header
+    names followed by two or more blanks that are away from any data field
+    end, which catches data fields that always run together (e.g. MON and
+    AREAkm2 in output.sub). Returns a list of (name, start, end) tuples.
+    """
+    width = max(len(header), max(len(line) for line in lines))
+    data = _line_array(lines, width + 1) != ord(' ')
+    data_ends = np.flatnonzero((data[:, :-1] & ~data[:, 1:]).any(axis=0)) + 1
+    ends = set(data_ends)
+
+    # Header names drift a column or two from their fields in places
+    # (output.hru), so only header ends clear of the data ends are used
+    head = _line_array([header], width + 2)[0] != ord(' ')
+    for end in np.flatnonzero(head[:-2] & ~head[1:-1] & ~head[2:]) + 1:
+        if np.abs(data_ends - end).min() > 2:
+            ends.add(end)
+    ends = sorted(end for end in ends if end <= width)
+
+    header_text = header.decode('ascii', errors='replace').ljust(width + 1)
+    fields = []
+    start = cut = 0
+    for i, end in enumerate(ends):
+        # Move a name cut that splits a drifted header name to the nearest blank
+        next_cut = end
+        if header_text[end - 1] != ' ' and header_text[end] != ' ':
+            blanks = [pos for pos in range(end - 3, end + 3) if header_text[pos] == ' ']
+            if blanks:
+                next_cut = min(blanks, key=lambda pos: abs(pos + 1 - end)) + 1
+        name = header_text[cut:next_cut].strip()
+        if not name and i > 0:
+            name = f'COL{i + 1}'
+        fields.append((name, start, end))
+        start, cut = end, next_cut
+    return fields
+
+
+def _field_types(fields, lines):
+    """Numeric type per field from the sample lines: text, key (int) or float"""
+    types = []
+    for name, start, end in fields:
+        values = [line[start:end].strip() for line in lines[:50]]
+        try:
+            [float(value) for value in values if value]
+        except ValueError:
+            types.append('text')
+            continue
+        types.append('int' if name in KEY_FIELDS else 'float')
+    return types
+
+
+def _decode_float(raw):
+    """Convert an array of fixed-width byte strings to float64 (NaN if invalid)"""
+    try:
+        return raw.astype(np.float64)
+    except ValueError:
+        values = np.full(raw.size, np.nan)
+        for i, text in enumerate(raw):
+            try:
+                values[i] = float(text)
+            except ValueError:
+                # Fortran drops the E of 3-digit exponents (0.1234-100)
+                text = text.strip()
+                for sign in (b'-', b'+'):
+                    pos = text.rfind(sign)
+                    if pos > 0 and text[pos - 1:pos] not in (b'E', b'e'):
+                        try:
+                            values[i] = float(text[:pos] + b'E' + text[pos:])
+                        except ValueError:
+                            pass
+                        break
+        return values
+
+
+class SwatOutputTable:
+    """
+    Layout of one SWAT output table and bulk decoding of its lines
+
+    ``fields`` lists (name, start, end) of every column; the leading label
+    column (REACH, BIGSUB) has no header name and is dropped, other
+    columns without a header name are called COL<n>.
+    """
+
+    def __init__(self, path, dtype=np.float64):
+        self.path = path
+        self.value_dtype = np.dtype(dtype)
+        with open(path, 'rb') as f:
+            self.header = _find_header(f)
+            sample = []
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if line.strip():
+                    sample.append(line)
+                if len(sample) == 2000:
+                    break
+        if not sample:
+            raise ValueError(f"No data lines in {path}")
+
+        self.fields = detect_fields(self.header, sample)
+        self.types = _field_types(self.fields, sample)
+        self.width = max(end for _, _, end in self.fields)
+        self.unit_field = UNIT_FIELDS.get(os.path.basename(path).lower(),
+                                          next((name for name in KEY_FIELDS
+                                                if name in [f[0] for f in self.fields]), None))
+        self.nunit = None
+
+        dtype = []
+        for (name, start, end), kind in zip(self.fields, self.types):
+            if not name:
+                continue
+            if kind == 'text':
+                dtype.append((name, f'U{end - start}'))
+            elif kind == 'int':
+                dtype.append((name, np.int64))
+            else:
+                dtype.append((name, np.float64 if name == 'MON' else self.value_dtype))
+        self.dtype = np.dtype(dtype + [('PERIOD', np.int64)])
+
+    @property
+    def names(self):
+        return [name for name in self.dtype.names if name != 'PERIOD']
+
+    def decode(self, lines, first_row=0):
+        """Decode data lines (bytes) into a structured array"""
+        table = _line_array(lines, self.width)
+        result = np.empty(len(lines), dtype=self.dtype)
+        for (name, start, end), kind in zip(self.fields, self.types):
+            if not name:
+                continue
+            raw = np.ascontiguousarray(table[:, start:end]).view(f'S{end - start}').ravel()
+            if kind == 'text':
+                result[name] = np.char.strip(raw.astype(f'U{end - start}'))
+            else:
+                result[name] = _decode_float(raw)
+
+        # Rows come in blocks of one line per unit (reach/subbasin/HRU)
+        if self.nunit is None and self.unit_field is not None and len(result):
+            units = result[self.unit_field]
+            repeats = np.flatnonzero(units == units[0])
+            self.nunit = int(repeats[1]) if len(repeats) > 1 else len(units)
+        nunit = self.nunit or 1
+        result['PERIOD'] = (np.arange(first_row, first_row + len(lines))) // nunit
+        return result
+
+    def iter_chunks(self, chunk_lines=DEFAULT_CHUNK_LINES):
+        """Yield structured arrays of at most chunk_lines rows each"""
+        row = 0
+        with open(self.path, 'rb') as f:
+            _find_header(f)
+            chunk = []
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if not line.strip():
+                    continue
+                chunk.append(line)
+                if len(chunk) == chunk_lines:
+                    yield self.decode(chunk, row)
+                    row += len(chunk)
+                    chunk = []
+            if chunk:
+                yield self.decode(chunk, row)
+
+
+def read_swat_output(path, dtype=np.float64):
+    """
+    Read a whole SWAT output table into a structured array
+
+    Fields are named after the header (e.g. RCH, MON, FLOW_OUTcms); PERIOD
+    counts the output periods (row // number of units).
+    """
+    table = SwatOutputTable(path, dtype)
+    chunks = list(table.iter_chunks())
+    return np.concatenate(chunks) if chunks else np.empty(0, table.dtype)
+
+
+def iter_swat_output(path, chunk_lines=DEFAULT_CHUNK_LINES, dtype=np.float64):
+    """Stream a SWAT output table as structured-array chunks (bounded memory)"""
+    return SwatOutputTable(path, dtype).iter_chunks(chunk_lines)
+
+
+def to_cube(table, field, unit_field=None):
+    """
+    Reshape one field to a (period, unit) array
+
+    Units are sorted by their id in unit_field (default: RCH, SUB or HRU,
+    whichever the table has). Missing combinations are NaN.
+    """
+    unit_field = unit_field or next(name for name in KEY_FIELDS[:3] if name in table.dtype.names)
+    units, unit_pos = np.unique(table[unit_field], return_inverse=True)
+    cube = np.full((table['PERIOD'].max() + 1, len(units)), np.nan)
+    cube[table['PERIOD'], unit_pos] = table[field]
+    return units, cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read SWAT fixed-width output tables')
+    parser.add_argument('files', nargs='*', default=['output.rch', 'output.sub', 'output.hru', 'output.sed'])
+    args = parser.parse_args()
+
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"✗ {path}: not found")
+            continue
+        start = time.perf_counter()
+        table = read_swat_output(path)
+        elapsed = time.perf_counter() - start
+        columns = [name for name in table.dtype.names if name != 'PERIOD']
+        print(f"✓ {path}: {len(table):,} rows x {len(columns)} columns, "
+              f"{table['PERIOD'].max() + 1 if len(table) else 0} periods ({elapsed:.2f} s)")
+        print(f"   {', '.join(columns[:8])}, ...")
+
+
+if __name__ == "__main__":
+    main()
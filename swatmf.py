@@ -0,0 +1,124 @@
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+# Single entry point for the project scripts:
+#
+#   python swatmf.py run
+#   python swatmf.py map-recharge --hru-recharge swatmf_out_SWAT_recharge_monthly
+#   python swatmf.py budget --output subbasin_budget.csv
+#
+# Only the module of the chosen subcommand is imported, and the modules
+# import their heavy libraries (NumPy, SciPy, matplotlib) where they are
+# used, so short tasks do not pay for the imports of the others.
+# 'startup-check' measures the cold-start import time of every subcommand
+# in a fresh interpreter against a time budget.
+
+COMMANDS = {
+    'run': ('run_swatmodflow_with_log', 'main', 'run SWAT-MODFLOW and write the success log'),
+    'report': (__name__, '_report', 'write the success log for existing outputs'),
+    'map-recharge': ('map_recharge_to_ibound', 'main', 'write an RCH file mapped to IBOUND or HRU recharge'),
+    'verify': ('verify_recharge_mapping', 'main', 'check the RCH file against IBOUND'),
+    'inventory': ('model_inventory', 'main', 'typed model inputs with cached .npz snapshots'),
+    'heads': ('modflow_head_file', 'main', 'read the formatted head file'),
+    'listing': ('modflow_listing', 'main', 'summarize the MODFLOW listing file'),
+    'solver-metrics': ('solver_metrics', 'main', 'per-time-step solver metrics (JSONL + Prometheus)'),
+    'budget': ('zone_budget', 'main', 'per-subbasin groundwater budgets'),
+    'columnar': ('swatmf_columnar', 'main', 'convert swatmf_out_* files to the columnar store'),
+    'ingest': ('swatmf_sqlite', 'main', 'load swatmf_out_* files into SWATOutput.sqlite'),
+    'aggregate': ('swatmf_aggregate', 'main', 'aggregate river-cell outputs to subbasins'),
+    'outputs': ('swat_output_reader', 'main', 'read output.rch/sub/hru/sed'),
+    'climate': ('swat_climate', 'main', 'read and perturb climate files'),
+    'inputs': ('swat_input_editor', 'main', 'bulk-edit the subbasin/HRU input files'),
+    'frames': ('render_frames', 'main', 'render map frames'),
+    'profiles': ('run_profiles', 'main', 'show output profiles or measure what they save'),
+    'cache': ('run_cache', 'main', 'content-addressed run cache'),
+    'scenarios': ('run_scenarios', 'main', 'run scenarios in parallel'),
+    'sub-period': ('sub_period', 'main', 'trimmed model workspace for a date window'),
+    'warm-start': ('warm_start', 'main', 'start a run from the heads of an earlier run'),
+    'calibrate': ('calibrate', 'main', 'parallel calibration and sensitivity runs'),
+    'bench': ('benchmarks', 'main', 'time the tooling on synthetic GMRW-scale models'),
+    'startup-check': (__name__, '_startup_check', 'check subcommand import times against a budget'),
+}
+
+DEFAULT_BUDGET = 0.5  # seconds per subcommand import, interpreter start excluded
+HEAVY_MODULES = ('numpy', 'scipy', 'matplotlib')
+
+
+def load_command(name):
+    """Import the module of a subcommand and return its entry function"""
+    module_name, function, _ = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), function)
+
+
+def _report():
+    parser = argparse.ArgumentParser(description='Write the success log for existing outputs')
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+    from run_swatmodflow_with_log import generate_success_log
+    print(f"✓ Success log written: {generate_success_log(args.output_dir)}")
+
+
+def measure_import(name):
+    """
+    Cold-start import time of one subcommand, in a fresh interpreter
+
+    Returns (seconds, heavy modules loaded by the import).
+    """
+    code = (
+        "import sys, time, json\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+        "start = time.perf_counter()\n"
+        "import swatmf\n"
+        f"swatmf.load_command({name!r})\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, heavy
+
+
+def _startup_check():
+    parser = argparse.ArgumentParser(description='Check subcommand cold-start import times')
+    parser.add_argument('commands', nargs='*', help='subcommands to check (default: all)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'seconds allowed per import (default: {DEFAULT_BUDGET})')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SWATMF STARTUP TIME CHECK")
+    print("="*70)
+    print(f"Budget: {args.budget:.2f} s per subcommand import\n")
+
+    failed = []
+    for name in args.commands or [name for name in COMMANDS if name != 'startup-check']:
+        elapsed, heavy = measure_import(name)
+        ok = elapsed <= args.budget
+        if not ok:
+            failed.append(name)
+        print(f"{'✓' if ok else '✗'} {name:<14} {elapsed * 1000:7.0f} ms   {', '.join(heavy) or '-'}")
+
+    print(f"\n{'✓ All imports within budget' if not failed else '✗ Over budget: ' + ', '.join(failed)}")
+    return not failed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog='swatmf', description='SWAT-MODFLOW GMRW tools')
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command',
+                        help='; '.join(f'{name}: {help}' for name, (_, _, help) in COMMANDS.items()))
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='arguments of the subcommand')
+    args = parser.parse_args(argv[:1])
+
+    # Subcommands parse sys.argv themselves
+    sys.argv = [f'swatmf {args.command}'] + argv[1:]
+    result = load_command(args.command)()
+    return 1 if result is False else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import argparse
+import os
+
+import numpy as np
+import scipy.sparse
+
+from modflow_array_io import load_dis_for
+from swatmf_columnar import ColumnarStore, convert_block_file, is_up_to_date, DEFAULT_STORE_DIR
+
+# Cell -> subbasin aggregation of the per-river-cell outputs (MF_gwsw,
+# MF_riverstage, RT_rivno3, RT_rivP). swatmf_river2grid.txt lists for each
+# river cell the subbasins its river segments belong to and the segment
+# lengths; from it a (subbasin x output line) CSR operator is built once,
+# and a whole (day x cell) array becomes (day x subbasin) with one sparse
+# product:
+#
+#   sum   (fluxes, loads)  W[s, c] = L[c, s] / sum_s L[c, s]
+#   mean  (river stage)    W[s, c] = L[c, s] / sum_c L[c, s]
+
+_operator_cache = {}
+
+
+def read_river_links(river_file='swatmf_river2grid.txt'):
+    """
+    Read every (cell, subbasin, length) link of swatmf_river2grid.txt
+
+    Cell ids are 1-based MODFLOW cell numbers ((row - 1) * NCOL + col).
+    Returns three flat arrays, one entry per river segment.
+    """
+    with open(river_file, 'r') as f:
+        tokens = f.read().split()
+    count = int(tokens[0])
+    cells, subbasins, lengths = [], [], []
+    pos = 1
+    for _ in range(count):
+        cell, nsub = int(tokens[pos + 1]), int(tokens[pos + 2])
+        cells.extend([cell] * nsub)
+        subbasins.extend(tokens[pos + 3:pos + 3 + nsub])
+        lengths.extend(tokens[pos + 3 + nsub:pos + 3 + 2 * nsub])
+        pos += 3 + 2 * nsub
+    return (np.array(cells, dtype=np.int64), np.array(subbasins, dtype=np.int64),
+            np.array(lengths, dtype=np.float64))
+
+
+def build_operator(line_cells, river_file='swatmf_river2grid.txt', mode='sum'):
+    """
+    CSR operator mapping output lines (cells) to subbasins
+
+    ``line_cells`` holds the 1-based cell id of each output line, in file
+    order (a cell listed twice gets a column per line). Returns
+    (subbasins, operator) with operator of shape (nsubbasin, nline). Lines
+    whose cell is not in river_file get an empty column. Operators are
+    cached per river file version, line layout and mode.
+    """
+    if mode not in ('sum', 'mean'):
+        raise ValueError(f"Unknown aggregation mode: {mode}")
+    line_cells = np.asarray(line_cells, dtype=np.int64)
+    stat = os.stat(river_file)
+    key = (os.path.abspath(river_file), stat.st_size, stat.st_mtime, mode, line_cells.tobytes())
+    if key in _operator_cache:
+        return _operator_cache[key]
+
+    cells, subbasins, lengths = read_river_links(river_file)
+    subbasin_ids, sub_pos = np.unique(subbasins, return_inverse=True)
+
+    # Pair every output line with the links of its cell
+    order = np.argsort(cells, kind='stable')
+    first = np.searchsorted(cells[order], line_cells, side='left')
+    last = np.searchsorted(cells[order], line_cells, side='right')
+    counts = last - first
+    line_index = np.repeat(np.arange(len(line_cells)), counts)
+    link_index = order[np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+    weights = lengths[link_index]
+    rows = sub_pos[link_index]
+    if mode == 'sum':
+        cell_total = np.bincount(line_index, weights, len(line_cells))
+        weights = weights / cell_total[line_index]
+    else:
+        sub_total = np.bincount(rows, weights, len(subbasin_ids))
+        weights = weights / sub_total[rows]
+
+    operator = scipy.sparse.csr_matrix((weights, (rows, line_index)),
+                                       shape=(len(subbasin_ids), len(line_cells)))
+    _operator_cache[key] = (subbasin_ids, operator)
+    return subbasin_ids, operator
+
+
+def aggregate(values, operator):
+    """(day x line) array -> (day x subbasin) array with one sparse product"""
+    return np.asarray(operator.dot(np.asarray(values, dtype=np.float64).T).T)
+
+
+def store_line_cells(store, ncol):
+    """
+    1-based cell ids of the lines of a ColumnarStore
+
+    The last two id columns are the cell row and column in every
+    per-river-cell file ([layer,] row, column).
+    """
+    row, col = store.ids[:, -2], store.ids[:, -1]
+    return (row - 1) * ncol + col
+
+
+def aggregate_output(block_file, river_file='swatmf_river2grid.txt', mode=None, value=None,
+                     start=None, end=None, store_dir=DEFAULT_STORE_DIR):
+    """
+    Aggregate a per-river-cell swatmf_out_* file to subbasins
+
+    Uses (and builds if needed) the columnar store of block_file. ``mode``
+    defaults to 'mean' for river stage and 'sum' for everything else.
+    Returns (periods, subbasins, (period x subbasin) array).
+    """
+    if not is_up_to_date(block_file, store_dir):
+        convert_block_file(block_file, store_dir)
+    store = ColumnarStore(os.path.join(store_dir, os.path.basename(block_file)))
+    if mode is None:
+        mode = 'mean' if 'riverstage' in os.path.basename(block_file) else 'sum'
+
+    model_dir = os.path.dirname(os.path.abspath(block_file))
+    ncol = load_dis_for(os.path.join(model_dir, 'modflow_GMRW.bas'))['ncol']
+    subbasins, operator = build_operator(store_line_cells(store, ncol), river_file, mode)
+    periods, values = store.query(value, start, end)
+    return periods, subbasins, aggregate(values, operator)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate river-cell outputs to SWAT subbasins')
+    parser.add_argument('files', nargs='*',
+                        default=['swatmf_out_MF_gwsw', 'swatmf_out_MF_riverstage',
+                                 'swatmf_out_RT_rivno3', 'swatmf_out_RT_rivP'])
+    parser.add_argument('--river-file', default='swatmf_river2grid.txt')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--output-dir', default='.', help='where to write <file>_subbasin.csv')
+    args = parser.parse_args()
+
+    for block_file in args.files:
+        if not os.path.exists(block_file):
+            print(f"✗ {block_file}: not found")
+            continue
+        periods, subbasins, table = aggregate_output(block_file, args.river_file,
+                                                     store_dir=args.store_dir)
+        csv_file = os.path.join(args.output_dir, os.path.basename(block_file) + '_subbasin.csv')
+        header = ','.join(['day'] + [f'sub{sub}' for sub in subbasins])
+        np.savetxt(csv_file, np.column_stack([periods[:, 0], table]), delimiter=',',
+                   fmt=['%d'] + ['%.6g'] * len(subbasins), header=header, comments='')
+        print(f"✓ {block_file}: {len(periods)} periods x {len(subbasins)} subbasins -> {csv_file}")
+
+
+if __name__ == "__main__":
+    main()
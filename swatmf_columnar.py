@@ -0,0 +1,355 @@
+import argparse
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+# Columnar store for the block-structured swatmf_out_* files. Each block
+# starts with a period header and holds one line per river cell, subbasin
+# or HRU, in the same order every block:
+#
+#    Day:           1                      (MF_gwsw, MF_riverstage, RT_riv*, SWAT_riv*, SWAT_recharge)
+#    month:           1 year:        2001  (*_monthly)
+#    year:        2001                     (*_yearly)
+#    ... for day           1 year        2001  (SWAT_rechno3, SWAT_rechP)
+#
+# A file is converted in chunks of blocks to <store>/<file name>/ holding
+#
+#    index.json        column names, periods, chunk layout, source size/mtime
+#    ids.npy           (ncell, nid) cell identifiers (e.g. layer, row, column)
+#    chunk_NNNNN.npy   (nperiod, ncell, nvalue) values of consecutive periods
+#
+# so a query for a time range or a set of cells memory-maps only the chunks
+# it touches instead of rescanning the text file.
+
+DEFAULT_STORE_DIR = 'swatmf_columnar'
+DEFAULT_CHUNK_PERIODS = 365
+STORE_VERSION = 2  # stores of another version are rebuilt
+_CELL_ID_NAMES = ['layer', 'row', 'column']
+
+_PERIOD_PATTERNS = (
+    (re.compile(r'^\s*Day:\s*(\d+)\s*$'), ('day',)),
+    (re.compile(r'^\s*month:\s*(\d+)\s+year:\s*(\d+)\s*$'), ('month', 'year')),
+    (re.compile(r'^\s*year:\s*(\d+)\s*$'), ('year',)),
+    (re.compile(r'for day\s+(\d+)\s+year\s+(\d+)\s*$'), ('day', 'year')),
+)
+_NUMERIC_START = set('0123456789-+.')
+_INT_TOKEN_RE = re.compile(r'^[-+]?\d+$')
+
+
+def _match_period(line):
+    """(period names, period values, text before the period) of a block header"""
+    for pattern, names in _PERIOD_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return names, tuple(int(value) for value in match.groups()), line[:match.start()].strip()
+    return None, None, ''
+
+
+def _column_name(text):
+    text = re.split(r'\s+for each\s', text, flags=re.IGNORECASE)[0]
+    return re.sub(r'[^0-9a-z]+', '_', text.lower()).strip('_') or 'value'
+
+
+def iter_blocks(block_file):
+    """
+    Stream a swatmf_out_* block file
+
+    Yields (period, description, lines) per block: the period tuple from
+    the block header (e.g. (day,) or (month, year)), the last text line
+    read before the data and the list of raw data lines.
+    """
+    period = None
+    description = ''
+    lines = []
+    with open(block_file, 'r') as f:
+        for line in f:
+            stripped = line.lstrip()
+            if stripped and stripped[0] in _NUMERIC_START:
+                if period is not None:
+                    lines.append(line)
+                continue
+
+            names, values, prefix = _match_period(line)
+            if names is not None:
+                if period is not None:
+                    yield period, description, lines
+                period = values
+                description = prefix
+                lines = []
+            elif stripped and period is not None and not lines:
+                description = line.strip()
+
+    if period is not None:
+        yield period, description, lines
+
+
+def detect_layout(block_file):
+    """
+    Describe the layout of a block file from its first block
+
+    Returns None for files that are not block files (e.g. the RT_OBS*
+    tables), otherwise a dict with the period names, the number of lines
+    per block and the names of the id (integer) and value columns.
+    """
+    with open(block_file, 'r') as f:
+        head = [next(f, '') for _ in range(20)]
+    period_names = None
+    for line in head:
+        period_names, _, _ = _match_period(line)
+        if period_names is not None:
+            break
+    if period_names is None:
+        return None
+
+    for period, description, lines in iter_blocks(block_file):
+        tokens = lines[0].split() if lines else []
+        is_id = [bool(_INT_TOKEN_RE.match(token)) for token in tokens]
+        names = [_column_name(part) for part in description.split(',')] if description else []
+        if len(names) != len(tokens):
+            generic = [f'col{i + 1}' for i in range(len(tokens))]
+            if len(names) == 1 and is_id.count(False) == 1:
+                # A single description names the single value column
+                generic[is_id.index(False)] = names[0]
+            if is_id.count(True) == 3 and is_id[:3] == [True] * 3:
+                # Unnamed MODFLOW cell ids (RT_riv*), named as in MF_gwsw
+                generic[:3] = _CELL_ID_NAMES
+            names = generic
+        return {
+            'period_names': list(period_names),
+            'ncell': len(lines),
+            'ncolumn': len(tokens),
+            'id_columns': [i for i, flag in enumerate(is_id) if flag],
+            'value_columns': [i for i, flag in enumerate(is_id) if not flag],
+            'id_names': [name for name, flag in zip(names, is_id) if flag] or ['index'],
+            'value_names': [name for name, flag in zip(names, is_id) if not flag],
+        }
+    return None
+
+
+def parse_blocks(blocks, layout, dtype=np.float64):
+    """Parse the data lines of several blocks with a single conversion"""
+    ncell, ncolumn = layout['ncell'], layout['ncolumn']
+    for period, _, lines in blocks:
+        if len(lines) != ncell:
+            raise ValueError(f"Block {period} has {len(lines)} lines, expected {ncell}")
+    tokens = ''.join(line for _, _, lines in blocks for line in lines).split()
+    table = np.array(tokens, dtype=np.float64).reshape(len(blocks), ncell, ncolumn)
+    return table[:, :, layout['id_columns']], table[:, :, layout['value_columns']].astype(dtype)
+
+
+def convert_block_file(block_file, store_dir=DEFAULT_STORE_DIR, chunk_periods=DEFAULT_CHUNK_PERIODS,
+                       dtype=np.float32):
+    """
+    Convert one swatmf_out_* block file to a columnar store
+
+    The file is read once, chunk_periods blocks at a time, so memory use is
+    bounded by the chunk size. Values are stored as float32 by default
+    (the text files carry 7 significant digits). Returns the store
+    directory, or None if the file is not a block file.
+    """
+    layout = detect_layout(block_file)
+    if layout is None:
+        return None
+
+    target = os.path.join(store_dir, os.path.basename(block_file))
+    os.makedirs(target, exist_ok=True)
+    for old in glob.glob(os.path.join(target, 'chunk_*.npy')):
+        os.remove(old)
+
+    periods = []
+    chunks = []
+    ids = None
+    blocks = []
+
+    def flush():
+        nonlocal ids
+        id_values, values = parse_blocks(blocks, layout, dtype)
+        if ids is None:
+            ids = id_values[0].astype(np.int64)
+        elif not np.array_equal(id_values, np.broadcast_to(ids, id_values.shape)):
+            raise ValueError(f"Cell order changes between blocks in {block_file}")
+        np.save(os.path.join(target, f'chunk_{len(chunks):05d}.npy'), values)
+        chunks.append(len(periods))
+        periods.extend(period for period, _, _ in blocks)
+        blocks.clear()
+
+    for block in iter_blocks(block_file):
+        blocks.append(block)
+        if len(blocks) == chunk_periods:
+            flush()
+    if blocks:
+        flush()
+
+    if ids is None or ids.shape[1] == 0:
+        ids = np.arange(1, layout['ncell'] + 1, dtype=np.int64)[:, None]
+    np.save(os.path.join(target, 'ids.npy'), ids)
+
+    stat = os.stat(block_file)
+    index = {
+        'version': STORE_VERSION,
+        'source': os.path.basename(block_file),
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'period_names': layout['period_names'],
+        'periods': [list(period) for period in periods],
+        'chunk_starts': chunks,
+        'id_names': layout['id_names'],
+        'value_names': layout['value_names'],
+        'dtype': np.dtype(dtype).str,
+    }
+    with open(os.path.join(target, 'index.json'), 'w') as f:
+        json.dump(index, f)
+    return target
+
+
+def is_up_to_date(block_file, store_dir=DEFAULT_STORE_DIR):
+    """True if the store of block_file was built from its current version"""
+    index_file = os.path.join(store_dir, os.path.basename(block_file), 'index.json')
+    if not os.path.exists(index_file):
+        return False
+    with open(index_file, 'r') as f:
+        index = json.load(f)
+    stat = os.stat(block_file)
+    return (index.get('version') == STORE_VERSION and index['source_size'] == stat.st_size
+            and index['source_mtime'] == stat.st_mtime)
+
+
+def convert_all(model_dir='.', store_dir=DEFAULT_STORE_DIR, chunk_periods=DEFAULT_CHUNK_PERIODS,
+                force=False):
+    """Convert every swatmf_out_* block file in model_dir (skipping up-to-date stores)"""
+    converted, skipped = [], []
+    for block_file in sorted(glob.glob(os.path.join(model_dir, 'swatmf_out_*'))):
+        name = os.path.basename(block_file)
+        if not force and is_up_to_date(block_file, store_dir):
+            skipped.append(name)
+        elif convert_block_file(block_file, store_dir, chunk_periods) is not None:
+            converted.append(name)
+    return converted, skipped
+
+
+class ColumnarStore:
+    """
+    Read access to one converted swatmf_out_* file
+
+    ``ids`` holds the cell identifiers (one row per cell, columns
+    ``id_names``), ``periods`` the block headers (columns
+    ``period_names``). Chunks are opened memory-mapped on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'index.json'), 'r') as f:
+            self.index = json.load(f)
+        self.ids = np.load(os.path.join(path, 'ids.npy'))
+        self.periods = np.array(self.index['periods'], dtype=np.int64).reshape(-1, len(self.index['period_names']))
+        self.period_names = self.index['period_names']
+        self.id_names = self.index['id_names']
+        self.value_names = self.index['value_names']
+        self._chunk_starts = np.array(self.index['chunk_starts'] + [len(self.periods)])
+        self._cell_lookup = None
+
+    def __len__(self):
+        return len(self.periods)
+
+    def _chunk(self, i):
+        return np.load(os.path.join(self.path, f'chunk_{i:05d}.npy'), mmap_mode='r')
+
+    def iter_chunks(self):
+        """
+        Yield (periods, values) per chunk file, in period order: the period
+        rows and the memory-mapped (nperiod, ncell, nvalue) values
+        """
+        for i in range(len(self._chunk_starts) - 1):
+            yield self.periods[self._chunk_starts[i]:self._chunk_starts[i + 1]], self._chunk(i)
+
+    def cell_positions(self, cells):
+        """
+        Positions of cells given by id tuples (e.g. (layer, row, col)) or
+        single ids (subbasin, HRU index)
+        """
+        if self._cell_lookup is None:
+            self._cell_lookup = {tuple(row): i for i, row in enumerate(self.ids.tolist())}
+        positions = []
+        for cell in cells:
+            key = tuple(cell) if np.ndim(cell) else (int(cell),)
+            if key not in self._cell_lookup:
+                raise KeyError(f"{key} not found in {self.index['source']}")
+            positions.append(self._cell_lookup[key])
+        return np.array(positions, dtype=np.int64)
+
+    def period_range(self, start=None, end=None, column=0):
+        """Positions [first, last) of periods with start <= period[column] <= end"""
+        key = self.periods[:, column]
+        mask = np.ones(len(key), dtype=bool)
+        if start is not None:
+            mask &= key >= start
+        if end is not None:
+            mask &= key <= end
+        selected = np.flatnonzero(mask)
+        if not len(selected):
+            return 0, 0
+        return int(selected[0]), int(selected[-1]) + 1
+
+    def query(self, value=None, start=None, end=None, cells=None, positions=None):
+        """
+        Values for a period range and a cell subset
+
+        ``value`` is a value column name (default: the first); ``start`` /
+        ``end`` bound the first period column (e.g. the day), inclusive;
+        ``cells`` are cell ids (see cell_positions) or ``positions`` cell
+        positions. Returns (periods, array of shape (nperiod, ncell)).
+        """
+        column = self.value_names.index(value) if value is not None else 0
+        if cells is not None:
+            positions = self.cell_positions(cells)
+        first, last = self.period_range(start, end)
+
+        parts = []
+        chunk_first = np.searchsorted(self._chunk_starts, first, side='right') - 1
+        for i in range(max(chunk_first, 0), len(self._chunk_starts) - 1):
+            lo, hi = self._chunk_starts[i], self._chunk_starts[i + 1]
+            if lo >= last:
+                break
+            chunk = self._chunk(i)[max(first, lo) - lo:min(last, hi) - lo]
+            chunk = chunk[:, :, column] if positions is None else chunk[:, positions, column]
+            parts.append(np.array(chunk))
+
+        ncell = len(self.ids) if positions is None else len(positions)
+        values = np.concatenate(parts) if parts else np.empty((0, ncell), dtype=self.index['dtype'])
+        return self.periods[first:last], values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert swatmf_out_* block files to a columnar store')
+    parser.add_argument('files', nargs='*', help='files to convert (default: all swatmf_out_* files)')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_PERIODS,
+                        help='periods per chunk file (default: 365)')
+    parser.add_argument('--force', action='store_true', help='rebuild up-to-date stores')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SWAT-MODFLOW OUTPUT COLUMNAR CONVERSION")
+    print("="*70)
+    if args.files:
+        converted = [os.path.basename(name) for name in args.files
+                     if convert_block_file(name, args.store_dir, args.chunk) is not None]
+        skipped = []
+    else:
+        converted, skipped = convert_all(args.model_dir, args.store_dir, args.chunk, args.force)
+
+    for name in converted:
+        store = ColumnarStore(os.path.join(args.store_dir, name))
+        print(f"✓ {name}: {len(store)} periods x {len(store.ids)} cells "
+              f"({', '.join(store.value_names)})")
+    for name in skipped:
+        print(f"  {name}: up to date")
+    print(f"\nStore: {os.path.abspath(args.store_dir)}")
+
+
+if __name__ == "__main__":
+    main()
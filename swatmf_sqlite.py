@@ -0,0 +1,190 @@
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from swatmf_columnar import DEFAULT_STORE_DIR, ColumnarStore, convert_block_file, is_up_to_date
+
+# Loads the swatmf_out_* block files into SWATOutput.sqlite next to the
+# SWAT tables, one table per file (swatmf_out_MF_gwsw -> SwatmfMfGwsw), so
+# exchange fluxes can be joined with OutputRch/OutputSub in SQL:
+#
+#   SELECT r.Year, r.FLOW_OUTcms, s.RIVER_PKG
+#   FROM OutputRch r JOIN SwatmfSwatRivno3 s ON s.SUB = r.RCH ...
+#
+# The values are read from the columnar store of each file (converted at
+# float64 first if it is missing or stale, see swatmf_columnar.py), so the
+# text is not parsed again. The store is streamed one chunk of periods at
+# a time, rows cell by cell within the chunk, with executemany over column
+# lists built once per chunk, inside one transaction per file; the
+# composite (cell or subbasin, period) index is created after the load.
+# SwatmfIngest records the source size/mtime so unchanged files are
+# skipped on the next run.
+
+DEFAULT_DATABASE = 'SWATOutput.sqlite'
+
+# Column names matching the SWAT tables (SUB joins OutputSub.SUB / OutputRch.RCH)
+_ID_COLUMNS = {'subbasin': 'SUB', 'index': 'HRU', 'cell_row': 'ROW', 'cell_column': 'COLUMN'}
+_PERIOD_COLUMNS = {'day': 'Day', 'month': 'Month', 'year': 'Year'}
+
+
+def table_name(block_file):
+    """swatmf_out_MF_gwsw -> SwatmfMfGwsw"""
+    suffix = os.path.basename(block_file)[len('swatmf_out_'):]
+    return 'Swatmf' + ''.join(part.capitalize() for part in suffix.split('_'))
+
+
+def _table_columns(layout):
+    periods = [_PERIOD_COLUMNS[name] for name in layout['period_names']]
+    ids = [_ID_COLUMNS.get(name, name.upper()) for name in layout['id_names']]
+    values = [name.upper() for name in layout['value_names']]
+    return periods, ids, values
+
+
+def _connect(database):
+    conn = sqlite3.connect(database)
+    # Rollback journal, the SQLite default: WAL mode would persist in the
+    # shipped database and leave -wal/-shm files next to it (this also
+    # switches back a database an earlier ingest left in WAL mode). Loads
+    # are one transaction per file, so the journal costs little.
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-262144')  # 256 MB
+    conn.execute('''CREATE TABLE IF NOT EXISTS `SwatmfIngest` (`TableName` TEXT PRIMARY KEY,
+`Source` TEXT,
+`SourceSize` INTEGER,
+`SourceMtime` DOUBLE,
+`Rows` INTEGER,
+`IngestedAt` TEXT)''')
+    return conn
+
+
+def is_ingested(conn, block_file, store_dir=DEFAULT_STORE_DIR):
+    """
+    True if the table of block_file was loaded from its current version,
+    through a store of the current STORE_VERSION
+    """
+    row = conn.execute('SELECT SourceSize, SourceMtime FROM SwatmfIngest WHERE TableName = ?',
+                       (table_name(block_file),)).fetchone()
+    stat = os.stat(block_file)
+    return (row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+            and is_up_to_date(block_file, store_dir))
+
+
+def _store_for(block_file, store_dir):
+    """Columnar store of block_file, (re)converted at float64 unless up to date"""
+    path = os.path.join(store_dir, os.path.basename(block_file))
+    if is_up_to_date(block_file, store_dir):
+        store = ColumnarStore(path)
+        if np.dtype(store.index['dtype']) == np.float64:
+            return store
+    # float32 stores round values the text files print with more digits
+    if convert_block_file(block_file, store_dir, dtype=np.float64) is None:
+        return None
+    return ColumnarStore(path)
+
+
+def ingest_block_file(conn, block_file, store_dir=DEFAULT_STORE_DIR):
+    """
+    Load one swatmf_out_* block file into its own table (replacing it)
+
+    The values come from the columnar store of the file (see
+    swatmf_columnar.py). Returns (table name, row count), or None if the
+    file is not a block file.
+    """
+    store = _store_for(block_file, store_dir)
+    if store is None:
+        return None
+    table = table_name(block_file)
+    periods, ids, values = _table_columns({'period_names': store.period_names,
+                                           'id_names': store.id_names,
+                                           'value_names': store.value_names})
+    columns = periods + ids + values
+
+    column_sql = ',\n'.join([f'`{name}` INTEGER' for name in periods + ids] +
+                            [f'`{name}` DOUBLE' for name in values])
+    insert_sql = (f'INSERT INTO `{table}` ({", ".join(f"`{name}`" for name in columns)}) '
+                  f'VALUES ({", ".join("?" * len(columns))})')
+
+    rows = 0
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS `{table}`')
+        conn.execute(f'CREATE TABLE `{table}` (`ID` INTEGER PRIMARY KEY,\n{column_sql})')
+
+        # One chunk of periods at a time, rows cell by cell within the
+        # chunk (closer to the index order). Columns as Python lists,
+        # converted once per chunk: executemany binds them much faster
+        # than NumPy scalars
+        ncell = len(store.ids)
+        for chunk_periods, chunk in store.iter_chunks():
+            nperiod = len(chunk_periods)
+            chunk = np.asarray(chunk, dtype=np.float64).transpose(1, 0, 2).reshape(-1, chunk.shape[2])
+            data = ([np.tile(column, ncell).tolist() for column in chunk_periods.T] +
+                    [np.repeat(column, nperiod).tolist() for column in store.ids.T] +
+                    [column.tolist() for column in chunk.T])
+            conn.executemany(insert_sql, zip(*data))
+            rows += len(chunk)
+
+        # Composite (cell or subbasin, period) index, built once after the load
+        # (LAYER last: queries select cells by row/column or subbasin)
+        index_columns = [name for name in ids if name != 'LAYER'] + list(reversed(periods))
+        conn.execute(f'CREATE INDEX `idx_{table}_{"_".join(index_columns)}` '
+                     f'ON `{table}` ({", ".join(f"`{name}`" for name in index_columns)})')
+
+        stat = os.stat(block_file)
+        conn.execute('INSERT OR REPLACE INTO SwatmfIngest VALUES (?, ?, ?, ?, ?, ?)',
+                     (table, os.path.basename(block_file), stat.st_size, stat.st_mtime, rows,
+                      time.strftime('%Y-%m-%d %H:%M:%S')))
+    return table, rows
+
+
+def ingest_all(model_dir='.', database=DEFAULT_DATABASE, force=False, store_dir=DEFAULT_STORE_DIR):
+    """Ingest every swatmf_out_* block file of model_dir (skipping unchanged files)"""
+    results, skipped = [], []
+    conn = _connect(database)
+    try:
+        for block_file in sorted(glob.glob(os.path.join(model_dir, 'swatmf_out_*'))):
+            if not force and is_ingested(conn, block_file, store_dir):
+                skipped.append(table_name(block_file))
+                continue
+            start = time.perf_counter()
+            result = ingest_block_file(conn, block_file, store_dir)
+            if result is not None:
+                results.append(result + (time.perf_counter() - start,))
+        conn.execute('PRAGMA optimize')
+    finally:
+        conn.close()
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load swatmf_out_* files into SWATOutput.sqlite')
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--database', default=None,
+                        help='SQLite database (default: SWATOutput.sqlite in the model directory)')
+    parser.add_argument('--force', action='store_true', help='reload unchanged files')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+    database = args.database or os.path.join(args.model_dir, DEFAULT_DATABASE)
+
+    print("="*70)
+    print("SWAT-MODFLOW OUTPUT INGESTION")
+    print("="*70)
+    print(f"Database: {database}\n")
+
+    start = time.perf_counter()
+    results, skipped = ingest_all(args.model_dir, database, args.force, args.store_dir)
+    for table, rows, seconds in results:
+        print(f"✓ {table}: {rows:,} rows ({seconds:.2f} s)")
+    for table in skipped:
+        print(f"  {table}: up to date")
+    total = sum(rows for _, rows, _ in results)
+    print(f"\nIngested {total:,} rows in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import swatmf
+
+# Subcommands whose startup must not load numpy, scipy or matplotlib
+LIGHT_COMMANDS = ('run', 'cache', 'scenarios', 'profiles')
+
+
+@pytest.mark.parametrize('name', list(swatmf.COMMANDS))
+def test_import_within_budget(name):
+    elapsed, _ = swatmf.measure_import(name)
+    assert elapsed <= swatmf.DEFAULT_BUDGET, f"{name} import took {elapsed:.2f} s"
+
+
+@pytest.mark.parametrize('name', LIGHT_COMMANDS)
+def test_no_heavy_modules(name):
+    _, heavy = swatmf.measure_import(name)
+    assert heavy == [], f"{name} import loaded {', '.join(heavy)}"
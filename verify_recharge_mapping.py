@@ -1,54 +1,16 @@
 import numpy as np
 
+from modflow_array_io import load_dis_for, read_bas, read_rch
+
 def read_ibound_from_bas(bas_file):
-    """Read IBOUND array from MODFLOW BAS file"""
-    with open(bas_file, 'r') as f:
-        lines = f.readlines()
-    
-    ibound_start = None
-    for i, line in enumerate(lines):
-        if 'IBOUND layer 1' in line:
-            ibound_start = i + 1
-            break
-    
-    if ibound_start is None:
-        raise ValueError("Could not find IBOUND in BAS file")
-    
-    ibound = []
-    for i in range(ibound_start, len(lines)):
-        line = lines[i].strip()
-        if line.startswith('#') or line.startswith('-999') or line.startswith('INTERNAL'):
-            break
-        if line:
-            values = [int(float(x)) for x in line.split()]
-            ibound.append(values)
-    
-    return np.array(ibound)
+    """Read IBOUND array (layer 1) from MODFLOW BAS file"""
+    dis = load_dis_for(bas_file)
+    return read_bas(bas_file, dis)['ibound'][0]
 
 def read_recharge_from_rch(rch_file):
-    """Read recharge array from MODFLOW RCH file"""
-    with open(rch_file, 'r') as f:
-        lines = f.readlines()
-    
-    # Find where recharge array starts
-    rch_start = None
-    for i, line in enumerate(lines):
-        if 'RECH' in line or 'INTERNAL' in line:
-            rch_start = i + 1
-            break
-    
-    if rch_start is None:
-        raise ValueError("Could not find recharge array in RCH file")
-    
-    recharge = []
-    for i in range(rch_start, len(lines)):
-        line = lines[i].strip()
-        if line.startswith('#') or not line:
-            continue
-        values = [float(x) for x in line.split()]
-        recharge.append(values)
-    
-    return np.array(recharge)
+    """Read recharge array (first stress period) from MODFLOW RCH file"""
+    dis = load_dis_for(rch_file)
+    return read_rch(rch_file, dis)['rech'][0]
 
 def verify_mapping(ibound, recharge):
     """Verify that recharge is correctly mapped to IBOUND"""
@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import os
+
+import numpy as np
+
+from modflow_array_io import LineReader, load_dis_for, read_layered_array, write_array
+from modflow_head_file import FormattedHeadFile
+from run_scenarios import create_work_dir
+from sub_period import fresh, trim_workspace
+from swat_cio import read_cio_period, simulation_dates
+
+# Warm start: begin a run from the state of an earlier one instead of the
+# 2001 starting heads, so spin-up years are not simulated again.
+#
+#   python warm_start.py --source-dir previous_run --out-dir warm_2015 --totim 5113
+#
+# The heads of the chosen record of the source run's modflow_GMRW.hed
+# become STRT in modflow_GMRW.bas (cells without a head keep their old
+# STRT), and the time-dependent inputs are
+# trimmed to start the day after the record (trim_workspace() of
+# sub_period.py: file.cio, climate files, DIS, output days, OC and the
+# RT3D output times). The
+# new model is written to its own directory; unchanged inputs are
+# hard-linked from the base model as in run_scenarios.py.
+#
+# SWAT has no restart file: soil, snow and shallow aquifer storages start
+# from their initial values again. Keep a short NYSKIP warm-up (--nyskip)
+# when those matter for the evaluation window. Transport (RT3D) also
+# restarts from the initial concentrations of rt3d.btn: rt3d.restart is
+# RT3D's restart output (OUTRES in rt3d_filenames), not an input, so it is
+# not carried over.
+#
+# SWAT-MODFLOW runs one MODFLOW time step per day, so TOTIM of a head record
+# is the number of days simulated since IYR/IDAF of the source run.
+
+HEAD_FILE = 'modflow_GMRW.hed'
+BAS_FILE = 'modflow_GMRW.bas'
+INVALID_HEAD = 1e29  # HDRY / HNOFLO style markers are above this in magnitude
+
+
+def read_warm_heads(head_file, kstpkper=None, totim=None):
+    """
+    Heads of one record of a formatted head file
+
+    Select by (KSTP, KPER) or TOTIM; the last record by default. Returns
+    (heads (nlay, nrow, ncol), totim, (kstp, kper), whether it is the last
+    record of the file).
+    """
+    with FormattedHeadFile(head_file) as hed:
+        positions = hed.find_records(kstpkper, totim)
+        first = hed.index[positions[0]]
+        heads = hed.get_data(kstpkper, totim if kstpkper is None else None)
+        last_totim = float(hed.times[-1])
+    record_totim = float(first['totim'])
+    return heads, record_totim, (int(first['kstp']), int(first['kper'])), record_totim == last_totim
+
+
+def write_bas_strt(bas_file, heads, out_file, value_fmt='%.2f'):
+    """
+    Write a copy of a BAS6 file with STRT replaced by heads
+
+    IBOUND and HNOFLO are copied unchanged. Cells that are inactive or
+    have no valid head (NaN, HNOFLO, -999, HDRY) keep their old STRT.
+    Returns the number of cells whose starting head was replaced.
+    """
+    dis = load_dis_for(bas_file)
+    nlay, nrow, ncol = dis['nlay'], dis['nrow'], dis['ncol']
+
+    reader = LineReader(bas_file)
+    reader.skip_comments()
+    reader.next_line()  # options
+    ibound = read_layered_array(reader, nlay, nrow, ncol, np.int32)
+    line = reader.next_line()
+    hnoflo = float(line.split()[0])
+    strt_start = reader.pos
+    strt = read_layered_array(reader, nlay, nrow, ncol, np.float64)
+
+    heads = np.asarray(heads, dtype=np.float64)
+    if heads.shape != strt.shape:
+        raise ValueError(f"Head array {heads.shape} does not match the model grid {strt.shape}")
+    valid = ((ibound != 0) & np.isfinite(heads) & (np.abs(heads) < INVALID_HEAD)
+             & (heads != hnoflo) & (heads != -999.0))
+    new_strt = np.where(valid, heads, strt)
+
+    with open(out_file, 'w') as f:
+        f.write('\n'.join(reader.lines[:strt_start]) + '\n')
+        for k in range(nlay):
+            write_array(f, new_strt[k], comment=f'STRT layer {k + 1} (warm start)', value_fmt=value_fmt)
+        rest = reader.lines[reader.pos:]
+        if rest:
+            f.write('\n'.join(rest) + '\n')
+    return int(valid.sum())
+
+
+def warm_start_period(period, totim, end=None):
+    """
+    Start and end date of a run continuing after day ``totim`` of ``period``
+
+    The end defaults to the end of the original period.
+    """
+    start, original_end = simulation_dates(period)
+    new_start = start + datetime.timedelta(days=int(round(totim)))
+    new_end = end or original_end
+    if new_start > new_end:
+        raise ValueError(f"Head record at day {totim:g} is past the end of the simulation ({new_end})")
+    return new_start, new_end
+
+
+def create_warm_start(model_dir, out_dir, source_dir=None, kstpkper=None, totim=None, end=None, nyskip=0):
+    """
+    Create a warm-started copy of the model in out_dir
+
+    source_dir holds the earlier run (its head file); by default the
+    model directory itself. Returns a dict describing
+    what was changed.
+    """
+    source_dir = source_dir or model_dir
+    heads, record_totim, record_step, _ = read_warm_heads(
+        os.path.join(source_dir, HEAD_FILE), kstpkper, totim)
+    period = read_cio_period(os.path.join(model_dir, 'file.cio'))
+    start, end = warm_start_period(period, record_totim, end)
+
+    create_work_dir(model_dir, out_dir)
+
+    cells = write_bas_strt(os.path.join(model_dir, BAS_FILE), heads, fresh(os.path.join(out_dir, BAS_FILE)))
+    workspace = trim_workspace(model_dir, out_dir, start, end, nyskip)
+
+    return {
+        'record': record_step,
+        'totim': record_totim,
+        'start': start,
+        'end': end,
+        'days': (end - start).days + 1,
+        'strt_cells': cells,
+        'climate_files': workspace['climate_files'],
+        'nper': workspace['nper'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm-start the model from the heads of an earlier run')
+    parser.add_argument('--out-dir', required=True, help='directory for the warm-started model')
+    parser.add_argument('--model-dir', default='.', help='base model (default: current directory)')
+    parser.add_argument('--source-dir', default=None, help='earlier run with the head file (default: model dir)')
+    select = parser.add_mutually_exclusive_group()
+    select.add_argument('--kstpkper', type=int, nargs=2, metavar=('KSTP', 'KPER'))
+    select.add_argument('--totim', type=float, help='simulated day of the head record')
+    parser.add_argument('--end', type=datetime.date.fromisoformat, default=None,
+                        help='last simulated date, YYYY-MM-DD (default: unchanged)')
+    parser.add_argument('--nyskip', type=int, default=0, help='NYSKIP of the new run (default: 0)')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("WARM START")
+    print("="*70)
+    try:
+        info = create_warm_start(args.model_dir, args.out_dir, args.source_dir,
+                                 tuple(args.kstpkper) if args.kstpkper else None, args.totim,
+                                 args.end, args.nyskip)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"✗ {e}")
+        return False
+
+    kstp, kper = info['record']
+    print(f"Head record............: KSTP {kstp}, KPER {kper} (day {info['totim']:g})")
+    print(f"Simulation.............: {info['start']} to {info['end']} ({info['days']:,} days)")
+    print(f"✓ STRT replaced in {info['strt_cells']:,} cells")
+    print(f"✓ file.cio shifted (NYSKIP {args.nyskip}), DIS cut to {info['nper']} stress period(s)")
+    for name in info['climate_files']:
+        print(f"✓ {name} starts on {info['start']}")
+    print("✗ RT3D transport is not warm-started: it restarts from the initial concentrations of rt3d.btn")
+    print(f"\n✓ Warm-started model written to {args.out_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    main()